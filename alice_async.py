@@ -0,0 +1,129 @@
+# alice_async.py
+"""
+Non-blocking Alice Blue REST client used by broker_gateway.py.
+
+Talks to the same endpoints as pya3 (which blocks on `requests`), through
+the worker's shared tornado AsyncHTTPClient: a worker can have up to
+ALICE_MAX_CONNECTIONS broker calls in flight while its event loop keeps
+serving other requests. Every call waits for its account's
+broker_limiter bucket on the loop, and identical reads in flight are
+shared.
+"""
+import asyncio
+import hashlib
+import json
+import os
+
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+
+from broker_limiter import ACCOUNT, QUOTE, limiter
+
+# pya3's default; override to point at a sandbox / fake broker
+ALICE_BASE_URL = os.environ.get(
+    "ALICE_BASE_URL", "https://a3.aliceblueonline.com/rest/AliceBlueAPIService/api/"
+)
+MAX_CONNECTIONS = int(os.environ.get("ALICE_MAX_CONNECTIONS", 200))
+REQUEST_TIMEOUT = float(os.environ.get("ALICE_TIMEOUT", 10))
+
+# (exchange, token) for the index quotes shown on the dashboard
+INDEX_TOKENS = {
+    "NIFTY 50": ("NSE", "26000"),
+    "NIFTY BANK": ("NSE", "26009"),
+}
+
+# broker_limiter priority per endpoint (ACCOUNT otherwise); logins are never shared
+PATH_PRIORITY = {"ScripDetails/getScripQuoteDetails": QUOTE}
+LOGIN_PATHS = {"customer/getAPIEncpkey", "customer/getUserSID"}
+
+# One client per IOLoop (tornado caches it), shared by every request
+AsyncHTTPClient.configure(None, max_clients=MAX_CONNECTIONS)
+
+
+class AliceError(Exception):
+    pass
+
+
+class AliceSession:
+    def __init__(self, user_id: str, api_key: str = None, session_id: str = None,
+                 base: str = None):
+        self.user_id = user_id.upper()
+        self.api_key = api_key
+        self.session_id = session_id
+        self.base = base or ALICE_BASE_URL
+
+    async def _call(self, method: str, path: str, data: dict = None):
+        key = None if path in LOGIN_PATHS else (self.session_id, method, path, json.dumps(data, sort_keys=True))
+        return await limiter("aliceblue", self.user_id).acall(
+            PATH_PRIORITY.get(path, ACCOUNT), self._fetch, method, path, data, key=key)
+
+    async def _fetch(self, method: str, path: str, data: dict = None):
+        headers = {"X-SAS-Version": "2.0", "Content-Type": "application/json"}
+        if self.session_id:
+            headers["Authorization"] = f"Bearer {self.user_id} {self.session_id}"
+        req = HTTPRequest(
+            self.base + path, method=method, headers=headers,
+            body=json.dumps(data) if method == "POST" else None,
+            request_timeout=REQUEST_TIMEOUT,
+        )
+        try:
+            # raise_error=False covers HTTP errors only; refused / timed out still raise
+            resp = await AsyncHTTPClient().fetch(req, raise_error=False)
+        except Exception as e:
+            raise AliceError(f"{path}: {e}") from e
+        if resp.code == 599 or not resp.body:
+            raise AliceError(f"{path}: {resp.error or resp.code}")
+        try:
+            return json.loads(resp.body)
+        except ValueError as e:
+            raise AliceError(f"{path}: bad JSON ({e})") from e
+
+    async def get_session_id(self) -> str:
+        """Login handshake (encryption key -> hashed user data -> session id)."""
+        res = await self._call("POST", "customer/getAPIEncpkey", {"userId": self.user_id})
+        if not res.get("encKey"):
+            raise AliceError(res.get("emsg") or "no encryption key")
+        user_data = hashlib.sha256((self.user_id + self.api_key + res["encKey"]).encode()).hexdigest()
+        res = await self._call("POST", "customer/getUserSID", {"userId": self.user_id, "userData": user_data})
+        if res.get("stat") != "Ok":
+            raise AliceError(res.get("emsg") or "login failed")
+        self.session_id = res["sessionID"]
+        return self.session_id
+
+    async def get_profile(self):
+        return await self._call("GET", "customer/accountDetails")
+
+    async def get_balance(self):
+        return await self._call("GET", "limits/getRmsLimits")
+
+    async def get_ltp(self, name: str) -> float:
+        exch, token = INDEX_TOKENS[name]
+        res = await self._call("POST", "ScripDetails/getScripQuoteDetails", {"exch": exch, "symbol": token})
+        return float(res.get("LTP") or 0.0)
+
+    async def is_valid(self) -> bool:
+        """True if the stored session is still accepted by the broker."""
+        try:
+            profile = await self.get_profile()
+        except AliceError:
+            return False
+        return isinstance(profile, dict) and profile.get("stat", "Ok") == "Ok"
+
+    async def snapshot(self) -> dict:
+        """Dashboard data (balance, profile, index LTPs), fetched concurrently."""
+        balance, profile, nifty, banknifty = await asyncio.gather(
+            self.get_balance(), self.get_profile(),
+            self.get_ltp("NIFTY 50"), self.get_ltp("NIFTY BANK"),
+            return_exceptions=True,
+        )
+        ok = lambda x: not isinstance(x, Exception)
+        for name, value in (("Balance", balance), ("Profile", profile),
+                            ("NIFTY LTP", nifty), ("BANKNIFTY LTP", banknifty)):
+            if not ok(value):
+                print(f"{name} error:", value)
+        return {
+            "connected": True,
+            "balance": balance if ok(balance) and isinstance(balance, list) and balance else None,
+            "profile": profile if ok(profile) and isinstance(profile, dict) and profile.get("accountName") else None,
+            "nifty_ltp": nifty if ok(nifty) else 0.0,
+            "banknifty_ltp": banknifty if ok(banknifty) else 0.0,
+        }
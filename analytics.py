@@ -0,0 +1,189 @@
+# analytics.py
+"""
+Performance analytics over a user's closed trades.
+
+The user's Trade rows (hot table and archived months, see
+trade_archive.py) are pulled once as four columns (pnl, opened_at,
+closed_at, strategy_name) and every metric is computed with NumPy over
+those arrays, with no per-trade Python loop. Results are cached per user
+and keyed by a cheap (count, max id) stamp of the user's trades plus the
+archive's, so a trade written by any process (web worker, strategy
+runner, paper engine) or a roll invalidates the cached result on the
+next request.
+"""
+import threading
+
+import numpy as np
+from sqlalchemy import func, select
+
+import trade_archive
+from models import db, Trade
+
+TRADING_DAYS = 252
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def _round(x, nd=2):
+    return round(float(x), nd) if np.isfinite(x) else None
+
+
+def _streaks(pnl):
+    """(longest win run, longest loss run, current run signed)."""
+    sign = np.sign(pnl).astype(np.int8)
+    if not len(sign):
+        return 0, 0, 0
+    # Boundaries where the sign changes -> run lengths per run
+    edges = np.flatnonzero(np.diff(sign)) + 1
+    starts = np.concatenate(([0], edges))
+    lengths = np.diff(np.concatenate((starts, [len(sign)])))
+    run_sign = sign[starts]
+    longest_win = int(lengths[run_sign > 0].max(initial=0))
+    longest_loss = int(lengths[run_sign < 0].max(initial=0))
+    current = int(lengths[-1] * run_sign[-1])
+    return longest_win, longest_loss, current
+
+
+def _group(keys, pnl):
+    """Per-key count / total / win rate, keys being any 1-D array."""
+    uniq, inv = np.unique(keys, return_inverse=True)
+    count = np.bincount(inv, minlength=len(uniq))
+    total = np.bincount(inv, weights=pnl, minlength=len(uniq))
+    wins = np.bincount(inv, weights=(pnl > 0), minlength=len(uniq))
+    return uniq, count, total, wins
+
+
+def compute_metrics(pnl, opened_at, closed_at, strategy) -> dict:
+    """
+    pnl: float array; opened_at / closed_at: datetime64[s] arrays (NaT
+    allowed for opened_at); strategy: str array. Rows must be sorted by
+    closed_at.
+    """
+    n = len(pnl)
+    if not n:
+        return {"trades": 0}
+
+    wins = pnl > 0
+    losses = pnl < 0
+    gross_profit = pnl[wins].sum()
+    gross_loss = -pnl[losses].sum()
+
+    equity = np.cumsum(pnl)
+    peak = np.maximum.accumulate(np.maximum(equity, 0.0))
+    drawdown = peak - equity
+
+    # Daily PnL for risk-adjusted ratios
+    days = closed_at.astype("M8[D]")
+    _, day_inv = np.unique(days, return_inverse=True)
+    daily = np.bincount(day_inv, weights=pnl)
+    daily_std = daily.std(ddof=1) if len(daily) > 1 else np.nan
+    downside = np.minimum(daily, 0.0)
+    downside_dev = np.sqrt((downside ** 2).mean()) if len(daily) > 1 else np.nan
+    scale = np.sqrt(TRADING_DAYS)
+
+    has_open = ~np.isnat(opened_at)
+    held = (closed_at[has_open] - opened_at[has_open]).astype("m8[s]").astype(float)
+
+    longest_win, longest_loss, current = _streaks(pnl)
+
+    names, s_count, s_total, s_wins = _group(strategy, pnl)
+    # 1970-01-01 was a Thursday: shift so Monday == 0
+    weekday = (days.astype(np.int64) + 3) % 7
+    wd, w_count, w_total, w_wins = _group(weekday, pnl)
+
+    return {
+        "trades": int(n),
+        "total_pnl": _round(equity[-1]),
+        "win_rate": _round(wins.mean() * 100),
+        "avg_win": _round(pnl[wins].mean()) if wins.any() else 0.0,
+        "avg_loss": _round(pnl[losses].mean()) if losses.any() else 0.0,
+        "expectancy": _round(pnl.mean()),
+        "profit_factor": _round(gross_profit / gross_loss) if gross_loss else None,
+        "max_drawdown": _round(drawdown.max()),
+        "sharpe": _round(daily.mean() / daily_std * scale) if daily_std else None,
+        "sortino": _round(daily.mean() / downside_dev * scale) if downside_dev else None,
+        "avg_hold_seconds": _round(held.mean(), 0) if len(held) else None,
+        "streaks": {"longest_win": longest_win, "longest_loss": longest_loss, "current": current},
+        "by_strategy": [
+            {"strategy": str(k), "trades": int(c), "pnl": _round(t), "win_rate": _round(w / c * 100)}
+            for k, c, t, w in zip(names, s_count, s_total, s_wins)
+        ],
+        "by_weekday": [
+            {"weekday": WEEKDAYS[int(k)], "trades": int(c), "pnl": _round(t), "win_rate": _round(w / c * 100)}
+            for k, c, t, w in zip(wd, w_count, w_total, w_wins)
+        ],
+        "equity_curve": {
+            "closed_at": [str(t) for t in closed_at[-500:]],
+            "equity": np.round(equity[-500:], 2).tolist(),
+        },
+    }
+
+
+def load_columns(user_id: int):
+    """Columnar extract of a user's trades, sorted by closed_at."""
+    rows = db.session.execute(
+        select(Trade.pnl, Trade.opened_at, Trade.closed_at, Trade.strategy_name, Trade.id)
+        .where(Trade.user_id == user_id)
+        .order_by(Trade.closed_at.asc(), Trade.id.asc())
+    ).all()
+    parts = [
+        (cols["pnl"], np.where(cols.get("opened_at.null", False), np.datetime64("NaT"),
+                               cols["opened_at"]).astype("M8[s]"),
+         cols["closed_at"].astype("M8[s]"), cols["strategy_name"], cols["id"])
+        for cols in trade_archive.scan("trade", user_id)
+    ]
+    if rows:
+        pnl, opened, closed, strategy, ids = zip(*rows)
+        parts.append((
+            np.fromiter(pnl, dtype=float, count=len(pnl)),
+            np.array([o or "NaT" for o in opened], dtype="M8[s]"),
+            np.array(closed, dtype="M8[s]"),
+            np.array(strategy, dtype=str),
+            np.fromiter(ids, dtype=np.int64, count=len(ids)),
+        ))
+    if not parts:
+        empty = np.empty(0, dtype="M8[s]")
+        return np.empty(0), empty, empty, np.empty(0, dtype=str)
+
+    pnl, opened, closed, strategy, ids = (np.concatenate(c) for c in zip(*parts))
+    if len(parts) > 1:
+        # Late rows can still be hot for an archived month
+        order = np.lexsort((ids, closed))
+        pnl, opened, closed, strategy = pnl[order], opened[order], closed[order], strategy[order]
+    return pnl, opened, closed, strategy
+
+
+def trades_stamp(user_id: int):
+    """Cheap change marker for a user's trades."""
+    hot = tuple(db.session.query(func.count(Trade.id), func.max(Trade.id))
+                .filter(Trade.user_id == user_id).one())
+    return hot + trade_archive.archive_stamp()
+
+
+class AnalyticsCache:
+    """Per-user metrics, recomputed only when the trades stamp changes."""
+
+    def __init__(self):
+        self._data = {}  # user_id -> (stamp, metrics)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> dict:
+        stamp = trades_stamp(user_id)
+        with self._lock:
+            cached = self._data.get(user_id)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        metrics = compute_metrics(*load_columns(user_id))
+        with self._lock:
+            self._data[user_id] = (stamp, metrics)
+        return metrics
+
+    def invalidate(self, user_id: int = None):
+        with self._lock:
+            if user_id is None:
+                self._data.clear()
+            else:
+                self._data.pop(user_id, None)
+
+
+analytics_cache = AnalyticsCache()
@@ -1,274 +1,92 @@
+# app.py
+"""
+AlgoSphere application factory.
+
+Broker SDKs (pya3, dhanhq) and numpy are imported inside the functions
+that use them, so importing this module and serving the first request
+does not pay for them. gunicorn loads `wsgi:application` (see
+gunicorn.conf.py for the preloaded production setup).
+"""
 import os
-from datetime import datetime, date
 
-from flask import (
-    Flask,
-    render_template,
-    request,
-    redirect,
-    url_for,
-    session,
-    flash,
-)
-from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
-from dhanhq import dhanhq  # pip install dhanhq
+from flask import Flask
+from flask_login import LoginManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 
-app = Flask(__name__)
-app.config["SECRET_KEY"] = "your-secret-key"
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///users.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-db = SQLAlchemy(app)
+import db_config
+import migrations
+from models import db
+from user_context import user_cache
 
-# ---------- MODELS ----------
 
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    password = db.Column(db.String(120), nullable=False)
-    broker_connected = db.Column(db.Boolean, default=False)
+def create_app(config: dict = None):
+    app = Flask(__name__)
 
+    # ----- Core config -----
+    app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "change-this-in-production")
+    app.config["SQLALCHEMY_DATABASE_URI"] = db_config.database_uri()
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    if config:
+        app.config.update(config)
 
-class PaperTrade(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    symbol = db.Column(db.String(50))
-    side = db.Column(db.String(10))
-    qty = db.Column(db.Integer)
-    entry_price = db.Column(db.Float)
-    exit_price = db.Column(db.Float, nullable=True)
-    pnl_rupees = db.Column(db.Float, default=0.0)
-    trade_date = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default="OPEN")
+    # Behind Heroku's router / nginx: trust that many X-Forwarded-For hops
+    # so request.remote_addr (login throttling) is the real client. On a
+    # dyno every request arrives from the router, so without this the IP
+    # throttle would be one bucket for the whole site.
+    hops = int(os.environ.get("PROXY_FIX_HOPS", 1 if "DYNO" in os.environ else 0))
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
 
+    # ----- Init extensions -----
+    db_config.init_app(app, db)  # pool + SQLite WAL / busy timeout, then db.init_app
 
-class LiveTrade(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    symbol = db.Column(db.String(50))
-    side = db.Column(db.String(10))
-    qty = db.Column(db.Integer)
-    entry_price = db.Column(db.Float)
-    exit_price = db.Column(db.Float, nullable=True)
-    pnl_rupees = db.Column(db.Float, default=0.0)
-    trade_date = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default="OPEN")
+    from session_health import session_health
 
+    session_health.init_app(app)
 
-# ---------- BROKER / GLOBALS ----------
+    login_manager = LoginManager()
+    login_manager.login_view = "auth.login"
+    login_manager.init_app(app)
 
-DHAN_CLIENT_ID = os.environ.get("DHAN_CLIENT_ID")
-DHAN_ACCESS_TOKEN = os.environ.get("DHAN_ACCESS_TOKEN")
+    @login_manager.user_loader
+    def load_user(user_id):
+        # Cached snapshot (user + broker + strategy configs), see user_context.py
+        return user_cache.get(int(user_id))
 
-broker_connection = None
-trade_mode = "PAPER"  # "PAPER" or "LIVE"
+    # ----- Register blueprints -----
+    from auth_routes import auth_bp
+    from broker_routes import broker_bp
+    from dashboard_routes import dash_bp
+    from dhan_routes import dhan_bp
 
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(dash_bp)
+    app.register_blueprint(broker_bp)
+    app.register_blueprint(dhan_bp)
 
-def connect_broker() -> bool:
-    """Create global Dhan connection."""
-    global broker_connection
-    try:
-        broker_connection = dhanhq(client_id=DHAN_CLIENT_ID, access_token=DHAN_ACCESS_TOKEN)
-        print("Broker connected:", broker_connection)
-        return True
-    except Exception as e:
-        print("Broker connect error:", e)
-        broker_connection = None
-        return False
-
-
-def get_fund_balance():
-    """Return dict with available & total funds."""
-    if not broker_connection:
-        print("[funds] No broker_connection, using mock funds 1L")
-        return {"available": 100000.0, "total": 100000.0}
-
-    try:
-        funds = broker_connection.get_fund_limits()
-        # Keys per Dhan docs: availableBalance, sodLimit etc.
-        available = float(funds.get("availableBalance", 0.0))
-        total = float(funds.get("sodLimit", 0.0))
-        return {"available": available, "total": total}
-    except Exception as e:
-        print("Funds error:", e)
-        return {"available": 0.0, "total": 0.0}
-
-
-def get_today_pnl(mode: str) -> float:
-    """Sum today's closed trades PnL."""
-    today = date.today()
-
-    if mode == "PAPER":
-        trades = PaperTrade.query.filter(
-            db.func.date(PaperTrade.trade_date) == today,
-            PaperTrade.exit_price.isnot(None),
-        ).all()
-    else:
-        trades = LiveTrade.query.filter(
-            db.func.date(LiveTrade.trade_date) == today,
-            LiveTrade.exit_price.isnot(None),
-        ).all()
-
-    return sum(t.pnl_rupees for t in trades)
-
-
-def get_index_ltp():
-    """Temporary mock index prices (replace with real API later)."""
-    nifty_ltp = 26000.0
-    banknifty_ltp = 56000.0
-    return nifty_ltp, banknifty_ltp
-
-
-# ---------- ROUTES ----------
-
-@app.route("/")
-def home():
-    return redirect(url_for("dashboard"))
-
-
-@app.route("/login", methods=["GET", "POST"])
-def login():
-    if request.method == "POST":
-        email = request.form["email"]
-        password = request.form["password"]
-        user = User.query.filter_by(email=email).first()
-
-        if user and check_password_hash(user.password, password):
-            session["user_id"] = user.id
-            return redirect(url_for("dashboard"))
-
-        flash("Invalid credentials", "error")
-
-    return render_template("login.html")
-
-
-@app.route("/logout")
-def logout():
-    session.clear()
-    return redirect(url_for("login"))
-
-
-@app.route("/toggle_broker", methods=["POST"])
-def toggle_broker():
-    """Connect or disconnect broker with one button."""
-    global trade_mode, broker_connection
-
-    if "user_id" not in session:
-        return redirect(url_for("login"))
-
-    user = db.session.get(User, session["user_id"])
-
-    if user.broker_connected:
-        # Disconnect
-        broker_connection = None
-        user.broker_connected = False
-        trade_mode = "PAPER"
-        flash("Broker disconnected. Switched to PAPER mode.", "success")
-    else:
-        ok = connect_broker()
-        if ok:
-            user.broker_connected = True
-            trade_mode = "LIVE"
-            flash("Broker connected. Live mode enabled.", "success")
-        else:
-            user.broker_connected = False
-            flash("Broker connection failed. Check credentials.", "error")
-
-    db.session.commit()
-    return redirect(url_for("dashboard"))
-
-
-@app.route("/toggle_mode", methods=["POST"])
-def toggle_mode():
-    """Switch between PAPER and LIVE (manual override)."""
-    global trade_mode
-
-    if "user_id" not in session:
-        return redirect(url_for("login"))
-
-    mode = request.form.get("mode", "paper").upper()
-    trade_mode = "LIVE" if mode == "LIVE" else "PAPER"
-    flash(f"Switched to {trade_mode} mode.", "success")
-    return redirect(url_for("dashboard"))
-
-
-@app.route("/deploy_paper_orb")
-def deploy_paper_orb():
-    """Demo: create one closed paper trade with PnL 2850."""
-    if "user_id" not in session:
-        return redirect(url_for("login"))
-
-    trade = PaperTrade(
-        symbol="BANKNIFTY CE",
-        side="CE",
-        qty=15,
-        entry_price=150.0,
-        exit_price=190.0,
-        pnl_rupees=2850.0,
-        status="CLOSED",
-    )
-
-    db.session.add(trade)
-    db.session.commit()
-
-    flash("Paper ORB deployed, +₹2850 P&L", "success")
-    return redirect(url_for("dashboard"))
-
-
-@app.route("/dashboard")
-def dashboard():
-    if "user_id" not in session:
-        return redirect(url_for("login"))
-
-    user = db.session.get(User, session["user_id"])
-
-    funds = get_fund_balance()
-    nifty_ltp, banknifty_ltp = get_index_ltp()
-    today_pnl_paper = get_today_pnl("PAPER")
-    today_pnl_live = get_today_pnl("LIVE")
+    # ----- Bring the schema up to date (migrations.py) -----
+    with app.app_context():
+        migrations.upgrade(db.engine)
 
-    today = date.today()
+    return app
 
-    # ONLY today’s trades for the “Recent” sections
-    paper_trades = (
-        PaperTrade.query
-        .filter(db.func.date(PaperTrade.trade_date) == today)
-        .order_by(PaperTrade.id.desc())
-        .limit(20)
-        .all()
-    )
 
-    live_trades = (
-        LiveTrade.query
-        .filter(db.func.date(LiveTrade.trade_date) == today)
-        .order_by(LiveTrade.id.desc())
-        .limit(20)
-        .all()
-    )
+def warm_shared_state(app):
+    """
+    Load read-only state once, before gunicorn forks, so workers share it
+    copy-on-write instead of each building it on first request: compiled
+    templates and the modules views import lazily (analytics -> numpy).
+    """
+    for name in app.jinja_env.list_templates(extensions=["html"]):
+        try:
+            app.jinja_env.get_template(name)
+        except Exception as e:
+            print(f"Template preload skipped {name}:", e)
 
-    return render_template(
-        "dashboard.html",
-        funds=funds,
-        nifty_ltp=nifty_ltp,
-        banknifty_ltp=banknifty_ltp,
-        today_pnl_paper=today_pnl_paper,
-        today_pnl_live=today_pnl_live,
-        paper_trades=paper_trades,
-        livetrades=live_trades,
-        trade_mode=trade_mode,
-        broker_connected=user.broker_connected,
-    )
+    import analytics  # noqa: F401
 
 
+# For simple running: `python app.py`
 if __name__ == "__main__":
-    with app.app_context():
-        db.create_all()
-
-        # Seed default admin user if not present
-        if not User.query.filter_by(email="admin@test.com").first():
-            user = User(
-                email="admin@test.com",
-                password=generate_password_hash("admin123"),
-            )
-            db.session.add(user)
-            db.session.commit()
-
+    app = create_app()
     app.run(debug=True)
@@ -8,6 +8,9 @@ from flask_login import (
     current_user,
 )
 
+from credentials import (
+    LoginBusy, account_throttle, ip_throttle, known_ips, needs_rehash, verify_bounded,
+)
 from models import db, User
 
 auth_bp = Blueprint("auth", __name__)
@@ -30,11 +33,32 @@ def login():
         flash("Email and password are required.", "danger")
         return redirect(url_for("auth.login"))
 
+    # Throttle before hashing: per client IP on every attempt, per account
+    # once it has failed too often
+    wait = ip_throttle.hit(request.remote_addr) or account_throttle.retry_after(email)
+    if wait:
+        flash(f"Too many login attempts. Try again in {int(wait) + 1} s.", "danger")
+        return render_template("login.html"), 429
+
     user = User.query.filter_by(email=email).first()
-    if not user or not user.check_password(password):
+    # Unknown IPs share a capped slice of the hash pool
+    suspect = bool(ip_throttle.burst) and request.remote_addr not in known_ips
+    try:
+        valid = verify_bounded(password, user.password_hash if user else None, suspect)
+    except LoginBusy:
+        flash("Login is busy right now. Please try again in a moment.", "warning")
+        return render_template("login.html"), 503
+
+    if not valid:
+        account_throttle.hit(email)
         flash("Invalid email or password.", "danger")
         return redirect(url_for("auth.login"))
 
+    if needs_rehash(user.password_hash):
+        user.set_password(password)
+        db.session.commit()
+
+    known_ips.add(request.remote_addr)
     login_user(user)
     flash("Logged in successfully.", "success")
     return redirect(url_for("dash.dashboard"))
@@ -44,7 +68,7 @@ def login():
 def register():
     """Simple email/password registration."""
     if request.method == "GET":
-        return render_template("register.html")
+        return render_template("auth/register.html")
 
     email = request.form.get("email", "").strip().lower()
     password = request.form.get("password", "").strip()
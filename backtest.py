@@ -0,0 +1,95 @@
+# backtest.py
+"""
+Candle-replay backtest for BankNiftyOrbVwap.
+
+Replays stored 1-minute index candles (see candle_store.py) through the
+strategy one trading day at a time. Option premiums are not stored, so
+PnL is measured in index points on the underlying, using the same
+target/stop/time exits as BankNiftyOrbVwap.on_option_tick.
+"""
+from dataclasses import asdict
+from datetime import time
+
+import numpy as np
+
+from strategies.banknifty_orb_vwap import BankNiftyOrbVwap, StrategyParams
+
+SESSION_END = time(15, 30)
+
+TRADE_DTYPE = np.dtype([
+    ("entry_ts", "M8[s]"),
+    ("exit_ts", "M8[s]"),
+    ("side", "U2"),          # "CE" / "PE"
+    ("entry", "f8"),
+    ("exit", "f8"),
+    ("pnl_pts", "f8"),
+    ("reason", "U12"),
+])
+
+
+def params_key(params: StrategyParams) -> dict:
+    """JSON-safe dict of a StrategyParams (times as HH:MM)."""
+    out = {}
+    for k, v in asdict(params).items():
+        out[k] = v.strftime("%H:%M") if isinstance(v, time) else v
+    return out
+
+
+def _replay_day(strategy: BankNiftyOrbVwap, day_rows, trades: list):
+    ts_list = day_rows["ts"].astype(object)
+    highs = day_rows["high"].tolist()
+    lows = day_rows["low"].tolist()
+    closes = day_rows["close"].tolist()
+    vols = day_rows["volume"].tolist()
+
+    for ts, high, low, close, vol in zip(ts_list, highs, lows, closes, vols):
+        if strategy.in_position:
+            reason = strategy.on_option_tick(ts, close)
+            if reason:
+                trades.append(_close(strategy, ts, close, reason))
+                strategy.exit()
+
+        signal = strategy.on_1min_candle(ts, high, low, close, vol)
+        if signal and not strategy.in_position:
+            strategy.enter(signal, close, ts)
+
+    if strategy.in_position:
+        trades.append(_close(strategy, ts_list[-1], closes[-1], "EOD_EXIT"))
+        strategy.exit()
+
+
+def _close(strategy: BankNiftyOrbVwap, ts, price: float, reason: str):
+    side = strategy.position_side
+    pnl = price - strategy.entry_price if side == "CE" else strategy.entry_price - price
+    return (strategy.entry_time, ts, side, strategy.entry_price, price, pnl, reason)
+
+
+def run_backtest(candles: np.ndarray, params: StrategyParams) -> np.ndarray:
+    """
+    Replay candles (CANDLE_DTYPE, sorted by ts) and return an array of
+    TRADE_DTYPE rows. Strategy state (opening range, VWAP) resets daily.
+    """
+    trades = []
+    if not len(candles):
+        return np.empty(0, dtype=TRADE_DTYPE)
+
+    days = candles["ts"].astype("M8[D]")
+    bounds = np.flatnonzero(days[1:] != days[:-1]) + 1
+    for day_rows in np.split(candles, bounds):
+        _replay_day(BankNiftyOrbVwap(params), day_rows, trades)
+
+    return np.array(trades, dtype=TRADE_DTYPE)
+
+
+def summarize(trades: np.ndarray) -> dict:
+    """Headline stats for a trade array (points)."""
+    pnl = trades["pnl_pts"] if len(trades) else np.zeros(0)
+    equity = np.cumsum(pnl)
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    max_dd = float((peak - equity).max()) if len(equity) else 0.0
+    return {
+        "trades": int(len(pnl)),
+        "total_pts": float(pnl.sum()),
+        "win_rate": float((pnl > 0).mean() * 100) if len(pnl) else 0.0,
+        "max_dd_pts": max_dd,
+    }
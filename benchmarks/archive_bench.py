@@ -0,0 +1,151 @@
+# benchmarks/archive_bench.py
+"""
+Multi-year reports before and after trade_archive.roll().
+
+Seeds --years of trades for --users users into a fresh SQLite file,
+then times what a report request does for one user over the whole
+history (summary + first page, CSV export, /api/analytics) with every
+row hot, rolls closed months into the archive and times it again.
+Also reports hot-table rows and on-disk sizes of both tiers.
+
+    python benchmarks/archive_bench.py --users 20 --years 3 --per-day 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP = tempfile.mkdtemp(prefix="archive_bench_")
+os.environ.setdefault("TRADE_ARCHIVE_DIR", os.path.join(TMP, "archive"))
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+
+def seed(app, users, years, per_day):
+    from models import db, User, Trade
+
+    now = datetime.utcnow()
+    start = now - timedelta(days=365 * years)
+    with app.app_context():
+        for u in range(users):
+            user = User(email=f"user{u}@example.com")
+            user.set_password("benchmark")
+            db.session.add(user)
+        db.session.commit()
+
+        batch, day = [], start
+        while day < now:
+            if day.weekday() < 5:
+                for user_id in range(1, users + 1):
+                    for i in range(per_day):
+                        closed = day.replace(hour=4) + timedelta(minutes=18 * i, seconds=random.randint(0, 59))
+                        batch.append(dict(
+                            user_id=user_id, strategy_name=random.choice(["banknifty_orb_vwap", "nifty_scalper"]),
+                            symbol="BANKNIFTY", side=random.choice(["BUY", "SELL"]), qty=15,
+                            entry_price=100.0, exit_price=101.0, pnl=round(random.uniform(-500, 500), 2),
+                            opened_at=closed - timedelta(minutes=7), closed_at=closed,
+                        ))
+            if len(batch) >= 20000:
+                db.session.execute(Trade.__table__.insert(), batch)
+                batch = []
+            day += timedelta(days=1)
+        if batch:
+            db.session.execute(Trade.__table__.insert(), batch)
+        db.session.commit()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return round(samples[len(samples) // 2] * 1000, 1)
+
+
+def measure(app, client, years, repeat):
+    from analytics import analytics_cache
+
+    frm = (datetime.utcnow() - timedelta(days=365 * years + 5)).date().isoformat()
+    to = datetime.utcnow().date().isoformat()
+
+    def analytics():
+        analytics_cache.invalidate()
+        client.get("/api/analytics").get_json()
+
+    return {
+        "report_ms": timed(lambda: client.get(f"/reports?from={frm}&to={to}").get_data(), repeat),
+        "export_ms": timed(lambda: client.get(f"/reports/export?from={frm}&to={to}").get_data(), repeat),
+        "analytics_ms": timed(analytics, repeat),
+    }
+
+
+def sizes(db_path):
+    import trade_archive
+
+    archive = 0
+    for folder, _, files in os.walk(trade_archive.ARCHIVE_DIR):
+        archive += sum(os.path.getsize(os.path.join(folder, f)) for f in files)
+    return {"db_mb": round(os.path.getsize(db_path) / 2**20, 1), "archive_mb": round(archive / 2**20, 1)}
+
+
+def run(users, years, per_day, repeat):
+    import db_config
+    import trade_archive
+    from app import create_app
+    from models import Trade
+
+    db_path = os.path.join(TMP, "bench.db")
+    uri = f"sqlite:///{db_path}"
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri})
+    seed(app, users, years, per_day)
+
+    client = app.test_client()
+    client.post("/login", data={"email": "user0@example.com", "password": "benchmark"})
+
+    def hot_rows():
+        with app.app_context():
+            return Trade.query.count()
+
+    result = {"users": users, "years": years, "per_day": per_day}
+    result["all_hot"] = dict(measure(app, client, years, repeat), hot_rows=hot_rows(), **sizes(db_path))
+
+    engine = db_config.create_engine(uri)
+    t0 = time.perf_counter()
+    moved = trade_archive.roll(engine, log=lambda _: None)
+    roll_s = time.perf_counter() - t0
+    with engine.connect() as conn:
+        # give the freed pages back, as a maintenance job would
+        conn.exec_driver_sql("VACUUM")
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    result["tiered"] = dict(measure(app, client, years, repeat), hot_rows=hot_rows(), **sizes(db_path))
+    result["roll"] = {"rows": moved, "seconds": round(roll_s, 1)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="reports over hot vs archived trades")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--per-day", type=int, default=20, help="trades per user per weekday")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="write the result as JSON to this file")
+    args = parser.parse_args()
+
+    result = run(args.users, args.years, args.per_day, args.repeat)
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
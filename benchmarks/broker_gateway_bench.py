@@ -0,0 +1,135 @@
+# benchmarks/broker_gateway_bench.py
+"""
+Load test for broker-bound endpoints: sync gthread vs the async gateway.
+
+Starts a fake Alice Blue REST server (every call answers after --delay
+seconds) and a LIVE user whose credentials point at it, then runs one
+gunicorn worker either as
+
+    sync : wsgi:application on gthread (pya3, one blocked thread per call)
+    async: broker_gateway:application on the tornado worker
+
+and hammers --path with --clients concurrent clients.
+
+    python benchmarks/broker_gateway_bench.py --mode sync
+    python benchmarks/broker_gateway_bench.py --mode async --clients 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from serve_bench import ROOT, EMAIL, PASSWORD, hammer, login, wait_up
+
+MODES = {
+    "sync": ("wsgi:application", "gthread"),
+    "async": ("broker_gateway:application", "tornado"),
+}
+
+
+def fake_broker(port, delay):
+    """Alice Blue REST stand-in: fixed latency, canned payloads."""
+    from tornado.web import Application, RequestHandler
+
+    responses = {
+        "customer/getAPIEncpkey": {"stat": "Ok", "encKey": "BENCHKEY"},
+        "customer/getUserSID": {"stat": "Ok", "sessionID": "BENCHSESSION"},
+        "customer/accountDetails": {"stat": "Ok", "accountName": "Bench User"},
+        "limits/getRmsLimits": [{"stat": "Ok", "net": 250000.0, "cashmarginavailable": 200000.0}],
+        "ScripDetails/getScripQuoteDetails": {"stat": "Ok", "LTP": "49500.05"},
+    }
+
+    class Handler(RequestHandler):
+        async def get(self, path):
+            await asyncio.sleep(delay)
+            self.write(json.dumps(responses.get(path, {"stat": "Not_ok", "emsg": path})))
+
+        post = get
+
+    async def main():
+        Application([(r"/api/(.*)", Handler)]).listen(port)
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def make_db(path):
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    from models import db, User, BrokerConnection
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    with app.app_context():
+        user = User(email=EMAIL)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(BrokerConnection(user_id=user.id, broker="aliceblue", trade_mode="LIVE",
+                                        paper_trade=False, api_key="BENCHKEY",
+                                        session_id="BENCHSESSION"))
+        db.session.commit()
+
+
+def run(mode, path, clients, seconds, delay, threads, port, broker_port):
+    tmp = tempfile.mkdtemp(prefix="gateway_bench_")
+    db_path = os.path.join(tmp, "bench.db")
+    make_db(db_path)
+
+    broker = subprocess.Popen(
+        [sys.executable, __file__, "--fake-broker", str(broker_port), "--delay", str(delay)]
+    )
+    app_module, worker_class = MODES[mode]
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", PORT=str(port),
+               WEB_CONCURRENCY="1", GUNICORN_THREADS=str(threads),
+               GUNICORN_WORKER_CLASS=worker_class,
+               ALICE_BASE_URL=f"http://127.0.0.1:{broker_port}/api/")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", app_module],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_up(port)
+        cookie = login(port)
+        hammer(port, path, cookie, clients, 2)  # warm-up
+        result = hammer(port, path, cookie, clients, seconds)
+        result.update({"mode": mode, "path": path, "clients": clients, "threads": threads,
+                       "broker_delay_ms": round(delay * 1000), "workers": 1})
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+        broker.terminate()
+        broker.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="broker-bound endpoint load test")
+    parser.add_argument("--mode", choices=sorted(MODES), default="async")
+    parser.add_argument("--path", default="/dashboard")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--delay", type=float, default=0.2, help="fake broker latency (s)")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--broker-port", type=int, default=8767)
+    parser.add_argument("--fake-broker", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help="write the result as JSON to this file")
+    args = parser.parse_args()
+
+    if args.fake_broker:
+        fake_broker(args.fake_broker, args.delay)
+        return
+
+    result = run(args.mode, args.path, args.clients, args.seconds, args.delay,
+                 args.threads, args.port, args.broker_port)
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
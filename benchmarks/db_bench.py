@@ -0,0 +1,197 @@
+# benchmarks/db_bench.py
+"""
+Mixed read/write SQLite benchmark for db_config.py.
+
+--writers separate processes play strategy loops (one trade + one paper
+trade per commit, as AliceBroker.record_trade / paper_orb.py do) while
+--readers threads in this process run the dashboard / reports queries
+against the same file. Reports read latency, commit latency and
+"database is locked" errors.
+
+    python benchmarks/db_bench.py                # db_config defaults (WAL)
+    python benchmarks/db_bench.py --baseline     # rollback journal, synchronous=FULL
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE_ENV = {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL"}
+
+
+def make_app(db_path):
+    from app import create_app
+
+    return create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}"})
+
+
+def seed(db_path, users, trades_per_user):
+    from models import db, User, Trade
+
+    app = make_app(db_path)
+    start = datetime.utcnow() - timedelta(days=365)
+    with app.app_context():
+        for u in range(users):
+            user = User(email=f"user{u}@example.com", password_hash=b"x")
+            db.session.add(user)
+            db.session.flush()
+            db.session.add_all(
+                Trade(user_id=user.id, strategy_name="banknifty_orb_vwap", symbol="BANKNIFTY",
+                      side="BUY", qty=15, entry_price=100.0, exit_price=101.0,
+                      pnl=random.uniform(-500, 500),
+                      closed_at=start + timedelta(minutes=i * 20))
+                for i in range(trades_per_user)
+            )
+        db.session.commit()
+
+
+def pct(values, p):
+    values = sorted(values)
+    return round(values[int(p * (len(values) - 1))] * 1000, 1) if values else None
+
+
+def writer(db_path, seconds, interval, users):
+    """Strategy-loop stand-in: commit a trade pair every `interval` s."""
+    from sqlalchemy.exc import OperationalError
+    from models import db, Trade, PaperTrade
+
+    app = make_app(db_path)
+    latencies, locked = [], 0
+    stop = time.time() + seconds
+    with app.app_context():
+        while time.time() < stop:
+            t0 = time.perf_counter()
+            try:
+                now = datetime.utcnow()
+                db.session.add(Trade(user_id=random.randint(1, users), strategy_name="bench",
+                                     symbol="BANKNIFTY", side="SELL", qty=15, entry_price=100.0,
+                                     exit_price=99.0, pnl=-15.0, closed_at=now))
+                db.session.add(PaperTrade(symbol="BANKNIFTY", side="BUY", qty=15,
+                                          entry_price=100.0, trade_date=now))
+                db.session.commit()
+                latencies.append(time.perf_counter() - t0)
+            except OperationalError:
+                db.session.rollback()
+                locked += 1
+            time.sleep(interval)
+    print(json.dumps({"latencies": latencies, "locked": locked}))
+
+
+def reader_queries(user_id):
+    """What /dashboard and /reports run against the trade tables."""
+    from sqlalchemy import case, func
+    from models import db, Trade, PaperTrade
+
+    month = datetime.utcnow() - timedelta(days=30)
+    db.session.query(
+        func.count(Trade.id), func.coalesce(func.sum(Trade.pnl), 0.0),
+        func.coalesce(func.sum(case((Trade.pnl > 0, 1), else_=0)), 0),
+    ).filter(Trade.user_id == user_id, Trade.closed_at >= month).one()
+    Trade.query.filter_by(user_id=user_id).order_by(Trade.closed_at.asc()).limit(50).all()
+    PaperTrade.query.order_by(PaperTrade.id.desc()).limit(20).all()
+    db.session.rollback()  # end the read, as a request teardown would
+
+
+def run(baseline, readers, writers, seconds, interval, users, trades):
+    if baseline:
+        os.environ.update(BASELINE_ENV)
+    tmp = tempfile.mkdtemp(prefix="db_bench_")
+    db_path = os.path.join(tmp, "bench.db")
+    seed(db_path, users, trades)
+
+    procs = [
+        subprocess.Popen(
+            [sys.executable, __file__, "--writer", db_path, "--seconds", str(seconds),
+             "--interval", str(interval), "--users", str(users)],
+            stdout=subprocess.PIPE, env=os.environ.copy(),
+        )
+        for _ in range(writers)
+    ]
+
+    from sqlalchemy.exc import OperationalError
+    from models import db
+
+    app = make_app(db_path)
+    read_lat, read_locked = [], [0]
+    lock = threading.Lock()
+    stop = time.time() + seconds
+
+    def read_loop():
+        mine, bad = [], 0
+        with app.app_context():
+            while time.time() < stop:
+                t0 = time.perf_counter()
+                try:
+                    reader_queries(random.randint(1, users))
+                    mine.append(time.perf_counter() - t0)
+                except OperationalError:
+                    db.session.rollback()
+                    bad += 1
+        with lock:
+            read_lat.extend(mine)
+            read_locked[0] += bad
+
+    threads = [threading.Thread(target=read_loop) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    write_lat, write_locked = [], 0
+    for p in procs:
+        out = json.loads(p.communicate()[0].decode().strip().splitlines()[-1])
+        write_lat += out["latencies"]
+        write_locked += out["locked"]
+
+    with app.app_context():
+        journal = db.session.execute(db.text("PRAGMA journal_mode")).scalar()
+    return {
+        "mode": "baseline" if baseline else "db_config",
+        "journal_mode": journal,
+        "readers": readers, "writers": writers, "seconds": seconds,
+        "reads_per_s": round(len(read_lat) / seconds, 1),
+        "read_p50_ms": pct(read_lat, 0.5), "read_p95_ms": pct(read_lat, 0.95),
+        "read_p99_ms": pct(read_lat, 0.99), "read_max_ms": pct(read_lat, 1.0),
+        "read_locked_errors": read_locked[0],
+        "commits_per_s": round(len(write_lat) / seconds, 1),
+        "commit_p50_ms": pct(write_lat, 0.5), "commit_p95_ms": pct(write_lat, 0.95),
+        "commit_max_ms": pct(write_lat, 1.0),
+        "write_locked_errors": write_locked,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mixed read/write SQLite benchmark")
+    parser.add_argument("--baseline", action="store_true")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--interval", type=float, default=0.05, help="writer pause between commits")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--trades", type=int, default=200, help="seeded trades per user")
+    parser.add_argument("--writer", metavar="DB", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help="write the result as JSON to this file")
+    args = parser.parse_args()
+
+    if args.writer:
+        return writer(args.writer, args.seconds, args.interval, args.users)
+
+    result = run(args.baseline, args.readers, args.writers, args.seconds, args.interval,
+                 args.users, args.trades)
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
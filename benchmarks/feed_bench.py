@@ -0,0 +1,197 @@
+# benchmarks/feed_bench.py
+"""
+Tick normalization + dispatch: per-tick dicts vs the Tick ring.
+
+Feeds the same pre-built dhanhq-style packets (what MarketFeed.get_data()
+returns) through two pipelines in one thread, in socket-sized batches:
+
+    dicts   normalize each packet into a new dict, put it on a per-listener
+            deque, pop it and call the strategy (the market_feed layout
+            before the ring)
+    ring    FeedManager.publish() into the preallocated TickRing, then
+            Listener.drain() hands the strategy one reused Tick
+
+The strategy callback keeps the last price per instrument, keyed the
+way each pipeline keys ticks. Reported per pipeline:
+
+    ticks_per_s        sustained normalize + dispatch rate
+    bytes_per_tick     tracemalloc high-water above the steady state per
+                       batch, divided by the batch size (what the ticks
+                       in flight cost; CPython has no per-call allocation
+                       counter, so this is the allocation measure)
+    backlog_kb         memory held by --backlog undelivered ticks
+
+    python benchmarks/feed_bench.py --ticks 500000 --instruments 200
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from market_feed import NSE_FNO, DhanPackets, FeedManager  # noqa: E402
+
+
+def make_packets(instruments, count):
+    ids = [40000 + i for i in range(instruments)]
+    packets = []
+    for i in range(count):
+        packets.append({
+            "type": "Quote Data", "exchange_segment": NSE_FNO, "security_id": random.choice(ids),
+            "LTP": f"{random.uniform(100, 500):.2f}", "LTQ": 15, "LTT": f"10:{i // 600 % 60:02d}:{i // 10 % 60:02d}",
+            "avg_price": "250.00", "volume": 1000 + i, "total_sell_quantity": 0, "total_buy_quantity": 0,
+        })
+    return packets
+
+
+# ---------- dicts: one dict per tick, one deque per listener ----------
+
+class DictPipeline:
+    def __init__(self):
+        self.queue = deque()
+        self.last = {}
+
+    @staticmethod
+    def normalize(raw, received):
+        ltp = raw.get("LTP")
+        if ltp is None:
+            return None
+        ltt = raw.get("LTT")
+        volume = raw.get("volume")
+        return {
+            "source": "dhan",
+            "segment": int(raw["exchange_segment"]),
+            "security_id": int(raw["security_id"]),
+            "ltp": float(ltp),
+            "volume": int(volume) if volume is not None else None,
+            "ts": datetime.combine(datetime.today(), datetime.strptime(ltt, "%H:%M:%S").time()),
+            "received": received,
+        }
+
+    def strategy(self, tick):
+        self.last[(tick["segment"], tick["security_id"])] = tick["ltp"]
+
+    def publish(self, packets, received):
+        for packet in packets:
+            tick = self.normalize(packet, received)
+            if tick:
+                self.queue.append(tick)
+
+    def dispatch(self):
+        queue, strategy = self.queue, self.strategy
+        while queue:
+            strategy(queue.popleft())
+
+
+# ---------- ring: FeedManager.publish + Listener.drain ----------
+
+class RingPipeline:
+    def __init__(self, ring_size):
+        self.feed = FeedManager(lambda instruments: None, name="bench", ring_size=ring_size)
+        self.conn = DhanPackets()
+        self.listener = self.feed.listen()
+        self.last = {}
+
+    def strategy(self, tick):
+        self.last[tick.key] = tick.ltp
+
+    def publish(self, packets, received):
+        self.feed.publish(self.conn, packets, received)
+
+    def dispatch(self):
+        self.listener.drain(self.strategy)
+
+
+PIPELINES = {"dicts": lambda args: DictPipeline(), "ring": lambda args: RingPipeline(args.ring_size)}
+
+
+def batches(packets, batch, total):
+    for start in range(0, total, batch):
+        i = start % len(packets)
+        yield packets[i:i + batch]
+
+
+def throughput(make, packets, batch, total):
+    pipe = make()
+    chunks = list(batches(packets, batch, total))
+    t0 = time.perf_counter()
+    for chunk in chunks:
+        pipe.publish(chunk, time.time())
+        pipe.dispatch()
+    return round(total / (time.perf_counter() - t0))
+
+
+def bytes_per_tick(make, packets, batch, total):
+    pipe = make()
+    chunks = list(batches(packets, batch, total))
+    for chunk in chunks[:50]:  # warm up: instrument dicts, ring slots, caches
+        pipe.publish(chunk, time.time())
+        pipe.dispatch()
+    tracemalloc.start()
+    high = 0
+    for chunk in chunks:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        pipe.publish(chunk, time.time())
+        pipe.dispatch()
+        high += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return round(high / total, 1)
+
+
+def backlog_kb(make, packets, backlog):
+    pipe = make()
+    pipe.publish(packets[:100], time.time())  # allocate per-instrument state first
+    pipe.dispatch()
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for chunk in batches(packets, 100, backlog):
+        pipe.publish(chunk, time.time())
+    held = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return round(held / 1024, 1)
+
+
+def run(args):
+    random.seed(7)
+    packets = make_packets(args.instruments, 20000)
+    result = {"ticks": args.ticks, "instruments": args.instruments, "batch": args.batch,
+              "ring_size": args.ring_size}
+    for name, factory in PIPELINES.items():
+        make = lambda: factory(args)  # noqa: E731
+        result[name] = {
+            "ticks_per_s": throughput(make, packets, args.batch, args.ticks),
+            "bytes_per_tick": bytes_per_tick(make, packets, args.batch, min(args.ticks, 100000)),
+            "backlog_kb": backlog_kb(make, packets, min(args.backlog, args.ring_size)),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="tick normalize + dispatch: dicts vs ring")
+    parser.add_argument("--ticks", type=int, default=500000)
+    parser.add_argument("--instruments", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=100, help="packets per socket read")
+    parser.add_argument("--ring-size", type=int, default=16384)
+    parser.add_argument("--backlog", type=int, default=10000, help="undelivered ticks for backlog_kb")
+    parser.add_argument("--out", help="write the result as JSON to this file")
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# benchmarks/login_bench.py
+"""
+Credential-stuffing load test for /login.
+
+--attackers threads post wrong passwords for random victim accounts (and
+unknown emails) from a pool of --ips client addresses, while one real
+user (who logged in from that address before the attack) logs in again
+every --every seconds. Reports the real user's login latency and outcome
+plus what the attackers got back.
+
+    python benchmarks/login_bench.py                 # throttles + bounded hash pool
+    python benchmarks/login_bench.py --baseline      # no throttles, unbounded queue
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import Counter
+
+from serve_bench import ROOT, EMAIL, PASSWORD, wait_up
+
+VICTIMS = 50
+REAL_IP = "192.168.1.10"
+
+
+def make_db(path, rounds):
+    sys.path.insert(0, ROOT)
+    os.environ["BCRYPT_ROUNDS"] = str(rounds)
+    from app import create_app
+    from models import db, User
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    with app.app_context():
+        for email in [EMAIL] + [f"victim{i}@example.com" for i in range(VICTIMS)]:
+            user = User(email=email)
+            user.set_password(PASSWORD if email == EMAIL else os.urandom(8).hex())
+            db.session.add(user)
+        db.session.commit()
+
+
+def post_login(port, email, password, ip):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    body = urllib.parse.urlencode({"email": email, "password": password})
+    conn.request("POST", "/login", body=body, headers={
+        "Content-Type": "application/x-www-form-urlencoded", "X-Forwarded-For": ip,
+    })
+    resp = conn.getresponse()
+    resp.read()
+    conn.close()
+    ok = resp.status == 302 and resp.getheader("Location", "").endswith("/dashboard")
+    return "ok" if ok else str(resp.status)
+
+
+def run(baseline, attackers, ips, seconds, every, rounds, port):
+    tmp = tempfile.mkdtemp(prefix="login_bench_")
+    db_path = os.path.join(tmp, "bench.db")
+    make_db(db_path, rounds)
+
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", PORT=str(port),
+               WEB_CONCURRENCY="1", PROXY_FIX_HOPS="1", BCRYPT_ROUNDS=str(rounds),
+               GUNICORN_MAX_REQUESTS="0")
+    if baseline:
+        env.update(LOGIN_IP_BURST="0", LOGIN_ACCOUNT_BURST="0", HASH_QUEUE="100000",
+                   HASH_WORKERS=env.get("GUNICORN_THREADS", "4"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "broker_gateway:application"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    stop = time.time() + seconds
+    attack, legit, latencies = Counter(), Counter(), []
+    lock = threading.Lock()
+
+    def attacker(n):
+        rng = random.Random(n)
+        while time.time() < stop:
+            email = (f"victim{rng.randrange(VICTIMS)}@example.com" if rng.random() < 0.5
+                     else f"nobody{rng.randrange(10 ** 6)}@example.com")
+            n_ip = rng.randrange(ips)
+            ip = f"10.0.{n_ip // 256}.{n_ip % 256}"
+            try:
+                outcome = post_login(port, email, "hunter2", ip)
+            except OSError:
+                outcome = "error"
+            with lock:
+                attack[outcome] += 1
+
+    def real_user():
+        time.sleep(every)
+        while time.time() < stop:
+            t0 = time.perf_counter()
+            try:
+                outcome = post_login(port, EMAIL, PASSWORD, REAL_IP)
+            except OSError:
+                outcome = "error"
+            with lock:
+                legit[outcome] += 1
+                latencies.append(time.perf_counter() - t0)
+            time.sleep(max(0.0, every - (time.perf_counter() - t0)))
+
+    try:
+        wait_up(port)
+        post_login(port, EMAIL, PASSWORD, REAL_IP)
+        threads = [threading.Thread(target=attacker, args=(i,)) for i in range(attackers)]
+        threads.append(threading.Thread(target=real_user))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    pct = lambda p: round(latencies[int(p * (len(latencies) - 1))] * 1000) if latencies else None
+    return {
+        "mode": "baseline" if baseline else "protected",
+        "attackers": attackers, "ips": ips, "bcrypt_rounds": rounds, "seconds": seconds,
+        "real_user_every_s": every,
+        "real_user": {"outcomes": dict(legit), "p50_ms": pct(0.5), "p95_ms": pct(0.95),
+                      "max_ms": pct(1.0)},
+        "attackers_got": dict(attack),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="login credential-stuffing load test")
+    parser.add_argument("--baseline", action="store_true")
+    parser.add_argument("--attackers", type=int, default=30)
+    parser.add_argument("--ips", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--every", type=float, default=5, help="real user's login interval")
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--out", help="write the result as JSON to this file")
+    args = parser.parse_args()
+
+    result = run(args.baseline, args.attackers, args.ips, args.seconds, args.every,
+                 args.rounds, args.port)
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
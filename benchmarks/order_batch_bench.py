@@ -0,0 +1,95 @@
+# benchmarks/order_batch_bench.py
+"""
+How far behind the first user the last user's order reaches the broker
+when one signal fires for N accounts.
+
+Every account is an AliceVenue over a fake broker that answers each
+call after --latency ms (one HTTPS round trip). Orders are submitted
+through OrderManager the way the runner does it:
+
+    serial    one submit() after another (the runner before batching)
+    batched   the same submits inside orders.batch()
+
+--legs 2 sends two orders per account (a bracket's stop and target),
+which the batch turns into one basket call per account. Reports when
+the first and the last placement call returned, in ms after the signal.
+
+    python benchmarks/order_batch_bench.py --users 50 --latency 80
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from order_manager import AliceVenue, OrderManager  # noqa: E402
+
+
+class FakeBroker:
+    def __init__(self, latency, acked):
+        self.latency, self.acked, self.n = latency, acked, 0
+
+    def _call(self, count):
+        time.sleep(self.latency)
+        self.acked.extend([time.perf_counter()] * count)
+
+    def send_order(self, symbol, side, qty, price=None, trigger_price=None, tag=None):
+        self._call(1)
+        self.n += 1
+        return f"{id(self)}-{self.n}"
+
+    def send_basket(self, orders):
+        self._call(len(orders))
+        self.n += len(orders)
+        return [f"{id(self)}-{self.n}-{i}" for i in range(len(orders))]
+
+
+def run_mode(args, batched):
+    acked = []  # list.extend is atomic, safe from the placement threads
+    venues = [AliceVenue(FakeBroker(args.latency / 1000, acked)) for _ in range(args.users)]
+    manager = OrderManager()
+    t0 = time.perf_counter()
+    if batched:
+        with manager.batch():
+            _submit_all(manager, venues, args.legs)
+    else:
+        _submit_all(manager, venues, args.legs)
+    elapsed = time.perf_counter() - t0
+    manager.stop()
+    acked = sorted(acked)
+    return {
+        "orders": len(acked),
+        "first_ms": round((acked[0] - t0) * 1000, 1),
+        "last_ms": round((acked[-1] - t0) * 1000, 1),
+        "total_ms": round(elapsed * 1000, 1),
+    }
+
+
+def _submit_all(manager, venues, legs):
+    for user_id, venue in enumerate(venues):
+        for leg in range(legs):
+            manager.submit(venue, user_id, "BANKNIFTY25OCT52000CE", "BUY", 15, tag=f"L{leg}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="serial vs batched order placement across accounts")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--legs", type=int, default=1, help="orders per account")
+    parser.add_argument("--latency", type=float, default=80, help="broker round trip, ms")
+    parser.add_argument("--out", help="write the result as JSON to this file")
+    args = parser.parse_args()
+
+    result = {"users": args.users, "legs": args.legs, "latency_ms": args.latency}
+    for name, batched in (("serial", False), ("batched", True)):
+        result[name] = run_mode(args, batched)
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
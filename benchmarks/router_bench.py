@@ -0,0 +1,154 @@
+# benchmarks/router_bench.py
+"""
+What market_router.MarketRouter adds per tick, against a single feed.
+
+    cost      one thread, no sockets: the same dhanhq-style packets
+              published into one FeedManager (direct) or into two
+              (Dhan + a hot standby copy) behind a router, then drained
+              by a listener. Reports microseconds per delivered tick.
+    latency   real reader + listener threads fed by an in-process fake
+              connection at --rate ticks/s per source; time from the
+              reader receiving a batch to the strategy callback, p50/p99
+              in milliseconds, direct vs routed.
+
+    python benchmarks/router_bench.py --ticks 200000 --rate 2000
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from market_feed import NSE_FNO, QUOTE, DhanPackets, FeedManager  # noqa: E402
+from market_router import MarketRouter  # noqa: E402
+
+
+def make_packets(instruments, count):
+    packets = []
+    for i in range(count):
+        t = 36000 + i // instruments
+        packets.append({
+            "exchange_segment": NSE_FNO, "security_id": 40000 + i % instruments,
+            "LTP": f"{100 + i % 97 * 0.05:.2f}", "volume": 1000 + i,
+            "LTT": f"{t // 3600:02d}:{t // 60 % 60:02d}:{t % 60:02d}",
+        })
+    return packets
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 3)
+
+
+# ---------- cost ----------
+
+def cost(packets, routed, batch):
+    sources = [FeedManager(lambda subs: None, name=name) for name in (("dhan", "alice") if routed else ("dhan",))]
+    bus = MarketRouter(sources) if routed else sources[0]
+    listener = bus.listen()
+    conns = [DhanPackets() for _ in sources]
+    seen = {}
+
+    def strategy(tick):
+        seen[tick.key] = tick.ltp
+
+    delivered = 0
+    t0 = time.perf_counter()
+    for i in range(0, len(packets), batch):
+        chunk, received = packets[i:i + batch], time.time()
+        for feed, conn in zip(sources, conns):
+            feed.publish(conn, chunk, received)
+        delivered += listener.drain(strategy)
+    elapsed = time.perf_counter() - t0
+    return round(elapsed / delivered * 1e6, 2), delivered
+
+
+# ---------- latency ----------
+
+class PacedConnection(DhanPackets):
+    """Replays packets at a fixed rate in small batches, like a socket."""
+
+    def __init__(self, packets, rate, batch, stop):
+        super().__init__()
+        self.packets, self.rate, self.batch, self.stop = packets, rate, batch, stop
+        self.i = 0
+
+    def read(self):
+        if self.stop.is_set() or self.i >= len(self.packets):
+            self.stop.wait(0.05)
+            return ()
+        time.sleep(self.batch / self.rate)
+        chunk = self.packets[self.i:self.i + self.batch]
+        self.i += self.batch
+        return chunk
+
+    def subscribe(self, instruments):
+        pass
+
+    unsubscribe = subscribe
+
+    def interrupt(self):
+        self.stop.set()
+
+    def close(self):
+        pass
+
+
+def latency(packets, routed, rate, batch):
+    stop = threading.Event()
+    names = ("dhan", "alice") if routed else ("dhan",)
+    sources = [FeedManager(lambda subs: PacedConnection(packets, rate, batch, stop), name=name) for name in names]
+    bus = MarketRouter(sources) if routed else sources[0]
+    samples = []
+    done = threading.Event()
+
+    def strategy(tick):
+        samples.append(time.time() - tick.received)
+        if len(samples) >= len(packets):
+            done.set()
+
+    bus.listen(strategy)
+    bus.subscribe("bench", [(NSE_FNO, 40000, QUOTE)])
+    bus.start()
+    done.wait(len(packets) / rate + 10)
+    bus.stop()
+    return {"ticks": len(samples), "p50_ms": percentile(samples, 0.5), "p99_ms": percentile(samples, 0.99)}
+
+
+def run(args):
+    packets = make_packets(args.instruments, args.ticks)
+    result = {"ticks": args.ticks, "instruments": args.instruments, "batch": args.batch, "rate": args.rate}
+    for name, routed in (("direct", False), ("routed", True)):
+        us, delivered = cost(packets, routed, args.batch)
+        result[name] = {
+            "us_per_tick": us,
+            "delivered": delivered,
+            "latency": latency(packets[:args.rate * args.seconds], routed, args.rate, 10),
+        }
+    result["router_added_us_per_tick"] = round(result["routed"]["us_per_tick"] - result["direct"]["us_per_tick"], 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="market router cost and latency vs a single feed")
+    parser.add_argument("--ticks", type=int, default=200000)
+    parser.add_argument("--instruments", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=100, help="packets per socket read (cost)")
+    parser.add_argument("--rate", type=int, default=2000, help="ticks/s per source (latency)")
+    parser.add_argument("--seconds", type=int, default=5, help="length of the latency run")
+    parser.add_argument("--out", help="write the result as JSON to this file")
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
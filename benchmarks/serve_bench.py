@@ -0,0 +1,192 @@
+# benchmarks/serve_bench.py
+"""
+Serving benchmark for gunicorn.conf.py sizing.
+
+Starts gunicorn on a throwaway SQLite DB with one paper user, logs in,
+warms every worker (dashboard + analytics, so lazily imported modules
+are loaded), then hammers one path with N client threads and reports
+throughput, latency percentiles and per-worker RSS / PSS.
+
+    python benchmarks/serve_bench.py --workers 2 --threads 4
+    python benchmarks/serve_bench.py --workers 2 --threads 4 --no-preload
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMAIL, PASSWORD = "bench@example.com", "bench-password"
+
+
+def make_db(path):
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    from models import db, User, BrokerConnection
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    with app.app_context():
+        user = User(email=EMAIL)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(BrokerConnection(user_id=user.id, trade_mode="PAPER", paper_trade=True))
+        db.session.commit()
+
+
+def request(port, method, path, body=None, cookie=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Cookie": cookie} if cookie else {}
+    if body is not None:
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    conn.request(method, path, body=body, headers=headers)
+    resp = conn.getresponse()
+    resp.read()
+    conn.close()
+    return resp
+
+
+def wait_up(port, deadline=30.0):
+    end = time.time() + deadline
+    while time.time() < end:
+        try:
+            request(port, "GET", "/login")
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not come up")
+
+
+def login(port):
+    body = urllib.parse.urlencode({"email": EMAIL, "password": PASSWORD})
+    resp = request(port, "POST", "/login", body=body)
+    cookie = resp.getheader("Set-Cookie", "").split(";", 1)[0]
+    if resp.status != 302 or not cookie:
+        raise RuntimeError(f"login failed: {resp.status}")
+    return cookie
+
+
+def worker_pids(master_pid):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except OSError:
+            continue
+        if ppid == master_pid:
+            pids.append(int(entry))
+    return pids
+
+
+def memory_kb(pid):
+    """(rss, pss) in kB from smaps_rollup."""
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                out[key] = int(rest.split()[0])
+    return out.get("Rss", 0), out.get("Pss", 0)
+
+
+def hammer(port, path, cookie, clients, seconds):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop = time.time() + seconds
+
+    def client():
+        mine, bad = [], 0
+        while time.time() < stop:
+            t0 = time.perf_counter()
+            try:
+                if request(port, "GET", path, cookie=cookie).status != 200:
+                    bad += 1
+            except OSError:
+                bad += 1
+            mine.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(mine)
+            errors[0] += bad
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    pct = lambda p: round(latencies[int(p * (len(latencies) - 1))] * 1000, 1) if latencies else None
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "req_per_s": round(len(latencies) / seconds, 1),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+def run(workers, threads, preload, path, clients, seconds, port):
+    tmp = tempfile.mkdtemp(prefix="serve_bench_")
+    db_path = os.path.join(tmp, "bench.db")
+    make_db(db_path)
+
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", PORT=str(port),
+               WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads),
+               GUNICORN_PRELOAD="1" if preload else "0", GUNICORN_WORKER_CLASS="gthread")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:application"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_up(port)
+        cookie = login(port)
+        # Enough warm-up traffic to reach every worker
+        hammer(port, "/api/analytics", cookie, clients, 2)
+        hammer(port, path, cookie, clients, 2)
+
+        result = hammer(port, path, cookie, clients, seconds)
+        mem = [memory_kb(pid) for pid in worker_pids(proc.pid)]
+        result.update({
+            "workers": workers, "threads": threads, "preload": preload,
+            "path": path, "clients": clients, "cpus": os.cpu_count(),
+            "rss_mb_per_worker": round(sum(r for r, _ in mem) / len(mem) / 1024, 1),
+            "pss_mb_per_worker": round(sum(p for _, p in mem) / len(mem) / 1024, 1),
+        })
+        return result
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="gunicorn serving benchmark")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--no-preload", dest="preload", action="store_false")
+    parser.add_argument("--path", default="/dashboard")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--out", help="write the result as JSON to this file")
+    args = parser.parse_args()
+
+    result = run(args.workers, args.threads, args.preload, args.path,
+                 args.clients, args.seconds, args.port)
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+# benchmarks/suite.py
+"""
+Offline benchmark suite for the hot paths, with results kept as JSON so
+runs can be compared between commits. Everything runs in this process
+on synthetic data with fixed seeds; no broker or network is touched
+(the dashboard case talks to a local fake Alice Blue server).
+
+    orb_candles     BankNiftyOrbVwap.on_1min_candle (+ exits) over --days
+                    of random-walk 1-minute candles
+    strategy_ticks  StrategyRunner.dispatch_tick + timer with --instances
+                    banknifty_orb_vwap strategies, 1-second ticks 09:15-10:00
+    feed            market_feed tick normalize + ring dispatch (feed_bench)
+    reports         analytics columns / metrics (equity curve), /api/analytics,
+                    /reports and /reports/export over --years of trades
+    dashboard       /dashboard for a LIVE user the way broker_gateway serves
+                    it: AliceSession.snapshot() against a fake broker with
+                    --broker-ms latency, then the Flask view
+
+Metrics ending in _per_s are better higher; _ms, _us and _kb better lower.
+Other values (sizes, signal counts) are recorded but not compared.
+
+    python benchmarks/suite.py                        # -> benchmarks/results/<commit>.json
+    python benchmarks/suite.py --quick --only orb_candles,feed
+    python benchmarks/suite.py --compare benchmarks/results/abc1234.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP = tempfile.mkdtemp(prefix="bench_suite_")
+os.environ.setdefault("TRADE_ARCHIVE_DIR", os.path.join(TMP, "archive"))
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("BROKER_RATE_ALICEBLUE", "1000000")  # time the request path, not the broker's limit
+os.environ.setdefault("BROKER_BURST_ALICEBLUE", "1000000")
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SEED = 20240801
+
+
+def best_rate(fn, count, repeat):
+    """Highest count/second over `repeat` runs of fn()."""
+    best = 0.0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = max(best, count / (time.perf_counter() - t0))
+    return round(best)
+
+
+def latency(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    pick = lambda q: round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 2)  # noqa: E731
+    return pick(0.5), pick(0.95)
+
+
+def random_walk_day(rng, day, minutes, start_price):
+    """(ts, high, low, close, volume) 1-minute candles from 09:15."""
+    candles, price = [], start_price
+    t = datetime.combine(day, datetime.min.time()).replace(hour=9, minute=15)
+    for i in range(minutes):
+        o = price
+        price += rng.gauss(0, 25)
+        high, low = max(o, price) + abs(rng.gauss(0, 8)), min(o, price) - abs(rng.gauss(0, 8))
+        candles.append((t + timedelta(minutes=i), high, low, price, rng.randint(1000, 60000)))
+    return candles, price
+
+
+def trading_days(count):
+    day, out = datetime(2024, 1, 1).date(), []
+    while len(out) < count:
+        if day.weekday() < 5:
+            out.append(day)
+        day += timedelta(days=1)
+    return out
+
+
+# ---------- orb_candles ----------
+
+def orb_candles(args):
+    from strategies.banknifty_orb_vwap import BankNiftyOrbVwap, StrategyParams
+
+    rng, price, days = random.Random(SEED), 48000.0, []
+    for day in trading_days(args.days):
+        candles, price = random_walk_day(rng, day, 375, price)
+        days.append(candles)
+    params = StrategyParams()
+    trades = []
+
+    def run():
+        trades.clear()
+        for candles in days:
+            core = BankNiftyOrbVwap(params)
+            for ts, high, low, close, volume in candles:
+                signal = core.on_1min_candle(ts, high, low, close, volume)
+                if core.in_position:
+                    if core.on_option_tick(ts, close):
+                        core.exit()
+                        trades.append(ts)
+                elif signal:
+                    core.enter(signal, close, ts)
+
+    rate = best_rate(run, args.days * 375, args.repeat)
+    return {"days": args.days, "candles_per_s": rate, "trades": len(trades)}
+
+
+# ---------- strategy_ticks ----------
+
+class _FillingContext:
+    """StrategyContext that fills every bracket on the next timer pass."""
+
+    def __init__(self):
+        self.fills, self.ids = [], 0
+
+    def pick_option(self, underlying, option_type, target_delta):
+        return None
+
+    def submit_bracket(self, strategy, symbol, side, qty, target, stop, time_limit=None, tag="ENTRY",
+                       client_id=None):
+        self.ids += 1
+        self.fills.append((strategy, tag))
+        return f"b{self.ids}"
+
+    def exit_bracket(self, strategy, client_id, reason="EXIT"):
+        self.fills.append((strategy, reason))
+        return True
+
+    def deliver(self, ts):
+        fills, self.fills = self.fills, []
+        for strategy, tag in fills:
+            strategy.on_fill({"qty": 15, "price": 100.0, "ts": ts, "tag": tag})
+        return len(fills)
+
+
+def strategy_ticks(args):
+    from run_strategy import StrategyRunner
+    from strategies.banknifty_orb_vwap import BankNiftyOrbVwapStrategy
+
+    rng, price, ticks = random.Random(SEED), 48000.0, []
+    start = datetime(2024, 1, 2, 9, 15)
+    for i in range(45 * 60):
+        price += rng.gauss(0, 4)
+        ticks.append((start + timedelta(seconds=i), round(price, 2), rng.randint(0, 400)))
+
+    fills = [0]
+
+    def run():
+        ctx = _FillingContext()
+        runner = StrategyRunner(registry=None)
+        for i in range(args.instances):
+            runner.instances[i] = ("banknifty_orb_vwap", BankNiftyOrbVwapStrategy(None, ctx))
+        for ts, ltp, volume in ticks:
+            runner.dispatch_tick("BANKNIFTY", ltp, volume, ts)
+            runner.timer(ts)
+            fills[0] += ctx.deliver(ts)
+
+    rate = best_rate(run, len(ticks), args.repeat)
+    return {
+        "instances": args.instances,
+        "ticks_per_s": rate,
+        "strategy_calls_per_s": rate * args.instances,
+        "fills": fills[0] // args.repeat,
+    }
+
+
+# ---------- feed ----------
+
+def feed(args):
+    import feed_bench
+
+    random.seed(SEED)
+    packets = feed_bench.make_packets(200, 20000)
+    make = lambda: feed_bench.RingPipeline(16384)  # noqa: E731
+    return {
+        "ticks_per_s": max(feed_bench.throughput(make, packets, 100, args.ticks) for _ in range(args.repeat)),
+        "bytes_per_tick": feed_bench.bytes_per_tick(make, packets, 100, min(args.ticks, 100000)),
+    }
+
+
+# ---------- shared app for reports / dashboard ----------
+
+_app = None
+
+
+def shared_app():
+    global _app
+    if _app is None:
+        import archive_bench
+        from app import create_app
+
+        random.seed(SEED)
+        _app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(TMP, 'suite.db')}"})
+        archive_bench.seed(_app, 1, _ARGS.years, _ARGS.per_day)  # user0@example.com / "benchmark"
+    return _app
+
+
+def reports(args):
+    from analytics import analytics_cache, compute_metrics, load_columns
+    from models import Trade
+
+    flask_app = shared_app()
+    client = flask_app.test_client()
+    client.post("/login", data={"email": "user0@example.com", "password": "benchmark"})
+    frm = (datetime.utcnow() - timedelta(days=365 * args.years + 5)).date().isoformat()
+    to = datetime.utcnow().date().isoformat()
+
+    with flask_app.app_context():
+        trades = Trade.query.count()
+        columns_ms, _ = latency(lambda: load_columns(1), args.repeat)
+        cols = load_columns(1)
+        metrics_ms, _ = latency(lambda: compute_metrics(*cols), args.repeat)
+
+    def analytics():
+        analytics_cache.invalidate()
+        client.get("/api/analytics").get_json()
+
+    return {
+        "trades": trades,
+        "load_columns_ms": columns_ms,
+        "compute_metrics_ms": metrics_ms,
+        "analytics_ms": latency(analytics, args.repeat)[0],
+        "reports_ms": latency(lambda: client.get(f"/reports?from={frm}&to={to}").get_data(), args.repeat)[0],
+        "export_ms": latency(lambda: client.get(f"/reports/export?from={frm}&to={to}").get_data(),
+                             args.repeat)[0],
+    }
+
+
+# ---------- dashboard ----------
+
+def _free_port():
+    import socket
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def dashboard(args):
+    from broker_gateway_bench import fake_broker
+
+    from alice_async import AliceSession
+    from broker_routes import GATEWAY_RESULT
+    from models import db, BrokerConnection, User
+
+    port = _free_port()
+    threading.Thread(target=fake_broker, args=(port, args.broker_ms / 1000), daemon=True).start()
+    base = f"http://127.0.0.1:{port}/api/"
+
+    flask_app = shared_app()
+    with flask_app.app_context():
+        user = db.session.get(User, 1)
+        conn = BrokerConnection.query.filter_by(user_id=1).first() or BrokerConnection(user_id=1)
+        conn.broker, conn.trade_mode, conn.paper_trade = "aliceblue", "LIVE", False
+        conn.api_key, conn.session_id = "BENCHKEY", "BENCHSESSION"
+        db.session.add(conn)
+        db.session.commit()
+        email = user.email
+
+    client = flask_app.test_client()
+    client.post("/login", data={"email": email, "password": "benchmark"})
+    session = AliceSession(email, "BENCHKEY", "BENCHSESSION", base=base)
+    loop = asyncio.new_event_loop()
+    for _ in range(50):  # wait for the fake broker to listen
+        try:
+            loop.run_until_complete(session.get_profile())
+            break
+        except Exception:
+            time.sleep(0.1)
+
+    def request(snapshot=None):
+        snapshot = snapshot or loop.run_until_complete(session.snapshot())
+        resp = client.get("/dashboard", environ_overrides={GATEWAY_RESULT: snapshot})
+        assert resp.status_code == 200, resp.status_code
+        resp.get_data()
+
+    request()  # warm: templates, lazy imports
+    fetched = loop.run_until_complete(session.snapshot())
+    view_only = lambda: request(fetched)  # noqa: E731
+    p50, p95 = latency(request, args.requests)
+    view_p50, _ = latency(view_only, args.requests)
+    loop.close()
+    return {"broker_delay_s": args.broker_ms / 1000, "requests": args.requests,
+            "p50_ms": p50, "p95_ms": p95, "view_p50_ms": view_p50}
+
+
+CASES = {
+    "orb_candles": orb_candles,
+    "strategy_ticks": strategy_ticks,
+    "feed": feed,
+    "reports": reports,
+    "dashboard": dashboard,
+}
+_ARGS = None
+
+
+# ---------- results ----------
+
+def git(*cmd):
+    try:
+        return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+    except Exception:
+        return ""
+
+
+def meta(args):
+    import numpy
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD") or "unknown",
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "quick": args.quick,
+    }
+
+
+def direction(metric):
+    if metric.endswith("_per_s"):
+        return 1
+    if metric.endswith(("_ms", "_us", "_kb")) or metric == "bytes_per_tick":
+        return -1
+    return 0
+
+
+def compare(base, new, threshold):
+    """Print per-metric changes; returns the regressions beyond `threshold` percent."""
+    regressions = []
+    print(f"\n{'metric':40} {base['meta']['commit']:>12} {new['meta']['commit']:>12}   change")
+    for case, metrics in new["cases"].items():
+        old = base["cases"].get(case, {})
+        for metric, value in metrics.items():
+            sign = direction(metric)
+            if not sign or metric not in old or not old[metric]:
+                continue
+            change = (value - old[metric]) / old[metric] * 100
+            worse = -change * sign > threshold
+            if worse:
+                regressions.append(f"{case}.{metric}")
+            print(f"{case + '.' + metric:40} {old[metric]:>12} {value:>12}   {change:+.1f}%"
+                  + ("  REGRESSION" if worse else ""))
+    return regressions
+
+
+def main():
+    global _ARGS
+    parser = argparse.ArgumentParser(description="offline benchmark suite with JSON results")
+    parser.add_argument("--only", help="comma-separated cases: " + ",".join(CASES))
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for a fast check")
+    parser.add_argument("--repeat", type=int, default=None, help="runs per measurement")
+    parser.add_argument("--days", type=int, default=None, help="orb_candles: trading days")
+    parser.add_argument("--instances", type=int, default=None, help="strategy_ticks: strategy instances")
+    parser.add_argument("--ticks", type=int, default=None, help="feed: ticks")
+    parser.add_argument("--years", type=int, default=None, help="reports: years of trades")
+    parser.add_argument("--per-day", type=int, default=None, help="reports: trades per weekday")
+    parser.add_argument("--requests", type=int, default=None, help="dashboard: requests")
+    parser.add_argument("--broker-ms", type=float, default=20, help="dashboard: fake broker latency")
+    parser.add_argument("--out", help="result file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=10, help="percent worse that counts as a regression")
+    args = parser.parse_args()
+
+    sizes = dict(repeat=(2, 5), days=(50, 250), instances=(10, 50), ticks=(100000, 500000),
+                 years=(1, 3), per_day=(20, 100), requests=(20, 100))
+    for name, (quick, full) in sizes.items():
+        if getattr(args, name) is None:
+            setattr(args, name, quick if args.quick else full)
+    _ARGS = args
+
+    names = args.only.split(",") if args.only else list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    result = {"meta": meta(args), "cases": {}}
+    for name in names:
+        t0 = time.perf_counter()
+        result["cases"][name] = CASES[name](args)
+        print(f"[bench] {name} ({time.perf_counter() - t0:.1f}s): {json.dumps(result['cases'][name])}")
+
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        suffix = "-dirty" if result["meta"]["dirty"] else ""
+        out = os.path.join(RESULTS_DIR, f"{result['meta']['commit']}{suffix}.json")
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"[bench] results written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), result, args.threshold)
+        if regressions:
+            print(f"\n[bench] {len(regressions)} regression(s) over {args.threshold:g}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
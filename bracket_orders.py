@@ -0,0 +1,294 @@
+# bracket_orders.py
+"""
+Target / stop-loss / time exits attached to an entry order.
+
+BracketManager.submit() sends the entry through the OrderManager. Once
+it fills, the exit legs go out for the filled quantity, priced off the
+average fill:
+
+    venue.supports_oco   stop and target both rest at the venue in one
+                         OCO group; the venue cancels one when the other fills
+    venue.supports_stop  the stop rests at the venue, the target is watched
+                         locally (two unlinked resting orders could both fill)
+    neither              both are watched locally, through on_tick()
+
+A resting stop executes at the venue however late this process gets to
+its next tick. Locally watched exits, the time limit and exit() all go
+the same way: cancel the resting legs, wait for the venue to confirm,
+and only then send a market exit. A stop that fills in the meantime
+closes the bracket instead, so an exit is never doubled. A leg the
+venue rejects falls back to local watching.
+
+A cancel that fails is retried on every on_timer(). If the venue has
+not confirmed the cancels BRACKET_CANCEL_SECONDS after the exit began,
+the remaining quantity goes out at market anyway, so a broken cancel
+cannot keep a position open. The legs are still cancelled, and one
+that fills after that is logged as an over-exit to settle by hand.
+
+A market exit the venue rejects or cancels is sent again for whatever
+is still open, BRACKET_EXIT_RETRY_SECONDS later, doubling up to a
+minute. After BRACKET_EXIT_RETRIES failures the bracket is flagged for
+review (it keeps retrying): the position has no stop while it waits.
+
+Brackets live in memory; after a restart, resting legs stay at the venue
+and are reconciled as plain orders.
+"""
+import os
+import time
+
+from order_manager import CANCELLED, FILLED, REJECTED
+
+STOP_LIMIT_SLACK = float(os.environ.get("STOP_LIMIT_SLACK", 0.05))  # stop-limit price beyond the trigger
+BRACKET_CANCEL_SECONDS = float(os.environ.get("BRACKET_CANCEL_SECONDS", 10))  # wait for leg cancels, then exit
+BRACKET_EXIT_RETRY_SECONDS = float(os.environ.get("BRACKET_EXIT_RETRY_SECONDS", 2))  # first resend of a failed exit
+BRACKET_EXIT_RETRY_MAX_SECONDS = 60
+BRACKET_EXIT_RETRIES = int(os.environ.get("BRACKET_EXIT_RETRIES", 3))  # failures before flagging for review
+TICK_SIZE = 0.05
+
+ENTRY, OPEN, EXITING, CLOSED = "ENTRY", "OPEN", "EXITING", "CLOSED"
+
+
+def _round_tick(price):
+    return round(round(price / TICK_SIZE) * TICK_SIZE, 2)
+
+
+class Bracket:
+    def __init__(self, entry, target, stop, time_limit, strategy):
+        self.entry = entry                # ManagedOrder
+        self.target_points = target
+        self.stop_points = stop
+        self.time_limit = time_limit      # seconds after the entry fill, or None
+        self.strategy = strategy
+        self.state = ENTRY
+        self.reason = None                # why it closed / is exiting
+        self.target_price = None
+        self.stop_price = None
+        self.deadline = None              # time.time()
+        self.exiting_since = None         # time.time() exit() began cancelling the legs
+        self.uncancelled = set()          # legs whose cancel the venue refused, retried by on_timer
+        self.legs = []                    # resting exit orders
+        self.exit_order = None
+        self.failed_exits = []            # rejected / cancelled market exits (may hold partial fills)
+        self.retry_at = None              # time.time() to resend a failed exit
+        self.review = False               # exits keep failing: needs a human
+        self.local_target = self.local_stop = False
+
+    @property
+    def id(self):
+        return self.entry.client_id
+
+    @property
+    def exit_side(self):
+        return "SELL" if self.entry.side == "BUY" else "BUY"
+
+    def crossed(self, ltp):
+        """'TARGET_EXIT' / 'STOP_EXIT' if a locally watched level has traded."""
+        long = self.entry.side == "BUY"
+        if self.local_stop and (ltp <= self.stop_price if long else ltp >= self.stop_price):
+            return "STOP_EXIT"
+        if self.local_target and (ltp >= self.target_price if long else ltp <= self.target_price):
+            return "TARGET_EXIT"
+        return None
+
+
+class BracketManager:
+    def __init__(self, orders):
+        self.orders = orders              # OrderManager
+        self.brackets = {}                # entry client_id -> Bracket
+        self._by_leg = {}                 # leg / exit client_id -> Bracket
+
+    def submit(self, venue, user_id, symbol, side, qty, target, stop, time_limit=None,
+               price=None, tag="ENTRY", client_id=None, strategy=None) -> Bracket:
+        """Entry order with exits `target` / `stop` price points away from its fill."""
+        entry = self.orders.submit(venue, user_id, symbol, side, qty, price=price, tag=tag,
+                                   client_id=client_id, strategy=strategy, listener=self._on_entry)
+        bracket = self.brackets.get(entry.client_id)
+        if bracket is None:
+            bracket = self.brackets[entry.client_id] = Bracket(entry, target, stop, time_limit, strategy)
+            if entry.done:
+                self._on_entry(entry, 0)  # settled during placement
+        return bracket
+
+    def open_brackets(self):
+        return [b for b in self.brackets.values() if b.state in (OPEN, EXITING)]
+
+    def watching(self) -> set:
+        """Symbols that need ticks for locally watched exits."""
+        return {b.entry.symbol for b in self.brackets.values()
+                if b.state == OPEN and (b.local_stop or b.local_target)}
+
+    # ---------- order events (runner thread) ----------
+
+    def _on_entry(self, entry, fill_qty):
+        bracket = self.brackets.get(entry.client_id)
+        if bracket is None or bracket.state != ENTRY or not entry.done:
+            return
+        if not entry.filled_qty:
+            bracket.state, bracket.reason = CLOSED, bracket.reason or entry.status
+            return
+        exit_reason = bracket.reason
+        self._arm(bracket)
+        if exit_reason:
+            self.exit(bracket.id, exit_reason)  # exit() came while the entry was working
+
+    def _arm(self, bracket):
+        entry, long = bracket.entry, bracket.entry.side == "BUY"
+        fill = entry.avg_price
+        bracket.target_price = _round_tick(fill + bracket.target_points if long else fill - bracket.target_points)
+        bracket.stop_price = _round_tick(fill - bracket.stop_points if long else fill + bracket.stop_points)
+        if bracket.time_limit:
+            bracket.deadline = time.time() + bracket.time_limit
+        bracket.state = OPEN
+
+        venue = entry.venue
+        oco = getattr(venue, "supports_oco", False)
+        if getattr(venue, "supports_stop", False):
+            slack = bracket.stop_price * STOP_LIMIT_SLACK
+            self._leg(bracket, "S", "STOP_EXIT", trigger_price=bracket.stop_price,
+                      price=_round_tick(bracket.stop_price - slack if long else bracket.stop_price + slack), oco=oco)
+        else:
+            bracket.local_stop = True
+        if oco:
+            self._leg(bracket, "T", "TARGET_EXIT", price=bracket.target_price, oco=True)
+        else:
+            bracket.local_target = True
+        where = "venue" if not (bracket.local_stop or bracket.local_target) else (
+            "local" if bracket.local_stop else "stop at venue, target local")
+        print(f"[bracket] {bracket.id} {entry.side} {entry.filled_qty} {entry.symbol} @ {fill}: "
+              f"target {bracket.target_price} stop {bracket.stop_price} ({where})")
+
+    def _leg(self, bracket, suffix, tag, price=None, trigger_price=None, oco=False):
+        entry = bracket.entry
+        leg = self.orders.submit(
+            entry.venue, entry.user_id, entry.symbol, bracket.exit_side, entry.filled_qty,
+            price=price, trigger_price=trigger_price, tag=tag, client_id=f"{entry.client_id[:16]}-{suffix}",
+            strategy=bracket.strategy, parent_id=entry.client_id, oco=oco, listener=self._on_leg,
+        )
+        self._by_leg[leg.client_id] = bracket
+        if suffix in ("S", "T"):
+            bracket.legs.append(leg)
+            if leg.status == REJECTED:
+                self._leg_rejected(bracket, leg)
+        return leg
+
+    def _leg_rejected(self, bracket, leg):
+        # The venue won't hold this exit: watch it locally instead
+        if leg.tag == "STOP_EXIT":
+            bracket.local_stop = True
+        else:
+            bracket.local_target = True
+        print(f"[bracket] {bracket.id} {leg.tag} leg rejected ({leg.reason}); watching it locally")
+
+    def _on_leg(self, leg, fill_qty):
+        bracket = self._by_leg.get(leg.client_id)
+        if bracket is None:
+            return
+        if bracket.exit_order is not None and leg is not bracket.exit_order:
+            if fill_qty:
+                print(f"[bracket] {bracket.id} {leg.tag} leg filled {fill_qty} after the market exit: "
+                      f"position over-exited, settle it at the broker")
+            return
+        if bracket.state == CLOSED:
+            return
+        if leg is bracket.exit_order:
+            if leg.status == FILLED:
+                bracket.state = CLOSED
+            elif leg.done:
+                self._exit_failed(bracket)
+            return
+        if leg.status == FILLED:
+            bracket.state, bracket.reason = CLOSED, leg.tag
+            self._cancel_legs(bracket)  # without venue OCO the other leg is still working
+            return
+        if leg.status == REJECTED and bracket.state == OPEN:
+            self._leg_rejected(bracket, leg)
+        if bracket.state == EXITING:
+            self._exit_when_flat(bracket)
+
+    # ---------- exits ----------
+
+    def on_tick(self, symbol, ltp, ts=None):
+        for bracket in list(self.brackets.values()):
+            if bracket.state == OPEN and bracket.entry.symbol == symbol:
+                reason = bracket.crossed(ltp)
+                if reason:
+                    self.exit(bracket.id, reason)
+
+    def on_timer(self, now=None):
+        now = now or time.time()
+        for bracket in list(self.brackets.values()):
+            if bracket.state == OPEN and bracket.deadline and now >= bracket.deadline:
+                self.exit(bracket.id, "TIME_EXIT")
+            elif bracket.uncancelled:
+                self._cancel_legs(bracket, retry=True)
+            if bracket.state != EXITING or bracket.exit_order is not None:
+                continue
+            if bracket.retry_at is not None:
+                if now >= bracket.retry_at:
+                    self._exit_when_flat(bracket, force=True)
+            elif now - bracket.exiting_since >= BRACKET_CANCEL_SECONDS:
+                open_legs = [leg.client_id for leg in bracket.legs if not leg.done]
+                print(f"[bracket] {bracket.id} cancel of {open_legs} unconfirmed after "
+                      f"{BRACKET_CANCEL_SECONDS:g}s; exiting at market anyway")
+                self._exit_when_flat(bracket, force=True)
+
+    def exit(self, bracket_id, reason="EXIT") -> bool:
+        """Close an open bracket at market: cancel its resting legs first."""
+        bracket = self.brackets.get(bracket_id)
+        if bracket is not None and bracket.state == ENTRY:
+            bracket.reason = reason  # whatever part of the entry fills is exited at once
+            self.orders.cancel(bracket.id)
+            return True
+        if bracket is None or bracket.state != OPEN:
+            return False
+        bracket.state, bracket.reason = EXITING, reason
+        bracket.exiting_since = time.time()
+        self._cancel_legs(bracket)
+        self._exit_when_flat(bracket)
+        return True
+
+    def _cancel_legs(self, bracket, retry=False):
+        for leg in bracket.legs:
+            if leg.done or (retry and leg.client_id not in bracket.uncancelled):
+                continue
+            if self.orders.cancel(leg.client_id):
+                bracket.uncancelled.discard(leg.client_id)
+            else:
+                bracket.uncancelled.add(leg.client_id)
+
+    def _exit_when_flat(self, bracket, force=False):
+        if bracket.exit_order is not None:
+            return
+        if not force and any(not leg.done for leg in bracket.legs):
+            return  # wait for the cancels (or fills) to be confirmed
+        filled = sum(o.filled_qty for o in bracket.legs + bracket.failed_exits)
+        remaining = bracket.entry.filled_qty - filled
+        if remaining <= 0:
+            bracket.state = CLOSED  # a leg filled while we were cancelling
+            bracket.reason = next((leg.tag for leg in bracket.legs if leg.filled_qty), bracket.reason)
+            return
+        entry, attempt = bracket.entry, len(bracket.failed_exits)
+        bracket.retry_at = None
+        bracket.exit_order = self.orders.submit(
+            entry.venue, entry.user_id, entry.symbol, bracket.exit_side, remaining, tag=bracket.reason,
+            client_id=f"{entry.client_id[:16]}-X{attempt or ''}", strategy=bracket.strategy,
+            parent_id=entry.client_id, listener=self._on_leg,
+        )
+        self._by_leg[bracket.exit_order.client_id] = bracket
+        if bracket.exit_order.status in (CANCELLED, REJECTED):
+            self._exit_failed(bracket)
+
+    def _exit_failed(self, bracket):
+        """The market exit was rejected or cancelled: resend the rest with backoff."""
+        failed = bracket.exit_order
+        bracket.failed_exits.append(failed)
+        bracket.exit_order = None
+        attempts = len(bracket.failed_exits)
+        delay = min(BRACKET_EXIT_RETRY_SECONDS * 2 ** (attempts - 1), BRACKET_EXIT_RETRY_MAX_SECONDS)
+        bracket.retry_at = time.time() + delay
+        print(f"[bracket] {bracket.id} exit order {failed.status}: {failed.reason}; "
+              f"retrying in {delay:g}s (attempt {attempts + 1})")
+        if attempts >= BRACKET_EXIT_RETRIES and not bracket.review:
+            bracket.review = True
+            print(f"[bracket] {bracket.id} REVIEW: {attempts} exits of {bracket.entry.symbol} failed "
+                  f"and the position has no stop; settle it at the broker")
@@ -1,29 +1,74 @@
 # broker_alice.py
-from pya3 import Aliceblue
 from models import db, BrokerConnection, StrategyConfig, Trade
 from flask_login import current_user
 from datetime import datetime
 
 class AliceBroker:
-    def __init__(self):
+    def __init__(self, user=None):
+        # user: explicit User row for background runners; defaults to current_user
+        self.user = user
         self.alice = None
         self.conn = None
+        self._instruments = {}  # (exchange, symbol) -> contract, looked up once
+
+    @property
+    def owner(self):
+        return self.user or current_user
 
     def connect(self):
-        self.conn = BrokerConnection.query.filter_by(user_id=current_user.id).first()
+        self.conn = BrokerConnection.query.filter_by(user_id=self.owner.id).first()
         if not self.conn or self.conn.paper_trade or not self.conn.api_key:
             return False
         
         try:
-            self.alice = Aliceblue(
-                user_id=current_user.email,
+            from pya3 import Aliceblue
+            from broker_limiter import limited
+
+            self.alice = limited(Aliceblue(
+                user_id=self.owner.email,
                 api_key=self.conn.api_key,
                 session_id=self.conn.session_id
-            )
+            ), "aliceblue", self.owner.email)
             return True
         except:
             return False
 
+    def instrument(self, exchange, symbol):
+        """Contract master entry for a symbol (cached)."""
+        key = (exchange, symbol)
+        found = self._instruments.get(key)
+        if found is None:
+            found = self.alice.get_instrument_by_symbol(exchange, symbol)
+            if not isinstance(found, dict) or not found.get("token"):
+                raise ValueError(f"unknown {exchange} instrument {symbol}: {found}")
+            self._instruments[key] = found
+        return found
+
+    def quote(self, exchange, symbol):
+        """
+        (ltp, bids, asks) from Alice's scrip quote; bids / asks are up to
+        five (price, qty) levels, best first. Indices go by their token.
+        """
+        from alice_async import INDEX_TOKENS
+
+        if symbol in INDEX_TOKENS:
+            exchange, token = INDEX_TOKENS[symbol]
+        else:
+            token = self.instrument(exchange, symbol)["token"]
+        q = self.alice.get_instrument_by_token(exchange, token)
+        if not isinstance(q, dict) or q.get("stat") == "Not_Ok" or not q.get("LTP"):
+            raise RuntimeError(q.get("emsg") if isinstance(q, dict) else str(q))
+
+        def levels(side):
+            out = []
+            for i in range(1, 6):
+                price, qty = float(q.get(f"{side}Price{i}") or 0), int(float(q.get(f"{side}Qty{i}") or 0))
+                if price and qty:
+                    out.append((price, qty))
+            return out
+
+        return float(q["LTP"]), levels("B"), levels("S")
+
     def place_option_order(self, strategy_name, symbol, side, qty):
         """Place BUY/SELL order. Returns order_id or None if paper/simulated."""
         if not self.alice:
@@ -51,10 +96,94 @@ class AliceBroker:
             print(f"Order failed: {e}")
             return None
 
+    def send_order(self, symbol, side, qty, price=None, trigger_price=None):
+        """
+        Place an intraday NFO order for `qty` contracts. With trigger_price
+        it is a stop-loss limit order at `price` (NSE has no SL-M for
+        options). pya3 sends no order tag, so the order manager finds
+        orders in the book by what they are, not by our client id.
+        Returns the broker order number; raises OrderRejected when the
+        broker refuses it.
+        """
+        outcome = self._placed(self.alice.place_order(**self._order_args(symbol, side, qty, price, trigger_price)), 1)[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def send_basket(self, orders):
+        """
+        Place several orders (dicts of send_order's arguments) in one
+        basket call. Returns a broker order number or an exception per
+        order, in order; raises if the response can't be matched to them.
+        """
+        res = self.alice.place_basket_order([self._order_args(**o) for o in orders])
+        return self._placed(res, len(orders))
+
+    @staticmethod
+    def _placed(res, count):
+        """
+        Outcomes of a placeorder response for `count` orders: the broker
+        order number, OrderRejected where the broker said Not_Ok, or a
+        plain exception for a row we can't read (outcome unknown, so the
+        order manager reconciles it instead of rejecting). pya3 answers a
+        list of one result per order; a lone dict is accepted too.
+        """
+        from order_manager import OrderRejected
+
+        rows = [res] if isinstance(res, dict) else res
+        if not isinstance(rows, list) or len(rows) != count:
+            raise RuntimeError(f"placeorder for {count} orders answered {res!r}")
+        outcomes = []
+        for r in rows:
+            status = r.get("stat") if isinstance(r, dict) else None
+            if status == "Ok" and r.get("NOrdNo"):
+                outcomes.append(str(r["NOrdNo"]))
+            elif status == "Not_Ok":  # pya3's own "Not_ok" means the request failed: unknown
+                outcomes.append(OrderRejected(r.get("emsg") or "rejected"))
+            else:
+                outcomes.append(RuntimeError(f"unrecognised placeorder result {r!r}"))
+        return outcomes
+
+    def _order_args(self, symbol, side, qty, price=None, trigger_price=None):
+        from pya3 import OrderType, ProductType, TransactionType
+
+        if trigger_price is not None:
+            order_type = OrderType.StopLossLimit
+        else:
+            order_type = OrderType.Market if price is None else OrderType.Limit
+        return dict(
+            transaction_type=TransactionType.Buy if side == "BUY" else TransactionType.Sell,
+            instrument=self.instrument("NFO", symbol),
+            quantity=qty,
+            order_type=order_type,
+            product_type=ProductType.Intraday,
+            price=price or 0.0,
+            trigger_price=trigger_price,
+        )
+
+    def cancel_order(self, broker_order_id, symbol):
+        """Cancel an NFO order; raises when the broker refuses."""
+        res = self.alice.cancel_order("NFO", broker_order_id, self.instrument("NFO", symbol)["tradingSymbol"])
+        if isinstance(res, dict) and res.get("stat") == "Not_Ok":
+            raise RuntimeError(res.get("emsg") or "cancel refused")
+        return res
+
+    def order_book(self):
+        """Today's orders as pya3 returns them (list of dicts)."""
+        res = self.alice.order_data()
+        if isinstance(res, dict):
+            if res.get("stat") == "Not_Ok":
+                # "No Data" is how an empty book is reported
+                if "no data" in str(res.get("emsg", "")).lower():
+                    return []
+                raise RuntimeError(res.get("emsg"))
+            return [res]
+        return res or []
+
     def record_trade(self, strategy_name, symbol, side, qty, entry_price, exit_price, pnl):
         """Log completed trade to DB for reports."""
         trade = Trade(
-            user_id=current_user.id,
+            user_id=self.owner.id,
             strategy_name=strategy_name,
             symbol=symbol,
             side=side,
@@ -2,11 +2,12 @@
 import os
 from datetime import datetime
 from dhanhq import dhanhq
+from broker_limiter import limited
 
 DHAN_CLIENT_ID = os.environ["DHAN_CLIENT_ID"]
 DHAN_ACCESS_TOKEN = os.environ["DHAN_ACCESS_TOKEN"]
 
-dhan = dhanhq(client_id=DHAN_CLIENT_ID, access_token=DHAN_ACCESS_TOKEN)
+dhan = limited(dhanhq(client_id=DHAN_CLIENT_ID, access_token=DHAN_ACCESS_TOKEN), "dhan", DHAN_CLIENT_ID)
 
 # TODO: replace with real IDs from your instruments list
 BANKNIFTY_SPOT_SECURITY_ID = "BANKNIFTY_INDEX_ID"
@@ -0,0 +1,226 @@
+# broker_gateway.py
+"""
+Async front for the broker-bound endpoints (Procfile: gunicorn tornado worker).
+
+/dashboard and /broker/connect spend most of their time waiting on Alice
+Blue. Here that waiting happens on the worker's event loop through
+alice_async's shared client, so one worker keeps hundreds of those
+requests in flight. The broker result is then handed to the Flask view
+(WSGI environ key GATEWAY_RESULT), which only does the DB work and
+rendering on a small thread pool. /broker/status is answered here from
+session_health's cache (long-polls wait on the loop too). Every other
+URL goes straight to Flask on the same pool.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from flask.sessions import SecureCookieSessionInterface
+from itsdangerous import BadSignature
+from tornado.iostream import StreamClosedError
+from tornado.web import Application, RequestHandler
+from tornado.wsgi import WSGIContainer
+
+from alice_async import AliceError, AliceSession
+from broker_routes import GATEWAY_RESULT
+from session_health import etag, session_health
+from user_context import user_cache
+from wsgi import application as flask_app
+
+# Threads running Flask views (DB + templates); broker waits don't use them
+executor = ThreadPoolExecutor(int(os.environ.get("GUNICORN_THREADS", 4)))
+STREAM_QUEUE_CHUNKS = 16
+
+_sessions = SecureCookieSessionInterface().get_signing_serializer(flask_app)
+
+
+# Builds WSGI environs from tornado requests (its public environ())
+wsgi_environ = WSGIContainer(flask_app, executor=executor).environ
+
+
+class FlaskHandler(RequestHandler):
+    """
+    Runs the Flask app on the thread pool and streams its response.
+
+    Body chunks are written as the app yields them (CSV export) rather
+    than joined in memory. The response is produced on one pool thread, as
+    stream_with_context needs, and handed over through a small queue; each
+    chunk is flushed before the next is taken, so a slow client throttles
+    the producer. Subclasses do their broker I/O in broker_io() first.
+    """
+
+    SUPPORTED_METHODS = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+
+    async def broker_io(self):
+        return None
+
+    async def get(self, *args):
+        try:
+            result = await self.broker_io()
+        except Exception as e:
+            print(f"Gateway {self.request.path} error:", e)
+            result = None
+        await self.run_flask(result)
+
+    head = post = put = patch = delete = options = get
+
+    def compute_etag(self):
+        return None  # Flask sets its own validators
+
+    async def run_flask(self, gateway_result=None):
+        environ = wsgi_environ(self.request)
+        if gateway_result is not None:
+            environ[GATEWAY_RESULT] = gateway_result
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+        data = {"cancelled": False}
+
+        def start_response(status, headers, exc_info=None):
+            data["status"], data["headers"] = status, headers
+            return lambda chunk: None
+
+        def produce():
+            put = lambda item: asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+            try:
+                app_response = flask_app(environ, start_response)
+                try:
+                    for chunk in app_response:
+                        if data["cancelled"]:
+                            break
+                        if chunk:
+                            put(chunk)
+                finally:
+                    if hasattr(app_response, "close"):
+                        app_response.close()
+            finally:
+                put(None)
+
+        job = loop.run_in_executor(executor, produce)
+        chunk = b""
+        try:
+            chunk = await queue.get()
+            if "status" not in data:
+                await job  # the app raised before start_response
+                raise RuntimeError("WSGI app did not call start_response")
+            status_code, reason = data["status"].split(" ", 1)
+            self.set_status(int(status_code), reason)
+            self.clear_header("Content-Type")
+            for key, value in data["headers"]:
+                self.add_header(key, value)
+            while chunk is not None:
+                if chunk:
+                    self.write(chunk)
+                    await self.flush()
+                chunk = await queue.get()
+        except StreamClosedError:
+            pass
+        finally:
+            if chunk is not None:
+                # Client went away mid-stream: stop and unblock the producer
+                data["cancelled"] = True
+                while await queue.get() is not None:
+                    pass
+        await job
+        if not data["cancelled"]:
+            self.finish()
+
+
+def _live_session(user_id):
+    """AliceSession for a user in LIVE mode with stored credentials, else None."""
+    with flask_app.app_context():
+        ctx = user_cache.get(user_id)  # the same entry Flask-Login then reads
+    if ctx is None or ctx.broker is None or not ctx.broker.is_live:
+        return None
+    return AliceSession(ctx.email, ctx.broker.api_key, ctx.broker.session_id)
+
+
+class BrokerHandler(FlaskHandler):
+    """Run broker_io() on the event loop, then let Flask finish the request."""
+
+    def user_id(self):
+        """Flask-Login user id from the signed Flask session cookie."""
+        cookie = self.get_cookie(flask_app.config["SESSION_COOKIE_NAME"])
+        if not cookie:
+            return None
+        try:
+            data = _sessions.loads(
+                cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds())
+            )
+        except BadSignature:
+            return None
+        user_id = data.get("_user_id")
+        return int(user_id) if user_id else None
+
+    async def live_session(self):
+        user_id = self.user_id()
+        if user_id is None:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(executor, _live_session, user_id)
+
+
+class DashboardHandler(BrokerHandler):
+    async def broker_io(self):
+        session = await self.live_session()
+        return await session.snapshot() if session else None
+
+
+class StatusHandler(BrokerHandler):
+    """/broker/status straight from session_health: no DB, no thread, no broker call."""
+
+    async def get(self, *args):
+        user_id = self.user_id()
+        if user_id is None:
+            return await self.run_flask()  # Flask-Login redirect
+
+        state = session_health.status(user_id)
+        if state is None:
+            state = session_health.seed(user_id, await self.is_live(user_id))
+
+        wait = float(self.get_query_argument("wait", 0) or 0)
+        if wait > 0 and f'"{etag(state)}"' in self.request.headers.get("If-None-Match", ""):
+            state = await session_health.wait_async(user_id, etag(state), wait) or state
+
+        self.set_header("Etag", f'"{etag(state)}"')
+        self.set_header("Cache-Control", "no-cache")
+        if self.check_etag_header():
+            self.set_status(304)
+            self.finish()
+        else:
+            self.finish(state)
+
+    async def is_live(self, user_id):
+        def load():
+            return _live_session(user_id) is not None
+
+        return await asyncio.get_running_loop().run_in_executor(executor, load)
+
+
+class ConnectHandler(BrokerHandler):
+    async def broker_io(self):
+        form = {k: self.get_body_argument(k, "").strip()
+                for k in ("client_id", "api_key", "password", "liveConfirm")}
+        # Incomplete forms and anonymous users are Flask's to reject
+        if self.request.method != "POST" or not all(form.values()) or self.user_id() is None:
+            return None
+        print(f"Connecting with client_id={form['client_id'][:4]}...")
+        try:
+            return {"session_id": await AliceSession(form["client_id"], form["api_key"]).get_session_id()}
+        except AliceError as e:
+            return {"error": str(e)}
+
+
+application = Application([
+    (r"/dashboard", DashboardHandler),
+    (r"/broker/status", StatusHandler),
+    (r"/broker/connect", ConnectHandler),
+    (r".*", FlaskHandler),
+])
+
+
+async def _serve(port):
+    application.listen(port)
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(_serve(int(os.environ.get("PORT", 8000))))
@@ -0,0 +1,328 @@
+# broker_limiter.py
+"""
+Per-broker, per-account request limits for every broker API call.
+
+Dhan and Alice Blue throttle each account to a few requests per second,
+while the runner, the dashboard, /broker/status and the paper engine
+all call them on their own. Every call here takes a token from its
+account's bucket: BROKER_RATE_<BROKER> tokens per second, bursts of up to
+BROKER_BURST_<BROKER>. Callers are ranked by what they send:
+
+    ORDER    place / cancel / order book      served first
+    ACCOUNT  login, profile, funds
+    QUOTE    LTP, quotes, option chains
+    HISTORY  candles for backfills            served last
+
+An empty bucket queues callers, and each new token goes to the oldest
+caller of the highest priority, so a breakout's orders never wait behind
+dashboard quotes. Identical reads already in flight (the same quote
+asked for by several components) are coalesced: later callers get the
+first caller's answer, the same object, without spending a token.
+
+Sync SDK clients (pya3, dhanhq) are wrapped with limited(); alice_async
+awaits AccountLimiter.acall(). stats() reports queue depths, waits and
+counts per account (GET /broker/limits).
+
+Buckets live in the process: gunicorn workers and the runner each have
+their own. The default limits are therefore split across BROKER_PROCESSES
+processes (default: WEB_CONCURRENCY workers plus the runner), so all of
+them together stay within the broker's limit. BROKER_RATE_* /
+BROKER_BURST_* are per-process values and are not divided.
+"""
+import asyncio
+import heapq
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+ORDER, ACCOUNT, QUOTE, HISTORY = 0, 1, 2, 3
+PRIORITY_NAMES = ("order", "account", "quote", "history")
+
+# requests/s and burst per account, before BROKER_RATE_* / BROKER_BURST_* overrides
+DEFAULT_LIMITS = {"aliceblue": (10, 10), "dhan": (10, 10)}
+# Processes sharing each account's limit: gunicorn workers (same default as
+# gunicorn.conf.py) plus run_strategy.py
+BROKER_PROCESSES = max(int(os.environ.get(
+    "BROKER_PROCESSES", int(os.environ.get("WEB_CONCURRENCY", 2 * multiprocessing.cpu_count())) + 1
+)), 1)
+
+# SDK method -> priority. Anything else (instrument lookups from the
+# local contract master, websockets) is not a rate-limited request.
+ALICE_CALLS = {
+    "place_order": ORDER, "place_basket_order": ORDER, "cancel_order": ORDER,
+    "modify_order": ORDER, "order_data": ORDER, "get_order_history": ORDER,
+    "get_session_id": ACCOUNT, "get_profile": ACCOUNT, "get_balance": ACCOUNT,
+    "get_netwise_positions": ACCOUNT, "get_holding_positions": ACCOUNT,
+    "get_ltp": QUOTE, "get_scrip_info": QUOTE, "get_instrument_by_token": QUOTE,
+    "get_historical": HISTORY,
+}
+DHAN_CALLS = {
+    "place_order": ORDER, "cancel_order": ORDER, "modify_order": ORDER,
+    "get_order_list": ORDER, "get_order_by_id": ORDER,
+    "get_fund_limits": ACCOUNT, "get_positions": ACCOUNT, "get_holdings": ACCOUNT,
+    "get_quote": QUOTE, "quote_data": QUOTE, "ticker_data": QUOTE, "ohlc_data": QUOTE,
+    "option_chain": QUOTE, "expiry_list": QUOTE,
+    "intraday_minute_data": HISTORY, "historical_daily_data": HISTORY,
+}
+# Never coalesced: each call has an effect of its own
+WRITES = {"place_order", "place_basket_order", "cancel_order", "modify_order", "get_session_id"}
+
+_cond = threading.Condition()     # guards every limiter and wakes the dispatcher
+_limiters = {}                    # (broker, account) -> AccountLimiter
+_dispatcher = None
+_seq = itertools.count()
+
+
+class _Waiter:
+    __slots__ = ("priority", "queued_at", "event", "loop", "future", "cancelled")
+
+    def __init__(self, priority, event=None, loop=None, future=None):
+        self.priority = priority
+        self.queued_at = time.monotonic()
+        self.event, self.loop, self.future = event, loop, future
+        self.cancelled = False
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AccountLimiter:
+    def __init__(self, broker: str, account: str, rate: float, burst: float):
+        self.broker, self.account = broker, account
+        self.rate, self.burst = rate, burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.waiting = []                 # heap of (priority, seq, _Waiter)
+        self.inflight = {}                # coalescing key -> Future
+        self.granted = Counter()          # priority name -> calls let through
+        self.coalesced = 0
+        self.max_queued = 0
+        self.waited = 0.0                 # seconds spent queued, all callers
+        self.max_wait = 0.0
+
+    # ---------- tokens (under _cond) ----------
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _take(self, priority, waited):
+        self.tokens -= 1
+        self.granted[PRIORITY_NAMES[priority]] += 1
+        self.waited += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def _try_now(self, priority) -> bool:
+        self._refill(time.monotonic())
+        if not self.waiting and self.tokens >= 1:
+            self._take(priority, 0.0)
+            return True
+        return False
+
+    def _queue(self, waiter):
+        heapq.heappush(self.waiting, (waiter.priority, next(_seq), waiter))
+        self.max_queued = max(self.max_queued, len(self.waiting))
+        _ensure_dispatcher()
+        _cond.notify()
+
+    def _grant(self, now) -> float:
+        """Hand out tokens to queued callers; seconds until the next one, or None."""
+        self._refill(now)
+        while self.waiting and self.tokens >= 1:
+            _, _, waiter = heapq.heappop(self.waiting)
+            if waiter.cancelled:
+                continue
+            self._take(waiter.priority, now - waiter.queued_at)
+            waiter.wake()
+        while self.waiting and self.waiting[0][2].cancelled:
+            heapq.heappop(self.waiting)
+        if not self.waiting:
+            return None
+        return (1 - self.tokens) / self.rate
+
+    # ---------- callers ----------
+
+    def acquire(self, priority=QUOTE):
+        """Block until this account may send one request."""
+        with _cond:
+            if self._try_now(priority):
+                return
+            waiter = _Waiter(priority, event=threading.Event())
+            self._queue(waiter)
+        waiter.event.wait()
+
+    async def acquire_async(self, priority=QUOTE):
+        with _cond:
+            if self._try_now(priority):
+                return
+            loop = asyncio.get_running_loop()
+            waiter = _Waiter(priority, loop=loop, future=loop.create_future())
+            self._queue(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with _cond:
+                waiter.cancelled = True
+            raise
+
+    def _join(self, key):
+        """(shared, own): an in-flight call to wait for, or a Future to publish ours in."""
+        with _cond:
+            shared = self.inflight.get(key)
+            if shared is not None:
+                self.coalesced += 1
+                return shared, None
+            own = self.inflight[key] = Future()
+            return None, own
+
+    def _publish(self, key, own, result=None, error=None):
+        with _cond:
+            self.inflight.pop(key, None)
+        if error is not None:
+            own.set_exception(error)
+        else:
+            own.set_result(result)
+
+    def call(self, priority, fn, *args, key=None, **kwargs):
+        """fn(*args, **kwargs) once a token is free; joins an in-flight call with the same key."""
+        own = None
+        if key is not None:
+            shared, own = self._join(key)
+            if shared is not None:
+                return shared.result()
+        try:
+            self.acquire(priority)
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            if own is not None:
+                self._publish(key, own, error=e if isinstance(e, Exception) else RuntimeError("interrupted"))
+            raise
+        if own is not None:
+            self._publish(key, own, result)
+        return result
+
+    async def acall(self, priority, fn, *args, key=None, **kwargs):
+        """call() for coroutine functions, without blocking the event loop."""
+        own = None
+        if key is not None:
+            shared, own = self._join(key)
+            if shared is not None:
+                return await asyncio.wrap_future(shared)
+        try:
+            await self.acquire_async(priority)
+            result = await fn(*args, **kwargs)
+        except BaseException as e:
+            if own is not None:
+                self._publish(key, own, error=e if isinstance(e, Exception) else RuntimeError("cancelled"))
+            raise
+        if own is not None:
+            self._publish(key, own, result)
+        return result
+
+    def status(self) -> dict:
+        queued = Counter(PRIORITY_NAMES[p] for p, _, w in self.waiting if not w.cancelled)
+        granted = sum(self.granted.values())
+        return {
+            "broker": self.broker,
+            "rate": self.rate,
+            "tokens": round(self.tokens, 2),
+            "queued": sum(queued.values()),
+            "queued_by_priority": dict(queued),
+            "max_queued": self.max_queued,
+            "granted": dict(self.granted),
+            "coalesced": self.coalesced,
+            "avg_wait_ms": round(self.waited / granted * 1000, 1) if granted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+def limiter(broker: str, account) -> AccountLimiter:
+    """The bucket shared by every caller of `broker` for this account."""
+    key = (broker, str(account).upper())
+    with _cond:
+        found = _limiters.get(key)
+        if found is None:
+            rate, burst = DEFAULT_LIMITS.get(broker, (10, 10))
+            rate, burst = rate / BROKER_PROCESSES, max(burst / BROKER_PROCESSES, 1)
+            env = broker.upper()
+            found = _limiters[key] = AccountLimiter(
+                broker, key[1],
+                float(os.environ.get(f"BROKER_RATE_{env}", rate)),
+                float(os.environ.get(f"BROKER_BURST_{env}", burst)),
+            )
+        return found
+
+
+def stats(accounts=None) -> dict:
+    """{"broker:ACCOUNT": status} for every bucket (or only `accounts`)."""
+    wanted = {str(a).upper() for a in accounts} if accounts is not None else None
+    with _cond:
+        return {
+            f"{l.broker}:{l.account}": l.status() for l in _limiters.values()
+            if wanted is None or l.account in wanted
+        }
+
+
+def _ensure_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = threading.Thread(target=_dispatch_loop, name="broker-limiter", daemon=True)
+        _dispatcher.start()
+
+
+def _dispatch_loop():
+    with _cond:
+        while True:
+            now = time.monotonic()
+            waits = [w for w in (l._grant(now) for l in _limiters.values() if l.waiting) if w is not None]
+            _cond.wait(min(waits) if waits else None)
+
+
+def _call_key(name, args, kwargs):
+    key = (name, args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        key = (name, repr(args), repr(sorted(kwargs.items())))  # e.g. dhanhq's dict payloads
+    return key
+
+
+class Limited:
+    """A pya3 / dhanhq client whose API calls go through an account's limiter."""
+
+    def __init__(self, client, limiter: AccountLimiter, calls: dict):
+        self._client, self._limiter, self._calls = client, limiter, calls
+
+    def __repr__(self):
+        return f"<limited {self._limiter.broker}:{self._limiter.account} {self._client!r}>"
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        priority = self._calls.get(name)
+        if priority is None or not callable(attr):
+            return attr
+        coalesce = name not in WRITES
+
+        def call(*args, **kwargs):
+            key = _call_key(name, args, kwargs) if coalesce else None
+            return self._limiter.call(priority, attr, *args, key=key, **kwargs)
+
+        return call
+
+
+def limited(client, broker: str, account):
+    """Wrap an Aliceblue ("aliceblue") or dhanhq ("dhan") client."""
+    calls = ALICE_CALLS if broker == "aliceblue" else DHAN_CALLS
+    return Limited(client, limiter(broker, account), calls)
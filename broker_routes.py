@@ -1,15 +1,34 @@
 # broker_routes.py
+import os
 
-from flask import Blueprint, request, redirect, url_for, flash
+from flask import Blueprint, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 
 from models import db, BrokerConnection
-from pya3 import Aliceblue
+from session_health import etag, session_health
+from user_context import user_cache
 import traceback
 
 # All broker URLs under /broker/...
 broker_bp = Blueprint("broker", __name__, url_prefix="/broker")
 
+# WSGI environ key carrying broker I/O already done by broker_gateway.py
+GATEWAY_RESULT = "algosphere.broker"
+
+
+def alice_login(client_id: str, api_key: str) -> str:
+    """Blocking pya3 login handshake; returns the session id."""
+    from pya3 import Aliceblue
+    from broker_limiter import limited
+
+    alice = limited(Aliceblue(user_id=client_id, api_key=api_key, base=os.environ.get("ALICE_BASE_URL")),
+                    "aliceblue", client_id)
+    res = alice.get_session_id()
+    # pya3 returns the error message (str) or the raw response (dict)
+    if not isinstance(res, dict) or res.get("stat") != "Ok":
+        raise RuntimeError(res.get("emsg") if isinstance(res, dict) else res)
+    return res["sessionID"]
+
 
 @broker_bp.route("/paper", methods=["POST"])
 @login_required
@@ -25,6 +44,8 @@ def enable_paper_legacy():
     conn.api_key = None       # clear credentials for safety
     conn.session_id = None
     db.session.commit()
+    user_cache.invalidate(current_user.id)
+    session_health.forget(current_user.id)
 
     flash("📝 Paper trading enabled. No real orders will be placed.", "success")
     return redirect(url_for("dash.dashboard"))
@@ -54,10 +75,15 @@ def connect():
         db.session.add(conn)
 
     try:
-        # Test real connection to Alice Blue
-        print(f"Connecting with client_id={client_id[:4]}...")
-        alice = Aliceblue(user_id=client_id, api_key=api_key)
-        session_id = alice.get_session_id()
+        # Test real connection to Alice Blue (the gateway may have done it already)
+        gateway = request.environ.get(GATEWAY_RESULT)
+        if gateway is not None:
+            if gateway.get("error"):
+                raise RuntimeError(gateway["error"])
+            session_id = gateway["session_id"]
+        else:
+            print(f"Connecting with client_id={client_id[:4]}...")
+            session_id = alice_login(client_id, api_key)
 
         # Success - store for live trading
         conn.api_key = api_key
@@ -65,6 +91,8 @@ def connect():
         conn.paper_trade = False  # legacy flag
         conn.trade_mode = "LIVE"
         db.session.commit()
+        user_cache.invalidate(current_user.id)
+        session_health.forget(current_user.id)
 
         flash("✅ LIVE TRADING ENABLED! Real orders will now execute.", "success")
         flash("⚠️ Monitor closely. Daily loss limit: ₹3000 per strategy.", "warning")
@@ -80,28 +108,42 @@ def connect():
 @broker_bp.route("/status")
 @login_required
 def status():
-    """API endpoint: broker connection status (for AJAX checks)."""
-    conn = BrokerConnection.query.filter_by(user_id=current_user.id).first()
-    if not conn:
-        return {"connected": False, "live": False, "paper": True}
+    """
+    API endpoint: broker connection status (for AJAX polling).
+
+    Answered from session_health's cache; the broker is pinged in the
+    background. Send If-None-Match with the last ETag to get 304 when
+    nothing changed, plus ?wait=<seconds> to long-poll for a change.
+    """
+    state = session_health.status(current_user.id)
+    if state is None:
+        broker = current_user.broker
+        state = session_health.seed(current_user.id, bool(broker and broker.is_live))
+
+    wait = request.args.get("wait", 0.0, type=float)
+    if wait > 0 and etag(state) in request.if_none_match:
+        state = session_health.wait(current_user.id, etag(state), wait) or state
 
-    # Determine effective mode
-    mode = conn.trade_mode or ("PAPER" if conn.paper_trade else "LIVE")
-    if mode != "LIVE":
-        return {"connected": False, "live": False, "paper": True}
+    resp = jsonify(state)
+    resp.set_etag(etag(state))
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp.make_conditional(request)
 
-    if conn.api_key and conn.session_id:
-        try:
-            Aliceblue(
-                user_id=current_user.email,
-                api_key=conn.api_key,
-                session_id=conn.session_id,
-            )
-            return {"connected": True, "live": True, "paper": False}
-        except Exception:
-            return {"connected": False, "live": False, "paper": True}
 
-    return {"connected": False, "live": False, "paper": True}
+@broker_bp.route("/limits")
+@login_required
+def limits():
+    """This worker's broker_limiter buckets: yours, plus queue totals per broker."""
+    import broker_limiter
+
+    totals = {}
+    for bucket in broker_limiter.stats().values():
+        t = totals.setdefault(bucket["broker"], {"accounts": 0, "queued": 0, "max_queued": 0, "coalesced": 0})
+        t["accounts"] += 1
+        t["queued"] += bucket["queued"]
+        t["max_queued"] = max(t["max_queued"], bucket["max_queued"])
+        t["coalesced"] += bucket["coalesced"]
+    return jsonify({"accounts": broker_limiter.stats([current_user.email]), "brokers": totals})
 
 
 @broker_bp.route("/mode/live", methods=["POST"])
@@ -116,6 +158,8 @@ def enable_live():
     conn.trade_mode = "LIVE"
     conn.paper_trade = False
     db.session.commit()
+    user_cache.invalidate(current_user.id)
+    session_health.forget(current_user.id)
 
     flash("Switched to LIVE trading. Real orders will be sent.", "success")
     return redirect(url_for("dash.dashboard"))
@@ -135,5 +179,7 @@ def enable_paper_mode():
         conn.paper_trade = True
 
     db.session.commit()
+    user_cache.invalidate(current_user.id)
+    session_health.forget(current_user.id)
     flash("Switched to PAPER trading. Orders are simulated only.", "info")
     return redirect(url_for("dash.dashboard"))
@@ -1,7 +1,7 @@
 # broker_service.py
 from flask_login import current_user
 from models import db, BrokerConnection
-from pya3 import Aliceblue
+from user_context import user_cache
 import traceback
 
 
@@ -21,14 +21,18 @@ def connect_broker_live(client_id: str, api_key: str, password: str, require_con
         db.session.add(conn)
 
     try:
+        from pya3 import Aliceblue  # broker SDK: load on first connect
+        from broker_limiter import limited
+
         print(f"Connecting with client_id={client_id[:4]}...")
-        alice = Aliceblue(user_id=client_id, api_key=api_key)
+        alice = limited(Aliceblue(user_id=client_id, api_key=api_key), "aliceblue", client_id)
         session_id = alice.get_session_id()
 
         conn.api_key = api_key
         conn.session_id = session_id
         conn.paper_trade = False  # LIVE MODE
         db.session.commit()
+        user_cache.invalidate(current_user.id)
         return True, "LIVE TRADING ENABLED! Real orders will now execute."
     except Exception as e:
         print(f"Broker connect error: {e}")
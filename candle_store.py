@@ -0,0 +1,340 @@
+# candle_store.py
+"""
+Local 1-minute OHLCV store for backtests and the strategies page.
+
+Layout on disk (one directory per symbol, one file pair per month):
+
+    instance/candles/BANKNIFTY/2025-01.npy      structured CANDLE_DTYPE rows
+    instance/candles/BANKNIFTY/2025-01.idx.npy  DAY_INDEX_DTYPE rows
+    instance/candles/BANKNIFTY/empty-days.txt   fetched days that had no candles
+
+Month files are plain .npy arrays sorted by timestamp, so they can be
+memory-mapped and sliced without copying. The day index stores the row
+range of every trading day in the month; it drives both date-range
+slicing and incremental ingest (only trading days missing from the
+index, and not already fetched empty, are fetched/appended).
+
+The two files of a month are replaced one after the other, index first.
+Months only ever grow, so a reader that catches the new index with the
+old data sees an index that runs past the data, and rebuilds the index
+from the rows it has instead.
+"""
+import csv
+import os
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from market_calendar import MarketCalendar, now_ist
+
+DEFAULT_ROOT = os.path.join("instance", "candles")
+IST_OFFSET = timedelta(hours=5, minutes=30)
+
+CANDLE_DTYPE = np.dtype([
+    ("ts", "M8[s]"),       # candle open time, exchange-local (IST)
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "i8"),
+])
+
+DAY_INDEX_DTYPE = np.dtype([
+    ("day", "M8[D]"),
+    ("start", "i8"),
+    ("stop", "i8"),
+])
+
+
+def _month_key(d: date) -> str:
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+def _month_starts(start: date, end: date):
+    """Yield the first day of every month touched by [start, end]."""
+    cur = date(start.year, start.month, 1)
+    while cur <= end:
+        yield cur
+        cur = date(cur.year + (cur.month == 12), cur.month % 12 + 1, 1)
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), "%Y-%m-%d").date()
+
+
+def _build_day_index(rows: np.ndarray) -> np.ndarray:
+    """Row ranges for each distinct day in a timestamp-sorted month array."""
+    days = rows["ts"].astype("M8[D]")
+    uniq, starts = np.unique(days, return_index=True)
+    index = np.empty(len(uniq), dtype=DAY_INDEX_DTYPE)
+    index["day"] = uniq
+    index["start"] = starts
+    index["stop"] = np.append(starts[1:], len(rows))
+    return index
+
+
+class CandleStore:
+    """Memory-mapped per-month candle arrays with a per-day row index."""
+
+    def __init__(self, root: str = DEFAULT_ROOT, calendar: MarketCalendar = None):
+        self.root = root
+        self.calendar = calendar or MarketCalendar()
+        self._maps = {}  # (symbol, "YYYY-MM") -> (mtime, rows, index)
+
+    # ---------- paths / low-level ----------
+
+    def _paths(self, symbol: str, month: str):
+        base = os.path.join(self.root, symbol.upper(), month)
+        return base + ".npy", base + ".idx.npy"
+
+    def _open_month(self, symbol: str, month: str):
+        """Return (rows, day_index) memmaps for a month, or (None, None)."""
+        data_path, idx_path = self._paths(symbol, month)
+        try:
+            mtime = os.stat(data_path).st_mtime_ns
+        except FileNotFoundError:
+            return None, None
+
+        key = (symbol.upper(), month)
+        cached = self._maps.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+
+        rows = np.load(data_path, mmap_mode="r")
+        index = np.load(idx_path, mmap_mode="r")
+        if (int(index["stop"][-1]) if len(index) else 0) != len(rows):
+            index = _build_day_index(np.asarray(rows))  # caught mid-_write_month
+        self._maps[key] = (mtime, rows, index)
+        return rows, index
+
+    def _write_month(self, symbol: str, month: str, rows: np.ndarray):
+        """Replace a month's index and then its data file (see the module docstring)."""
+        data_path, idx_path = self._paths(symbol, month)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        self._maps.pop((symbol.upper(), month), None)
+
+        # Write both files next to the targets, then swap them in; readers
+        # holding an old memmap keep a valid view of the old inode.
+        for path, arr in ((idx_path, _build_day_index(rows)), (data_path, rows)):
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp, path)
+
+    # ---------- reads ----------
+
+    def months(self, symbol: str):
+        """Sorted month keys ("YYYY-MM") stored for a symbol."""
+        folder = os.path.join(self.root, symbol.upper())
+        if not os.path.isdir(folder):
+            return []
+        return sorted(
+            name[:-4] for name in os.listdir(folder)
+            if name.endswith(".npy") and not name.endswith(".idx.npy")
+        )
+
+    def days(self, symbol: str, start=None, end=None):
+        """Trading days present in the store for a symbol (list of date)."""
+        out = []
+        for month in self.months(symbol):
+            _, index = self._open_month(symbol, month)
+            if index is None:
+                continue
+            out.extend(d.astype(object) for d in index["day"])
+        if start is not None:
+            out = [d for d in out if d >= _as_date(start)]
+        if end is not None:
+            out = [d for d in out if d <= _as_date(end)]
+        return out
+
+    def iter_load(self, symbol: str, start, end):
+        """
+        Yield zero-copy memmap slices, one per month, covering the
+        inclusive date range [start, end].
+        """
+        start, end = _as_date(start), _as_date(end)
+        lo_day = np.datetime64(start, "D")
+        hi_day = np.datetime64(end, "D")
+
+        for month_start in _month_starts(start, end):
+            rows, index = self._open_month(symbol, _month_key(month_start))
+            if rows is None or not len(index):
+                continue
+            i = np.searchsorted(index["day"], lo_day, side="left")
+            j = np.searchsorted(index["day"], hi_day, side="right")
+            if i >= j:
+                continue
+            yield rows[int(index["start"][i]):int(index["stop"][j - 1])]
+
+    def load(self, symbol: str, start, end) -> np.ndarray:
+        """
+        Candles for [start, end] (inclusive dates) as a CANDLE_DTYPE array.
+
+        A range inside one month is returned as a zero-copy view of the
+        memory-mapped file; ranges spanning several months are stitched
+        into a single array (use iter_load() to avoid that copy).
+        """
+        parts = list(self.iter_load(symbol, start, end))
+        if not parts:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    # ---------- writes / ingest ----------
+
+    def append(self, symbol: str, rows: np.ndarray) -> int:
+        """
+        Merge candles into the store, keeping only days not already
+        present. Returns the number of rows written.
+        """
+        rows = np.asarray(rows, dtype=CANDLE_DTYPE)
+        if not len(rows):
+            return 0
+        rows = rows[np.argsort(rows["ts"], kind="stable")]
+
+        written = 0
+        months = rows["ts"].astype("M8[M]")
+        for month in np.unique(months):
+            month_rows = rows[months == month]
+            key = str(month)  # "YYYY-MM"
+            existing, index = self._open_month(symbol, key)
+
+            if existing is not None and len(index):
+                new_days = month_rows["ts"].astype("M8[D]")
+                month_rows = month_rows[~np.isin(new_days, index["day"])]
+                if not len(month_rows):
+                    continue
+                merged = np.concatenate([np.asarray(existing), month_rows])
+                merged = merged[np.argsort(merged["ts"], kind="stable")]
+            else:
+                merged = month_rows
+
+            self._write_month(symbol, key, merged)
+            written += len(month_rows)
+        return written
+
+    def _empty_path(self, symbol: str) -> str:
+        return os.path.join(self.root, symbol.upper(), "empty-days.txt")
+
+    def empty_days(self, symbol: str) -> set:
+        """Past days a fetch returned no candles for (holidays missing from the calendar)."""
+        try:
+            with open(self._empty_path(symbol)) as f:
+                return {_as_date(line.strip()) for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+
+    def _mark_empty(self, symbol: str, day: date):
+        os.makedirs(os.path.join(self.root, symbol.upper()), exist_ok=True)
+        with open(self._empty_path(symbol), "a") as f:
+            f.write(f"{day.isoformat()}\n")
+
+    def missing_days(self, symbol: str, start, end):
+        """Trading days in [start, end] with no stored candles."""
+        start, end = _as_date(start), _as_date(end)
+        have = set(self.days(symbol, start, end)) | self.empty_days(symbol)
+        out = []
+        d = start
+        while d <= end:
+            if self.calendar.is_trading_day(d) and d not in have:
+                out.append(d)
+            d += timedelta(days=1)
+        return out
+
+    def ingest(self, symbol: str, fetch, start, end) -> int:
+        """
+        Incrementally fill [start, end] using `fetch(day) -> rows`.
+
+        `fetch` is called only for trading days missing from the store and
+        may return anything accepted by append(). An empty result for a
+        past day (a holiday the calendar doesn't list) is remembered, so
+        that day is not fetched again. Returns the number of rows written.
+        """
+        written, today = 0, now_ist().date()
+        for day in self.missing_days(symbol, start, end):
+            try:
+                rows = fetch(day)
+            except Exception as e:
+                print(f"[candles] fetch {symbol} {day} failed:", e)
+                continue
+            if rows is not None and len(rows):
+                written += self.append(symbol, rows)
+            elif day < today:
+                self._mark_empty(symbol, day)
+        return written
+
+    def ingest_csv(self, symbol: str, path: str) -> int:
+        """
+        Import a CSV with columns datetime/timestamp, open, high, low,
+        close, volume. Days already stored are skipped.
+        """
+        have = set(self.days(symbol))
+        records = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                row = {k.strip().lower(): v for k, v in row.items() if k}
+                raw_ts = row.get("datetime") or row.get("timestamp") or row.get("date")
+                ts = _parse_ts(raw_ts)
+                if ts.date() in have:
+                    continue
+                records.append((
+                    np.datetime64(ts, "s"),
+                    float(row["open"]), float(row["high"]),
+                    float(row["low"]), float(row["close"]),
+                    int(float(row.get("volume") or 0)),
+                ))
+        return self.append(symbol, np.array(records, dtype=CANDLE_DTYPE))
+
+
+def _parse_ts(raw) -> datetime:
+    raw = str(raw).strip()
+    if raw.replace(".", "", 1).isdigit():
+        # epoch seconds (Dhan/Alice historical APIs) -> IST wall clock
+        return datetime.fromtimestamp(float(raw), tz=timezone.utc).replace(tzinfo=None) + IST_OFFSET
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%d-%m-%Y %H:%M"):
+        try:
+            return datetime.strptime(raw[:19], fmt)
+        except ValueError:
+            continue
+    return datetime.fromisoformat(raw).replace(tzinfo=None)
+
+
+def rows_from_columns(timestamps, opens, highs, lows, closes, volumes) -> np.ndarray:
+    """Build CANDLE_DTYPE rows from parallel column lists (broker payloads)."""
+    rows = np.empty(len(timestamps), dtype=CANDLE_DTYPE)
+    rows["ts"] = [np.datetime64(_parse_ts(t), "s") for t in timestamps]
+    rows["open"] = opens
+    rows["high"] = highs
+    rows["low"] = lows
+    rows["close"] = closes
+    rows["volume"] = volumes
+    return rows
+
+
+def dhan_fetcher(dhan, security_id: str, exchange_segment: str = "IDX_I",
+                 instrument_type: str = "INDEX"):
+    """
+    Return a fetch(day) callable for CandleStore.ingest() backed by
+    dhanhq's intraday_minute_data (1-minute bars).
+    """
+    def fetch(day: date):
+        resp = dhan.intraday_minute_data(
+            security_id, exchange_segment, instrument_type,
+            day.strftime("%Y-%m-%d"), (day + timedelta(days=1)).strftime("%Y-%m-%d"),
+        )
+        data = resp.get("data") or {}
+        if resp.get("status") != "success" or not data.get("open"):
+            return None
+        stamps = data.get("timestamp") or data.get("start_Time") or []
+        rows = rows_from_columns(
+            stamps, data["open"], data["high"], data["low"], data["close"],
+            data.get("volume") or [0] * len(stamps),
+        )
+        return rows[rows["ts"].astype("M8[D]") == np.datetime64(day, "D")]
+
+    return fetch
@@ -0,0 +1,195 @@
+# credentials.py
+"""
+Password hashing and login throttling.
+
+* New hashes are bcrypt at BCRYPT_ROUNDS. Hashes written by the legacy
+  Dhan app (werkzeug "scrypt:" / "pbkdf2:" strings) still verify; they,
+  and bcrypt hashes at another cost, are rewritten on the next
+  successful login (needs_rehash).
+* Verification runs on a bounded pool: HASH_WORKERS threads (bcrypt
+  releases the GIL) and at most HASH_QUEUE logins waiting. Past that a
+  login is refused at once (LoginBusy) instead of queueing behind an
+  attack, so the latency of an accepted login stays bounded. Logins
+  from IPs without a successful login in the last KNOWN_IP_HOURS
+  ("suspect") may hold at most HASH_WORKERS of those slots, so a
+  returning user waits behind at most one round of attacker hashes.
+* Token buckets per client IP (every attempt) and per account (failed
+  attempts) stop a client before any hash is computed. All of this
+  state is per worker process and starts empty when a worker restarts.
+
+Run `python credentials.py --tune` to pick BCRYPT_ROUNDS for a host.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", os.cpu_count() or 1))
+HASH_QUEUE = int(os.environ.get("HASH_QUEUE", 2 * HASH_WORKERS))
+
+# (burst, refill per minute); burst 0 disables the throttle
+LOGIN_IP_LIMIT = (int(os.environ.get("LOGIN_IP_BURST", 10)),
+                  float(os.environ.get("LOGIN_IP_PER_MIN", 10)))
+LOGIN_ACCOUNT_LIMIT = (int(os.environ.get("LOGIN_ACCOUNT_BURST", 5)),
+                       float(os.environ.get("LOGIN_ACCOUNT_PER_MIN", 2)))
+KNOWN_IP_HOURS = float(os.environ.get("KNOWN_IP_HOURS", 24))
+
+
+class LoginBusy(Exception):
+    """The hash pool is saturated; the client should retry shortly."""
+
+
+# ---------- hashing ----------
+
+def hash_password(password: str) -> bytes:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS))
+
+
+def verify_password(password: str, stored) -> bool:
+    if not stored:
+        return False
+    stored = stored if isinstance(stored, bytes) else stored.encode()
+    if stored.startswith(b"$2"):
+        return bcrypt.checkpw(password.encode(), stored)
+    # Legacy werkzeug hash ("method$salt$hash")
+    from werkzeug.security import check_password_hash
+
+    return check_password_hash(stored.decode(), password)
+
+
+def needs_rehash(stored) -> bool:
+    stored = stored if isinstance(stored, bytes) else stored.encode()
+    if not stored.startswith(b"$2"):
+        return True
+    return int(stored.split(b"$")[2]) != BCRYPT_ROUNDS
+
+
+_pool = ThreadPoolExecutor(HASH_WORKERS, thread_name_prefix="pwhash")
+_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE)
+_suspect_slots = threading.BoundedSemaphore(HASH_WORKERS)
+_dummy_hash = None
+
+
+def verify_bounded(password: str, stored, suspect: bool = False) -> bool:
+    """
+    verify_password() on the hash pool. `stored=None` (unknown account)
+    checks against a dummy hash, so a miss costs the same as a wrong
+    password and accounts cannot be enumerated by timing.
+    """
+    global _dummy_hash
+    if stored is None:
+        if _dummy_hash is None:
+            _dummy_hash = hash_password(os.urandom(16).hex())
+        stored = _dummy_hash
+    if suspect and not _suspect_slots.acquire(blocking=False):
+        raise LoginBusy()
+    try:
+        if not _slots.acquire(blocking=False):
+            raise LoginBusy()
+        try:
+            return _pool.submit(verify_password, password, stored).result()
+        finally:
+            _slots.release()
+    finally:
+        if suspect:
+            _suspect_slots.release()
+
+
+def tune_rounds(target_ms: float = 250.0) -> int:
+    """Highest bcrypt cost whose verify stays under target_ms on this host."""
+    rounds = 10
+    while rounds < 16:
+        h = bcrypt.hashpw(b"tune", bcrypt.gensalt(rounds + 1))
+        t0 = time.perf_counter()
+        bcrypt.checkpw(b"tune", h)
+        if (time.perf_counter() - t0) * 1000 > target_ms:
+            break
+        rounds += 1
+    return rounds
+
+
+# ---------- throttling ----------
+
+class Throttle:
+    """Token bucket per key; least recently used keys are evicted past max_keys."""
+
+    def __init__(self, burst: int, per_minute: float, max_keys: int = 100_000):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [tokens, updated]
+        self._lock = threading.Lock()
+
+    def _wait(self, tokens):
+        return (1 - tokens) / self.rate if self.rate else 3600.0
+
+    def _bucket(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def retry_after(self, key) -> float:
+        """0 if `key` has a token left, else seconds until it has one."""
+        if not self.burst:
+            return 0.0
+        with self._lock:
+            tokens = self._bucket(key, time.monotonic())[0]
+        return 0.0 if tokens >= 1 else self._wait(tokens)
+
+    def hit(self, key) -> float:
+        """Take a token; returns 0 if allowed, else seconds to wait."""
+        if not self.burst:
+            return 0.0
+        with self._lock:
+            bucket = self._bucket(key, time.monotonic())
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return self._wait(bucket[0])
+
+
+ip_throttle = Throttle(*LOGIN_IP_LIMIT)
+account_throttle = Throttle(*LOGIN_ACCOUNT_LIMIT)
+
+
+class RecentKeys:
+    """Keys added within the last `ttl` seconds (LRU-bounded)."""
+
+    def __init__(self, ttl: float, max_keys: int = 100_000):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._seen = OrderedDict()  # key -> added (monotonic)
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        with self._lock:
+            self._seen.pop(key, None)
+            self._seen[key] = time.monotonic()
+            if len(self._seen) > self.max_keys:
+                self._seen.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            added = self._seen.get(key)
+        return added is not None and time.monotonic() - added < self.ttl
+
+
+known_ips = RecentKeys(KNOWN_IP_HOURS * 3600)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--tune" in sys.argv:
+        print(f"BCRYPT_ROUNDS={tune_rounds()}")
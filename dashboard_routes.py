@@ -1,35 +1,50 @@
 # dashboard_routes.py
+import csv
+import heapq
+import io
+import os
 from datetime import datetime, date, timedelta
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import (
+    Blueprint, Response, render_template, redirect, url_for, flash, request,
+    stream_with_context,
+)
 from flask_login import login_required, current_user
+from sqlalchemy import and_, case, func, or_, select
 
-from models import db, BrokerConnection, StrategyConfig, Trade
-from pya3 import Aliceblue  # stub/adjust if not using yet
+import dhan_routes
+from broker_routes import GATEWAY_RESULT
+from models import db, StrategyConfig, Trade, PaperTrade, LiveTrade
+from strategy_registry import registry
+from user_context import user_cache
 
 dash_bp = Blueprint("dash", __name__)
 
+# Strategy shown on the dashboard's bot card
+ORB_STRATEGY = "banknifty_orb_vwap"
 
-def get_alice_connection():
-    """Return (alice_client, is_broker_connected, is_paper) for current_user."""
-    conn = BrokerConnection.query.filter_by(user_id=current_user.id).first()
-    if not conn:
-        return None, False, True
+REPORT_PAGE_SIZE = 100
+REPORT_MAX_PAGE_SIZE = 500
+EXPORT_CHUNK_ROWS = 1000
 
-    # Use trade_mode + paper_trade for compatibility
-    mode = conn.trade_mode or ("PAPER" if conn.paper_trade else "LIVE")
-    is_paper = mode != "LIVE"
 
-    if is_paper or not conn.api_key or not conn.session_id:
+def get_alice_connection():
+    """Return (alice_client, is_broker_connected, is_paper) for current_user."""
+    conn = current_user.broker  # cached with the user, see user_context.py
+    if not conn or not conn.is_live:
         return None, False, True
 
     try:
+        from pya3 import Aliceblue  # loaded on first live dashboard, not at start-up
+        from broker_limiter import limited
+
         alice = Aliceblue(
             user_id=current_user.email,  # or stored client_id
             api_key=conn.api_key,
             session_id=conn.session_id,
+            base=os.environ.get("ALICE_BASE_URL"),
         )
-        return alice, True, False
+        return limited(alice, "aliceblue", current_user.email), True, False
     except Exception as e:
         print("Alice connect error:", e)
         return None, False, True
@@ -47,7 +62,17 @@ def dashboard():
     is_broker_connected = False
     is_paper = True
 
-    alice, is_broker_connected, is_paper = get_alice_connection()
+    gateway = request.environ.get(GATEWAY_RESULT)
+    if gateway is not None:
+        # broker_gateway.py already fetched these concurrently
+        alice = None
+        is_broker_connected, is_paper = True, False
+        balance = gateway["balance"] or balance
+        profile = gateway["profile"] or profile
+        nifty_ltp = gateway["nifty_ltp"]
+        banknifty_ltp = gateway["banknifty_ltp"]
+    else:
+        alice, is_broker_connected, is_paper = get_alice_connection()
 
     if alice and is_broker_connected:
         # Balance
@@ -88,23 +113,32 @@ def dashboard():
         if banknifty_ltp == 0.0:
             banknifty_ltp = 49500.0
 
+    # Strategy configs, keyed by name (names come from the registry, no imports)
+    configs = current_user.strategies
+    strategies = [
+        {"name": name, "enabled": bool(configs.get(name) and configs[name].enabled)}
+        for name in registry.discover()
+    ]
+
     # BankNIFTY ORB config
-    cfg = StrategyConfig.query.filter_by(
-        user_id=current_user.id, strategy_name="banknifty_orb_vwap"
-    ).first()
+    cfg = configs.get(ORB_STRATEGY)
 
     banknifty_orb_enabled = bool(cfg and cfg.enabled)
     banknifty_orb_lots = cfg.lots if cfg else 3
     banknifty_orb_target = cfg.target_points if cfg else 80
     banknifty_orb_stop = cfg.stop_points if cfg else 50
 
-    # Equity curve: last 50 trades, cumulative PnL
+    # Equity curve: last 50 trades (hot or archived), cumulative PnL
+    import trade_archive  # numpy: load on first use
+
     trades = (
         Trade.query.filter_by(user_id=current_user.id)
-        .order_by(Trade.closed_at.asc())
+        .order_by(Trade.closed_at.desc(), Trade.id.desc())
         .limit(50)
         .all()
     )
+    trades += trade_archive.page("trade", current_user.id, limit=50)
+    trades = sorted(trades, key=_trade_key)[-50:]
 
     equity_labels = []
     equity_values = []
@@ -114,8 +148,37 @@ def dashboard():
         equity_labels.append(t.closed_at.strftime("%d-%b"))
         equity_values.append(round(cum, 2))
 
+    # Paper / live engine panel (account funds, today's PnL and trades)
+    funds = dhan_routes.get_fund_balance() or {
+        "available": float(balance[0].get("cashmarginavailable", 0.0)),
+        "total": float(balance[0].get("net", 0.0)),
+    }
+    conn = current_user.broker
+    today = date.today()
+    paper_trades = (
+        PaperTrade.query
+        .filter(db.func.date(PaperTrade.trade_date) == today)
+        .order_by(PaperTrade.id.desc())
+        .limit(20)
+        .all()
+    )
+    live_trades = (
+        LiveTrade.query
+        .filter(db.func.date(LiveTrade.trade_date) == today)
+        .order_by(LiveTrade.id.desc())
+        .limit(20)
+        .all()
+    )
+
     return render_template(
         "dashboard.html",
+        funds=funds,
+        today_pnl_paper=dhan_routes.get_today_pnl("PAPER"),
+        today_pnl_live=dhan_routes.get_today_pnl("LIVE"),
+        paper_trades=paper_trades,
+        livetrades=live_trades,
+        trade_mode=(conn and conn.trade_mode) or "PAPER",
+        broker_connected=is_broker_connected or dhan_routes.broker_connection is not None,
         profile=profile,
         balance=balance,
         nifty_ltp=nifty_ltp,
@@ -128,6 +191,7 @@ def dashboard():
         banknifty_orb_stop=banknifty_orb_stop,
         equity_labels=equity_labels,
         equity_values=equity_values,
+        strategies=strategies,
     )
 
 
@@ -135,6 +199,17 @@ def dashboard():
 @login_required
 def deploy_banknifty_orb():
     """Save/update BankNIFTY ORB config (lots) and enable it."""
+    return deploy_strategy(ORB_STRATEGY)
+
+
+@dash_bp.route("/bots/<strategy_name>/deploy", methods=["POST"])
+@login_required
+def deploy_strategy(strategy_name):
+    """Save/update a registry strategy's config (lots) and enable it."""
+    if strategy_name not in registry.discover():
+        flash(f"Unknown strategy: {strategy_name}", "danger")
+        return redirect(url_for("dash.dashboard"))
+
     lots_raw = request.form.get("lots", "1")
     try:
         lots = int(lots_raw)
@@ -147,13 +222,13 @@ def deploy_banknifty_orb():
         return redirect(url_for("dash.dashboard"))
 
     cfg = StrategyConfig.query.filter_by(
-        user_id=current_user.id, strategy_name="banknifty_orb_vwap"
+        user_id=current_user.id, strategy_name=strategy_name
     ).first()
 
     if not cfg:
         cfg = StrategyConfig(
             user_id=current_user.id,
-            strategy_name="banknifty_orb_vwap",
+            strategy_name=strategy_name,
             enabled=True,
             lots=lots,
             target_points=80,
@@ -166,20 +241,19 @@ def deploy_banknifty_orb():
         cfg.lots = lots
 
     db.session.commit()
+    user_cache.invalidate(current_user.id)
 
-    conn = BrokerConnection.query.filter_by(user_id=current_user.id).first()
+    conn = current_user.broker
     if conn and not conn.paper_trade and (conn.trade_mode == "LIVE"):
-        flash(f"BankNIFTY ORB deployed with {lots} lots (LIVE).", "success")
+        flash(f"{strategy_name} deployed with {lots} lots (LIVE).", "success")
     else:
-        flash(f"BankNIFTY ORB deployed with {lots} lots (Paper/Demo).", "success")
+        flash(f"{strategy_name} deployed with {lots} lots (Paper/Demo).", "success")
 
     return redirect(url_for("dash.dashboard"))
 
 
-@dash_bp.route("/reports")
-@login_required
-def reports():
-    """Basic reports page with date filter and summary stats."""
+def _report_range():
+    """Resolve (period, start_date, end_date) from the reports query string."""
     period = request.args.get("period", "daily")
     today = date.today()
     start_date = today
@@ -200,28 +274,177 @@ def reports():
         except ValueError:
             flash("Invalid date format. Use YYYY-MM-DD.", "danger")
 
-    start_dt = datetime.combine(start_date, datetime.min.time())
-    end_dt = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    return period, start_date, end_date
 
-    trades = (
-        Trade.query
-        .filter(Trade.user_id == current_user.id)
-        .filter(Trade.closed_at >= start_dt)
-        .filter(Trade.closed_at < end_dt)
-        .order_by(Trade.closed_at.desc())
-        .all()
+
+def _range_bounds(start_date, end_date):
+    """[start, end) datetimes covering the inclusive date range."""
+    return (datetime.combine(start_date, datetime.min.time()),
+            datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+
+
+def _range_filters(start_date, end_date):
+    start_dt, end_dt = _range_bounds(start_date, end_date)
+    return (
+        Trade.user_id == current_user.id,
+        Trade.closed_at >= start_dt,
+        Trade.closed_at < end_dt,
     )
 
-    total_pnl = sum(t.pnl for t in trades)
-    win_count = len([t for t in trades if t.pnl > 0])
-    win_rate = (win_count / len(trades) * 100) if trades else 0.0
+
+def _trade_key(trade):
+    return trade.closed_at, trade.id
+
+
+def _encode_cursor(trade):
+    return f"{trade.closed_at.isoformat()}_{trade.id}"
+
+
+def _decode_cursor(raw):
+    """'<closed_at iso>_<id>' -> (datetime, id), or None if malformed."""
+    try:
+        ts, trade_id = raw.rsplit("_", 1)
+        return datetime.fromisoformat(ts), int(trade_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+@dash_bp.route("/reports")
+@login_required
+def reports():
+    """
+    Reports page: summary stats plus a keyset-paginated trade table,
+    over the hot table and the archived months (trade_archive.py).
+    """
+    import trade_archive  # numpy: load on first use
+
+    period, start_date, end_date = _report_range()
+    filters = _range_filters(start_date, end_date)
+    start_dt, end_dt = _range_bounds(start_date, end_date)
+
+    # Summary computed by the database, not by loading rows, plus the
+    # same sums over the archive files
+    count, total_pnl, win_count = db.session.query(
+        func.count(Trade.id),
+        func.coalesce(func.sum(Trade.pnl), 0.0),
+        func.coalesce(func.sum(case((Trade.pnl > 0, 1), else_=0)), 0),
+    ).filter(*filters).one()
+    a_count, a_pnl, a_wins = trade_archive.summary("trade", "pnl", current_user.id, start_dt, end_dt)
+    count, total_pnl, win_count = count + a_count, total_pnl + a_pnl, win_count + a_wins
+    win_rate = (win_count / count * 100) if count else 0.0
+
+    try:
+        per_page = min(max(int(request.args.get("limit", REPORT_PAGE_SIZE)), 1), REPORT_MAX_PAGE_SIZE)
+    except ValueError:
+        per_page = REPORT_PAGE_SIZE
+
+    # Newest first; (closed_at, id) is the keyset. "after" pages towards
+    # older trades, "before" back towards newer ones.
+    after = _decode_cursor(request.args.get("after"))
+    before = _decode_cursor(request.args.get("before"))
+    query = Trade.query.filter(*filters)
+    if before:
+        ts, trade_id = before
+        query = query.filter(or_(
+            Trade.closed_at > ts, and_(Trade.closed_at == ts, Trade.id > trade_id)
+        )).order_by(Trade.closed_at.asc(), Trade.id.asc())
+    else:
+        if after:
+            ts, trade_id = after
+            query = query.filter(or_(
+                Trade.closed_at < ts, and_(Trade.closed_at == ts, Trade.id < trade_id)
+            ))
+        query = query.order_by(Trade.closed_at.desc(), Trade.id.desc())
+
+    # The next per_page + 1 rows of each tier, merged on the keyset
+    trades = query.limit(per_page + 1).all()
+    trades += trade_archive.page("trade", current_user.id, start_dt, end_dt,
+                                 after=after, before=before, limit=per_page + 1)
+    trades = sorted(trades, key=_trade_key, reverse=not before)[:per_page + 1]
+    has_more = len(trades) > per_page
+    trades = trades[:per_page]
+    if before:
+        trades.reverse()
+
+    # Keep the date filter in page / export links
+    range_args = {"from": start_date.isoformat(), "to": end_date.isoformat(), "limit": per_page}
+    next_url = prev_url = None
+    if trades:
+        if has_more or before:
+            next_url = url_for("dash.reports", after=_encode_cursor(trades[-1]), **range_args)
+        if after or (before and has_more):
+            prev_url = url_for("dash.reports", before=_encode_cursor(trades[0]), **range_args)
 
     return render_template(
         "reports.html",
         trades=trades,
         total_pnl=total_pnl,
         win_rate=win_rate,
+        trade_count=count,
         period=period,
         start_date=start_date,
         end_date=end_date,
+        next_url=next_url,
+        prev_url=prev_url,
+        export_url=url_for("dash.export_reports", **{"from": range_args["from"], "to": range_args["to"]}),
+    )
+
+
+@dash_bp.route("/api/analytics")
+@login_required
+def analytics():
+    """JSON performance metrics for the current user (cached per user)."""
+    from analytics import analytics_cache  # numpy: load on first use
+
+    return analytics_cache.get(current_user.id)
+
+
+@dash_bp.route("/reports/export")
+@login_required
+def export_reports():
+    """
+    Stream the selected range as CSV (format=excel adds a UTF-8 BOM so
+    Excel opens the ₹ values correctly). Rows are pulled from a
+    server-side cursor in chunks and merged with the archived months
+    one month at a time, so memory stays flat for any range.
+    """
+    import trade_archive  # numpy: load on first use
+
+    period, start_date, end_date = _report_range()
+    fmt = request.args.get("format", "csv")
+    columns = ("closed_at", "opened_at", "strategy_name", "symbol", "side",
+               "qty", "entry_price", "exit_price", "pnl", "id")
+    stmt = (
+        select(*[getattr(Trade, c) for c in columns])
+        .where(*_range_filters(start_date, end_date))
+        .order_by(Trade.closed_at.asc(), Trade.id.asc())
+        .execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS)
+    )
+
+    def generate():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if fmt == "excel":
+            buf.write("\ufeff")
+        writer.writerow(["closed_at", "opened_at", "strategy", "symbol", "side",
+                         "qty", "entry_price", "exit_price", "pnl"])
+        hot = (row for chunk in db.session.execute(stmt).partitions() for row in chunk)
+        archived = trade_archive.iter_tuples("trade", columns, current_user.id,
+                                             *_range_bounds(start_date, end_date))
+        # Both sorted by (closed_at, id): the last column is the id
+        rows = heapq.merge(archived, hot, key=lambda r: (r[0], r[-1]))
+        for i, row in enumerate(rows, 1):
+            writer.writerow(row[:-1])
+            if i % EXPORT_CHUNK_ROWS == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate(0)
+        if buf.tell():
+            yield buf.getvalue()
+
+    filename = f"trades_{start_date:%Y%m%d}_{end_date:%Y%m%d}.csv"
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
@@ -0,0 +1,110 @@
+# db_config.py
+"""
+Database engine settings shared by every process (web workers, strategy
+runner, paper engine), applied through create_app().
+
+SQLite (the default) is tuned for one writer + many readers across
+processes:
+
+* journal_mode=WAL: readers see the last committed snapshot and never
+  wait for a writer, and a writer never waits for readers. Needs a
+  local filesystem (not NFS / SMB).
+* synchronous=NORMAL: in WAL mode a commit is still atomic and survives
+  an application crash; only a power loss can drop the last commits.
+  Set SQLITE_SYNCHRONOUS=FULL to fsync every commit.
+* busy_timeout: a second writer waits up to SQLITE_BUSY_TIMEOUT_MS for
+  the write lock instead of failing with "database is locked". pysqlite
+  only opens a transaction at the first INSERT/UPDATE, so the lock is
+  taken (or waited for) up front and held only until the commit; keep
+  slow work (broker calls) out of those transactions.
+* One pool per process: DB_POOL_SIZE connections (defaults to the
+  gunicorn thread count) plus DB_MAX_OVERFLOW for bursts.
+
+PostgreSQL (DATABASE_URL=postgresql://..., Heroku's postgres:// works
+too) gets the same pool settings plus pre-ping and recycling. Schema
+changes for either backend live in migrations.py.
+"""
+import os
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Flask-SQLAlchemy puts relative SQLite paths in the app's instance folder
+INSTANCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance")
+DEFAULT_DATABASE_URI = "sqlite:///algo_users.db"
+
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", os.environ.get("GUNICORN_THREADS", 4)))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 8))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+
+
+def _is_file_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def database_uri() -> str:
+    """DATABASE_URL, else the default SQLite file."""
+    uri = os.environ.get("DATABASE_URL", DEFAULT_DATABASE_URI)
+    if uri.startswith("postgres://"):
+        uri = "postgresql://" + uri[len("postgres://"):]
+    return uri
+
+
+def engine_options(uri) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for `uri`."""
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite":
+        if not _is_file_sqlite(url):
+            return {}  # in-memory: SQLAlchemy's single-connection pool
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            # pooled connections move between request threads
+            "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000, "check_same_thread": False},
+        }
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    }
+
+
+def _sqlite_pragmas(dbapi_conn, _record):
+    cur = dbapi_conn.cursor()
+    try:
+        cur.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cur.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    finally:
+        cur.close()
+
+
+def create_engine(uri=None):
+    """An engine outside Flask (CLI tools), set up like the app's."""
+    url = make_url(uri or database_uri())
+    if _is_file_sqlite(url) and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(INSTANCE_PATH, url.database))
+    engine = sa.create_engine(url, **engine_options(url))
+    if _is_file_sqlite(url):
+        event.listen(engine, "connect", _sqlite_pragmas)
+    return engine
+
+
+def init_app(app, db):
+    """Set engine options before db.init_app(); hook SQLite pragmas after."""
+    options = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+    db.init_app(app)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if _is_file_sqlite(engine.url):
+                event.listen(engine, "connect", _sqlite_pragmas)
@@ -0,0 +1,131 @@
+# dhan_routes.py
+"""
+Dhan account controls used by the dashboard (formerly the standalone
+app.py): one process-wide Dhan session from DHAN_CLIENT_ID /
+DHAN_ACCESS_TOKEN, paper/live toggle, and the paper ORB switch.
+dhanhq is imported on first connect, not at app start-up.
+"""
+import os
+from datetime import date
+
+from flask import Blueprint, redirect, url_for, flash, request
+from flask_login import login_required, current_user
+
+from models import db, BrokerConnection, PaperTrade, LiveTrade
+from session_health import session_health
+from user_context import user_cache
+
+dhan_bp = Blueprint("dhan", __name__)
+
+DHAN_CLIENT_ID = os.environ.get("DHAN_CLIENT_ID")
+DHAN_ACCESS_TOKEN = os.environ.get("DHAN_ACCESS_TOKEN")
+
+broker_connection = None
+
+
+def connect_broker() -> bool:
+    """Create global Dhan connection."""
+    global broker_connection
+    try:
+        from dhanhq import dhanhq  # heavy SDK: load on first use only
+        from broker_limiter import limited
+
+        broker_connection = limited(dhanhq(client_id=DHAN_CLIENT_ID, access_token=DHAN_ACCESS_TOKEN),
+                                    "dhan", DHAN_CLIENT_ID)
+        print("Broker connected:", broker_connection)
+        return True
+    except Exception as e:
+        print("Broker connect error:", e)
+        broker_connection = None
+        return False
+
+
+def get_fund_balance():
+    """Return dict with available & total funds."""
+    if not broker_connection:
+        return None
+
+    try:
+        funds = broker_connection.get_fund_limits()
+        # Keys per Dhan docs: availableBalance, sodLimit etc.
+        available = float(funds.get("availableBalance", 0.0))
+        total = float(funds.get("sodLimit", 0.0))
+        return {"available": available, "total": total}
+    except Exception as e:
+        print("Funds error:", e)
+        return {"available": 0.0, "total": 0.0}
+
+
+def get_today_pnl(mode: str) -> float:
+    """Sum today's closed trades PnL."""
+    model = PaperTrade if mode == "PAPER" else LiveTrade
+    total = db.session.query(db.func.coalesce(db.func.sum(model.pnl_rupees), 0.0)).filter(
+        db.func.date(model.trade_date) == date.today(),
+        model.exit_price.isnot(None),
+    ).scalar()
+    return float(total)
+
+
+def _user_connection():
+    conn = BrokerConnection.query.filter_by(user_id=current_user.id).first()
+    if not conn:
+        conn = BrokerConnection(user_id=current_user.id, trade_mode="PAPER")
+        db.session.add(conn)
+    return conn
+
+
+@dhan_bp.route("/")
+def home():
+    return redirect(url_for("dash.dashboard"))
+
+
+@dhan_bp.route("/toggle_broker", methods=["POST"])
+@login_required
+def toggle_broker():
+    """Connect or disconnect the Dhan session with one button."""
+    global broker_connection
+
+    conn = _user_connection()
+    if broker_connection:
+        broker_connection = None
+        conn.trade_mode = "PAPER"
+        conn.paper_trade = True
+        flash("Broker disconnected. Switched to PAPER mode.", "success")
+    elif connect_broker():
+        flash("Broker connected. Live mode can be enabled.", "success")
+    else:
+        flash("Broker connection failed. Check credentials.", "danger")
+
+    db.session.commit()
+    user_cache.invalidate(current_user.id)
+    session_health.forget(current_user.id)
+    return redirect(url_for("dash.dashboard"))
+
+
+@dhan_bp.route("/toggle_mode", methods=["POST"])
+@login_required
+def toggle_mode():
+    """Switch between PAPER and LIVE (manual override)."""
+    mode = "LIVE" if request.form.get("mode", "paper").upper() == "LIVE" else "PAPER"
+    conn = _user_connection()
+    conn.trade_mode = mode
+    conn.paper_trade = mode != "LIVE"
+    db.session.commit()
+    user_cache.invalidate(current_user.id)
+    session_health.forget(current_user.id)
+    flash(f"Switched to {mode} mode.", "success")
+    return redirect(url_for("dash.dashboard"))
+
+
+@dhan_bp.route("/deploy_paper_orb")
+@login_required
+def deploy_paper_orb():
+    """Arm the paper ORB; trades are written by paper_orb.py with simulated fills."""
+    conn = _user_connection()
+    conn.trade_mode = "PAPER"
+    conn.paper_trade = True
+    db.session.commit()
+    user_cache.invalidate(current_user.id)
+    session_health.forget(current_user.id)
+    flash("Paper ORB armed. Trades appear here as paper_orb.py fills them.", "success")
+    return redirect(url_for("dash.dashboard"))
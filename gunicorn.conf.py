@@ -0,0 +1,92 @@
+# gunicorn.conf.py
+"""
+Production serving config (Procfile: gunicorn -c gunicorn.conf.py broker_gateway:application).
+
+broker_gateway runs on gunicorn's tornado worker: broker calls are
+awaited on the event loop and Flask views run on a pool of
+GUNICORN_THREADS threads. To serve plain WSGI instead, run wsgi:application
+with GUNICORN_WORKER_CLASS=gthread.
+
+The app is built once in the master (preload_app) together with its
+read-only state (compiled templates, numpy/analytics), then workers are
+forked and share those pages copy-on-write. Anything holding sockets or
+files is per-worker: SQLAlchemy pools are disposed right after fork so
+each worker opens its own connections.
+
+Sizing (benchmarks/serve_bench.py: 1 vCPU shared with the load generator,
+SQLite, 20 concurrent clients, GET /dashboard for a paper user):
+
+    workers x threads   preload   req/s   p95 ms   RSS/worker   PSS/worker
+    1 x 1               yes         135     181       61 MB        39 MB
+    2 x 1               yes         108     385       61 MB        33 MB
+    2 x 4               no          117     305       74 MB        60 MB
+    2 x 4               yes         121     277       62 MB        34 MB
+    3 x 4               no          100     366       73 MB        57 MB
+    3 x 4               yes         107     326       62 MB        31 MB
+
+Without the broker in the path, views are CPU-bound, so extra workers on
+one core only add context switching. Throughput scales with cores: start
+from WEB_CONCURRENCY = 2 x cores. Preloading cuts private memory per
+worker (PSS) by about 45%. That saving is what lets the worker count
+follow the core count on small dynos.
+
+Broker-bound pages (benchmarks/broker_gateway_bench.py: 1 worker, 4
+threads, fake broker answering in 200 ms, GET /dashboard):
+
+    clients   gthread req/s (p95)   gateway req/s (p95)
+    50         14  (5.5 s)           66  (0.9 s)
+    200        29  (21.7 s)         106  (2.4 s)
+
+With the gateway, broker waits don't hold a thread. So GUNICORN_THREADS
+only needs to cover Flask's DB/render work: 4 is plenty.
+
+Behind a proxy, set PROXY_FIX_HOPS to the number of proxies in front of
+gunicorn (app.py trusts that many X-Forwarded-For entries). It defaults
+to 1 on Heroku (DYNO set) and 0 elsewhere. Leaving it at 0 behind a proxy
+makes every login come from the proxy's address, so the per-IP login
+throttle locks out everyone at once.
+
+Every worker has its own broker rate-limit buckets (broker_limiter.py).
+The default broker limits are split over WEB_CONCURRENCY + 1 processes.
+If the runner or other processes share the account differently, set
+BROKER_PROCESSES.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2 * multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "tornado")
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+timeout = 60
+keepalive = 5
+# recycle slowly-growing workers (this also resets the in-process login
+# throttles in credentials.py; 0 disables)
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = 200
+
+
+def when_ready(server):
+    """Master, after the app is preloaded and before the first fork."""
+    if not server.cfg.preload_app:
+        return
+    from app import warm_shared_state
+
+    from wsgi import application
+
+    warm_shared_state(application)
+    # Move everything loaded so far out of the GC's reach: collections in
+    # workers would otherwise touch (and un-share) these pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Worker: drop connections inherited from the master, keep the engine."""
+    from models import db
+    from wsgi import application
+
+    with application.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,195 @@
+# market_calendar.py
+"""
+NSE trading calendar and a session-aware scheduler for the engines.
+
+Every trading day (weekdays that are not exchange holidays) runs through
+the same phases, in IST:
+
+    CLOSED      until 09:00, after 15:30, all day on holidays/weekends
+    PRE_OPEN    09:00-09:15  call auction; engines load configs, connect
+    ORB         09:15-09:20  opening range
+    TRADE       09:20-15:15
+    SQUARE_OFF  15:15-15:30  intraday positions are closed out
+
+SessionScheduler runs callbacks when a phase starts and interval jobs
+only while their phases are active. Between jobs it sleeps until the
+next one is due or the next phase boundary, so outside market hours the
+engines make no API calls and use no CPU.
+
+Holidays: NSE_HOLIDAYS below, from the exchange's yearly circulars.
+Add new years there each December, or list extra dates (YYYY-MM-DD, one
+per line, # comments) in the file named by MARKET_HOLIDAYS_FILE.
+"""
+import os
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+CLOSED, PRE_OPEN, ORB, TRADE, SQUARE_OFF = "CLOSED", "PRE_OPEN", "ORB", "TRADE", "SQUARE_OFF"
+
+# (phase, start) in order; the last phase runs to the end of the day
+PHASES = (
+    (PRE_OPEN, time(9, 0)),
+    (ORB, time(9, 15)),
+    (TRADE, time(9, 20)),
+    (SQUARE_OFF, time(15, 15)),
+    (CLOSED, time(15, 30)),
+)
+MARKET_PHASES = (ORB, TRADE, SQUARE_OFF)  # continuous trading, 09:15-15:30
+
+NSE_HOLIDAYS = frozenset(date.fromisoformat(d) for d in (
+    # 2025
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14",
+    "2025-04-18", "2025-05-01", "2025-08-15", "2025-08-27", "2025-10-02",
+    "2025-10-21", "2025-10-22", "2025-11-05", "2025-12-25",
+    # 2026
+    "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31", "2026-04-03",
+    "2026-04-14", "2026-05-01", "2026-05-28", "2026-06-26", "2026-09-14",
+    "2026-10-02", "2026-10-20", "2026-11-10", "2026-11-24", "2026-12-25",
+))
+
+MAX_SLEEP_SECONDS = 300  # re-check the clock at least this often
+
+
+def now_ist() -> datetime:
+    """Naive IST wall-clock time (what strategies compare against), on any server TZ."""
+    return datetime.now(IST).replace(tzinfo=None)
+
+
+def _load_holidays_file(path):
+    days = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                days.add(date.fromisoformat(line))
+    return days
+
+
+class MarketCalendar:
+    """Trading days and session phases; all datetimes are naive IST."""
+
+    def __init__(self, holidays=None, phases=PHASES):
+        self.holidays = set(NSE_HOLIDAYS if holidays is None else holidays)
+        path = os.environ.get("MARKET_HOLIDAYS_FILE")
+        if holidays is None and path:
+            self.holidays |= _load_holidays_file(path)
+        self.phases = phases
+        self._years = {d.year for d in self.holidays}
+        self._warned = set()
+
+    def is_trading_day(self, d: date) -> bool:
+        if d.year not in self._years and d.year not in self._warned:
+            self._warned.add(d.year)
+            print(f"[calendar] no holiday list for {d.year}; only weekends are treated as closed")
+        return d.weekday() < 5 and d not in self.holidays
+
+    def next_trading_day(self, d: date) -> date:
+        """First trading day after `d`."""
+        d += timedelta(days=1)
+        while not self.is_trading_day(d):
+            d += timedelta(days=1)
+        return d
+
+    def phase_at(self, ts: datetime) -> str:
+        if not self.is_trading_day(ts.date()):
+            return CLOSED
+        current = CLOSED
+        for phase, start in self.phases:
+            if ts.time() < start:
+                break
+            current = phase
+        return current
+
+    def next_boundary(self, ts: datetime):
+        """(when, phase) of the next phase change after `ts`."""
+        if self.is_trading_day(ts.date()):
+            for phase, start in self.phases:
+                if ts.time() < start:
+                    return datetime.combine(ts.date(), start), phase
+        first_phase, first_start = self.phases[0]
+        return datetime.combine(self.next_trading_day(ts.date()), first_start), first_phase
+
+    def session_open(self, ts: datetime) -> bool:
+        return self.phase_at(ts) in MARKET_PHASES
+
+
+class _Job:
+    __slots__ = ("seconds", "fn", "phases", "due")
+
+    def __init__(self, seconds, fn, phases):
+        self.seconds = seconds
+        self.fn = fn
+        self.phases = frozenset(phases)
+        self.due = None
+
+
+class SessionScheduler:
+    """
+    Single-threaded phase/interval scheduler:
+
+        sched = SessionScheduler()
+        sched.on_phase(PRE_OPEN, load_configs)         # fn(ts) at 09:00
+        sched.every(5, poll_ltp, phases=MARKET_PHASES)  # fn(ts) every 5 s, 09:15-15:30
+        sched.run()                                     # until stop() / Ctrl+C
+
+    A job is due as soon as one of its phases starts, then every `seconds`
+    while the phase lasts. Exceptions are printed and the job stays scheduled.
+    """
+
+    def __init__(self, calendar: MarketCalendar = None, clock=now_ist):
+        self.calendar = calendar or MarketCalendar()
+        self.clock = clock
+        self.phase = None
+        self._on_phase = {}
+        self._jobs = []
+        self._stop = threading.Event()
+
+    def on_phase(self, phase: str, fn):
+        self._on_phase.setdefault(phase, []).append(fn)
+        return fn
+
+    def every(self, seconds: float, fn, phases=MARKET_PHASES):
+        self._jobs.append(_Job(seconds, fn, phases))
+        return fn
+
+    def stop(self):
+        self._stop.set()
+
+    def _call(self, fn, ts):
+        try:
+            fn(ts)
+        except Exception as e:
+            print(f"[session] {getattr(fn, '__name__', fn)} error:", e)
+
+    def run_pending(self):
+        """Run phase callbacks / due jobs once; returns when to wake next (naive IST)."""
+        ts = self.clock()
+        phase = self.calendar.phase_at(ts)
+        if phase != self.phase:
+            self.phase = phase
+            boundary, next_phase = self.calendar.next_boundary(ts)
+            print(f"[session] {ts:%Y-%m-%d %H:%M:%S} {phase} (next: {next_phase} at {boundary:%a %d %b %H:%M})")
+            for job in self._jobs:
+                job.due = ts if phase in job.phases else None
+            for fn in self._on_phase.get(phase, ()):
+                self._call(fn, ts)
+
+        for job in self._jobs:
+            if job.due is not None and job.due <= ts:
+                self._call(job.fn, ts)
+                # Keep the cadence; skip ticks missed by a slow job
+                job.due = max(job.due + timedelta(seconds=job.seconds), ts)
+
+        wake, _ = self.calendar.next_boundary(ts)
+        for job in self._jobs:
+            if job.due is not None:
+                wake = min(wake, job.due)
+        return wake
+
+    def run(self):
+        while not self._stop.is_set():
+            wake = self.run_pending()
+            delay = (wake - self.clock()).total_seconds()
+            self._stop.wait(min(max(delay, 0.0), MAX_SLEEP_SECONDS))
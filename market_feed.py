@@ -0,0 +1,737 @@
+# market_feed.py
+"""
+Streaming market data: one websocket per broker, shared in-process.
+
+FeedManager owns the connection (DhanConnection wraps dhanhq's v2
+MarketFeed, AliceConnection pya3's websocket) on a reader thread:
+
+* Subscriptions are reference-counted per owner: strategies call
+  subscribe(owner, instruments) / unsubscribe(owner) at any time, and
+  the reader applies the net change to the open socket in batches
+  (every BATCH_SECONDS, at most SUBSCRIBE_CHUNK instruments a message).
+  With nothing subscribed there is no connection.
+* A failed or dropped connection is reopened with exponential backoff
+  (BACKOFF_MIN..BACKOFF_MAX seconds, jittered) and subscribes the full
+  current set again.
+* A watchdog restarts a connection that has gone silent for
+  FEED_STALE_SECONDS during market hours, and reports instruments with
+  no tick for STALE_SECONDS through on_stale(key, age). A jump of more
+  than GAP_SECONDS in an instrument's exchange time (or any reconnect)
+  is reported through on_gap(key, last_ts, ts, reason) so the consumer
+  can backfill, e.g. via candle_store.
+* Each packet is normalized once, in place, into a preallocated TickRing
+  of RING_SIZE Tick records (__slots__, integer instrument keys), so the
+  hot path allocates no per-tick containers. Listeners read the ring
+  through their own cursor and are handed one reused Tick buffer:
+  callbacks must copy() a tick (or the fields) they keep. A listener is
+  conflating (latest tick per instrument per wake-up; for LTP displays)
+  or FIFO with bounded backpressure (the reader waits up to
+  BLOCK_SECONDS for a full ring to drain, then overwrites the oldest
+  ticks, counted as dropped, without waiting again until the consumer
+  has caught up to half the ring), so one slow consumer cannot stall
+  the socket.
+
+Tick fields: seq, source, segment, security_id, key, ltp, volume, ts,
+received. key = instrument_key(segment, security_id); ts = exchange time
+as whole epoch seconds of the naive IST wall clock (Tick.time() gives
+the datetime); received = time.time().
+
+    feed = FeedManager(DhanConnection.from_env)
+    feed.listen(lambda tick: print(tick))
+    feed.subscribe("orb", [(IDX, 25, TICKER)])
+    feed.start()
+"""
+import asyncio
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from market_calendar import IST, MarketCalendar, now_ist
+
+# dhanhq MarketFeed exchange segments / request codes
+IDX, NSE, NSE_FNO, BSE, MCX = 0, 1, 2, 4, 5
+TICKER, QUOTE, FULL = 15, 17, 21
+
+BATCH_SECONDS = float(os.environ.get("FEED_BATCH_SECONDS", 0.25))
+SUBSCRIBE_CHUNK = 100        # instruments per subscribe message (Dhan limit)
+MAX_INSTRUMENTS = 5000       # per connection (Dhan limit)
+BACKOFF_MIN = 1.0
+BACKOFF_MAX = float(os.environ.get("FEED_BACKOFF_MAX", 30))
+FEED_STALE_SECONDS = float(os.environ.get("FEED_STALE_SECONDS", 15))
+STALE_SECONDS = float(os.environ.get("FEED_INSTRUMENT_STALE_SECONDS", 60))
+GAP_SECONDS = float(os.environ.get("FEED_GAP_SECONDS", 60))
+RING_SIZE = int(os.environ.get("FEED_RING_SIZE", 16384))  # power of two
+BLOCK_SECONDS = 0.05
+IST_OFFSET = int(IST.utcoffset(None).total_seconds())
+KEY_BITS = 32
+
+
+def instrument_key(segment: int, security_id: int) -> int:
+    """(segment, security_id) packed into one int, as in Tick.key."""
+    return segment << KEY_BITS | security_id
+
+
+def split_key(key: int):
+    return key >> KEY_BITS, key & ((1 << KEY_BITS) - 1)
+
+
+# ---------- ticks ----------
+
+class Tick:
+    """One normalized tick; ring slots and listener buffers are reused in place."""
+
+    __slots__ = ("seq", "source", "segment", "security_id", "key", "ltp", "volume", "ts", "received")
+
+    def __init__(self):
+        self.seq = -1
+        self.source = None
+        self.segment = self.security_id = self.key = 0
+        self.ltp = 0.0
+        self.volume = self.ts = None
+        self.received = 0.0
+
+    def time(self):
+        """Exchange time as a naive IST datetime."""
+        return datetime.utcfromtimestamp(self.ts) if self.ts is not None else None
+
+    def copy(self) -> "Tick":
+        tick = Tick()
+        for name in Tick.__slots__:
+            setattr(tick, name, getattr(self, name))
+        return tick
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in Tick.__slots__}
+
+    def __repr__(self):
+        return (f"Tick({self.source} {self.segment}:{self.security_id} ltp={self.ltp} "
+                f"volume={self.volume} ts={self.time()})")
+
+
+class TickRing:
+    """
+    RING_SIZE preallocated Tick slots, written only by the reader thread.
+    A committed slot carries its sequence number; a reader that finds a
+    different one (or -1, mid-write) has been lapped by the writer.
+    """
+
+    def __init__(self, size: int = RING_SIZE):
+        if size < 2 or size & (size - 1):
+            raise ValueError(f"ring size must be a power of two, got {size}")
+        self.size = size
+        self.mask = size - 1
+        self.slots = [Tick() for _ in range(size)]
+        self.head = 0  # sequence number of the next tick
+
+    def claim(self) -> Tick:
+        slot = self.slots[self.head & self.mask]
+        slot.seq = -1
+        return slot
+
+    def commit(self, slot: Tick):
+        slot.seq = self.head
+        self.head += 1
+
+
+class Listener:
+    """A cursor into the feed's ring, an optional key filter and callback thread."""
+
+    def __init__(self, ring: TickRing, cond: threading.Condition, keys=None,
+                 callback=None, conflate: bool = False):
+        self.ring = ring
+        self.keys = set(keys) if keys is not None else None
+        self.callback = callback
+        self.conflate = conflate
+        self.cursor = ring.head
+        self.tick = Tick()        # the buffer handed to the consumer
+        self.dropped = 0
+        self.conflated = 0
+        self.lagging = False      # the reader waited once: it overwrites until we catch up
+        self.thread = None
+        self._cond = cond
+        self._latest = {}         # conflate: key -> seq, reused across batches
+
+    def pending(self) -> int:
+        return self.ring.head - self.cursor
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the ring has ticks past our cursor."""
+        if self.ring.head > self.cursor:
+            return True
+        with self._cond:
+            return self._cond.wait_for(self.pending, timeout)
+
+    def _copy(self, seq) -> bool:
+        """Seqlock read of ring slot `seq` into self.tick; False if it was overwritten."""
+        slot = self.ring.slots[seq & self.ring.mask]
+        if slot.seq != seq:
+            return False
+        tick = self.tick
+        tick.seq = seq
+        tick.source = slot.source
+        tick.segment = slot.segment
+        tick.security_id = slot.security_id
+        tick.key = slot.key
+        tick.ltp = slot.ltp
+        tick.volume = slot.volume
+        tick.ts = slot.ts
+        tick.received = slot.received
+        return slot.seq == seq
+
+    def drain(self, fn) -> int:
+        """Hand every tick up to the ring head to fn(tick); returns how many."""
+        ring, keys, tick = self.ring, self.keys, self.tick
+        head = ring.head
+        start = self.cursor
+        if head - start > ring.size:
+            if self.conflate:
+                self.conflated += head - ring.size - start  # superseded ticks, not lost ones
+            else:
+                self.dropped += head - ring.size - start
+            start = head - ring.size
+        if self.conflate:
+            latest = self._latest
+            for seq in range(start, head):
+                slot = ring.slots[seq & ring.mask]
+                key = slot.key
+                if slot.seq != seq or (keys is not None and key not in keys):
+                    continue
+                if key in latest:
+                    self.conflated += 1
+                latest[key] = seq
+            seqs = latest.values()
+        else:
+            seqs = range(start, head)
+
+        delivered = 0
+        for seq in seqs:
+            if not self._copy(seq):
+                self.dropped += 1
+                continue
+            if keys is not None and tick.key not in keys:
+                continue
+            delivered += 1
+            try:
+                fn(tick)
+            except Exception as e:
+                print(f"[feed] listener {getattr(fn, '__name__', '?')} error:", e)
+        if self.conflate:
+            self._latest.clear()
+        self.cursor = head
+        if self.lagging and ring.head - head <= ring.size // 2:
+            self.lagging = False
+            with self._cond:
+                self._cond.notify_all()
+        return delivered
+
+    def run(self, stopping: threading.Event):
+        while not stopping.is_set():
+            if self.wait(timeout=0.5):
+                self.drain(self.callback)
+
+
+# ---------- broker connections ----------
+
+class DhanPackets:
+    """Normalizes dhanhq MarketFeed packets (dicts) into Tick slots."""
+
+    source = "dhan"
+
+    def __init__(self):
+        self._ltt = None      # last LTT string seen and its seconds after midnight
+        self._ltt_seconds = 0
+
+    def fill(self, tick: Tick, raw: dict, received: float) -> bool:
+        """Write packet `raw` into `tick`; False for non-price packets."""
+        ltp = raw.get("LTP")
+        if ltp is None:
+            return False  # previous close / OI / market status packets
+        segment = int(raw["exchange_segment"])
+        security_id = int(raw["security_id"])
+        volume = raw.get("volume")
+        tick.source = self.source
+        tick.segment = segment
+        tick.security_id = security_id
+        tick.key = segment << KEY_BITS | security_id
+        tick.ltp = float(ltp)
+        tick.volume = int(volume) if volume is not None else None
+        tick.ts = self._exchange_ts(raw.get("LTT"), received)
+        tick.received = received
+        return True
+
+    def _exchange_ts(self, ltt, received):
+        """Dhan sends LTT as 'HH:MM:SS' (dhanhq v2) or IST-shifted epoch seconds."""
+        if ltt is None:
+            return None
+        if isinstance(ltt, (int, float)):
+            return int(ltt)
+        if ltt != self._ltt:
+            try:
+                h, m, s = ltt.split(":")
+                self._ltt_seconds = int(h) * 3600 + int(m) * 60 + int(s)
+            except ValueError:
+                return None
+            self._ltt = ltt
+        # midnight of the IST day we received it on, in the same shifted epoch
+        return int(received + IST_OFFSET) // 86400 * 86400 + self._ltt_seconds
+
+
+class DhanConnection(DhanPackets):
+    """
+    dhanhq v2 MarketFeed behind the small interface FeedManager uses:
+    read() / fill() / subscribe() / unsubscribe() / close() on the reader
+    thread, interrupt() from any thread.
+    """
+
+    def __init__(self, instruments, client_id: str, access_token: str, version: str = "v2"):
+        from dhanhq import DhanContext, MarketFeed  # only where the feed runs
+
+        super().__init__()
+        # MarketFeed drives its socket with the calling thread's event loop
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.feed = MarketFeed(DhanContext(client_id, access_token),
+                               self._symbols(instruments), version)
+        self.feed.run_forever()  # connect + subscribe
+
+    @classmethod
+    def from_env(cls, instruments):
+        return cls(instruments, os.environ["DHAN_CLIENT_ID"], os.environ["DHAN_ACCESS_TOKEN"])
+
+    @staticmethod
+    def _symbols(instruments):
+        return [(segment, str(security_id), mode) for segment, security_id, mode in instruments]
+
+    def read(self):
+        """Raw packets from the socket (blocks)."""
+        data = self.feed.get_data()
+        return data if isinstance(data, list) else (data,)
+
+    def subscribe(self, instruments):
+        self.feed.subscribe_symbols(self._symbols(instruments))
+
+    def unsubscribe(self, instruments):
+        self.feed.unsubscribe_symbols(self._symbols(instruments))
+
+    def interrupt(self):
+        """Close the socket under a blocked read() so it raises."""
+        ws, loop = getattr(self.feed, "ws", None), getattr(self.feed, "loop", None)
+        if ws is not None and loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(lambda: loop.create_task(ws.close()))
+
+    def close(self):
+        try:
+            self.feed.disconnect()
+        except Exception as e:
+            print("[feed] dhan disconnect error:", e)
+
+
+# Dhan IDX security_id -> Alice Blue NSE index token (NIFTY, BANKNIFTY,
+# FINNIFTY, MIDCPNIFTY, INDIA VIX). Equity and F&O ids are the exchange
+# tokens on both brokers, so everything else maps one to one.
+ALICE_INDEX_TOKENS = {13: 26000, 25: 26009, 27: 26037, 442: 26074, 21: 26017}
+ALICE_EXCHANGES = {IDX: "NSE", NSE: "NSE", NSE_FNO: "NFO", BSE: "BSE", MCX: "MCX"}
+_ALICE_SEGMENTS = {"NSE": NSE, "NFO": NSE_FNO, "BSE": BSE, "MCX": MCX}
+_ALICE_INDEX_IDS = {token: security_id for security_id, token in ALICE_INDEX_TOKENS.items()}
+_CLOSED = object()
+
+
+class AlicePackets:
+    """Normalizes Alice Blue websocket messages (JSON text) into Tick slots."""
+
+    source = "alice"
+
+    def fill(self, tick: Tick, raw, received: float) -> bool:
+        msg = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+        if msg.get("t") not in ("tk", "tf"):
+            return False  # acks / depth / heartbeats
+        ltp = msg.get("lp")
+        segment = _ALICE_SEGMENTS.get(msg.get("e"))
+        if ltp is None or segment is None:
+            return False  # "tf" updates only carry the fields that changed
+        security_id = int(msg["tk"])
+        if segment == NSE and security_id in _ALICE_INDEX_IDS:
+            segment, security_id = IDX, _ALICE_INDEX_IDS[security_id]
+        volume, ft = msg.get("v"), msg.get("ft")
+        tick.source = self.source
+        tick.segment = segment
+        tick.security_id = security_id
+        tick.key = segment << KEY_BITS | security_id
+        tick.ltp = float(ltp)
+        tick.volume = int(volume) if volume is not None else None
+        # ft is UTC epoch seconds; shift it to the naive-IST epoch Dhan uses
+        tick.ts = int(ft) + IST_OFFSET if ft else None
+        tick.received = received
+        return True
+
+
+class AliceConnection(AlicePackets):
+    """
+    pya3's websocket (which runs its own thread and calls back per
+    message) behind the same interface as DhanConnection: messages go
+    through an inbox that read() blocks on.
+    """
+
+    OPEN_TIMEOUT = 10
+
+    def __init__(self, instruments, user_id: str, api_key: str):
+        from pya3 import Aliceblue  # only where the feed runs
+        from broker_limiter import limited
+
+        self._inbox = queue.SimpleQueue()
+        self._opened = threading.Event()
+        self._error = None
+        self.alice = limited(Aliceblue(user_id=user_id, api_key=api_key), "aliceblue", user_id)
+        self.alice.get_session_id()
+        self.alice.start_websocket(
+            socket_open_callback=self._opened.set,
+            socket_close_callback=self._on_close,
+            socket_error_callback=self._on_error,
+            subscription_callback=self._inbox.put,
+            run_in_background=True,
+        )
+        if not self._opened.wait(self.OPEN_TIMEOUT):
+            self.close()
+            raise ConnectionError("alice websocket did not open")
+        self.subscribe(instruments)
+
+    @classmethod
+    def from_env(cls, instruments):
+        return cls(instruments, os.environ["ALICE_USER_ID"], os.environ["ALICE_API_KEY"])
+
+    @staticmethod
+    def _instruments(instruments):
+        from pya3 import Instrument
+
+        out = []
+        for segment, security_id, _ in instruments:
+            token = ALICE_INDEX_TOKENS.get(security_id, security_id) if segment == IDX else security_id
+            out.append(Instrument(ALICE_EXCHANGES[segment], token, "", "", None, None))
+        return out
+
+    def _on_close(self, *args):
+        self._inbox.put(_CLOSED)
+
+    def _on_error(self, error, *args):
+        self._error = error
+        self._inbox.put(_CLOSED)
+
+    def read(self):
+        """Raw messages from the socket (blocks); at most 500 a call."""
+        item = self._inbox.get()
+        packets = []
+        while item is not _CLOSED:
+            packets.append(item)
+            if len(packets) >= 500:
+                return packets
+            try:
+                item = self._inbox.get_nowait()
+            except queue.Empty:
+                return packets
+        if packets:
+            self._inbox.put(_CLOSED)  # hand these over, fail on the next read
+            return packets
+        raise ConnectionError(f"alice websocket closed ({self._error or 'no error'})")
+
+    def subscribe(self, instruments):
+        self.alice.subscribe(self._instruments(instruments))
+
+    def unsubscribe(self, instruments):
+        self.alice.unsubscribe(self._instruments(instruments))
+
+    def interrupt(self):
+        self._inbox.put(_CLOSED)
+
+    def close(self):
+        try:
+            self.alice.stop_websocket()
+        except Exception as e:
+            print("[feed] alice disconnect error:", e)
+
+
+# ---------- manager ----------
+
+class TickBus:
+    """A TickRing and its listeners; FeedManager and market_router.MarketRouter publish into one."""
+
+    def __init__(self, name: str, ring_size: int = RING_SIZE):
+        self.name = name
+        self.ring = TickRing(ring_size)
+        self._listeners = []
+        self._room_until = 0              # ring head at which to check FIFO listeners again
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()  # ring head moved / a lagging listener drained
+        self._stopping = threading.Event()
+
+    def listen(self, callback=None, instruments=None, conflate: bool = False) -> Listener:
+        """
+        Register a consumer. With a callback it gets its own thread;
+        without one, call listener.wait(timeout) / listener.drain(fn).
+        `instruments` filters on (segment, security_id) pairs.
+        """
+        keys = None if instruments is None else {instrument_key(int(s), int(i)) for s, i, *_ in instruments}
+        listener = Listener(self.ring, self._cond, keys, callback, conflate)
+        with self._lock:
+            self._listeners = self._listeners + [listener]
+            self._room_until = 0
+        if callback is not None:
+            listener.thread = threading.Thread(target=listener.run, args=(self._stopping,),
+                                               name=f"{self.name}-listener", daemon=True)
+            listener.thread.start()
+        return listener
+
+    def remove_listener(self, listener: Listener):
+        with self._lock:
+            self._listeners = [l for l in self._listeners if l is not listener]
+
+    def _make_room(self):
+        """
+        The next slot may still be unread by a FIFO listener: wait once
+        (BLOCK_SECONDS) for it, then let the ring overwrite until the
+        listener has caught up to half the ring.
+        """
+        ring = self.ring
+        oldest = ring.head
+        for listener in self._listeners:
+            if listener.conflate:
+                continue
+            if ring.head - listener.cursor >= ring.size and not listener.lagging:
+                listener.lagging = True
+                with self._cond:
+                    self._cond.notify_all()
+                    self._cond.wait_for(lambda: ring.head - listener.cursor < ring.size, BLOCK_SECONDS)
+            if not listener.lagging:
+                oldest = min(oldest, listener.cursor)
+        self._room_until = oldest + ring.size
+
+    def _wake_listeners(self):
+        with self._cond:
+            self._cond.notify_all()
+
+
+class FeedManager(TickBus):
+    def __init__(self, connect, calendar: MarketCalendar = None, name: str = None,
+                 ring_size: int = RING_SIZE):
+        super().__init__(name or getattr(getattr(connect, "__self__", None), "source", "feed"), ring_size)
+        self.connect = connect            # connect(instruments) -> connection
+        self.calendar = calendar or MarketCalendar()
+        self.on_gap = None                # fn((segment, security_id), last_dt, dt, reason)
+        self.on_stale = None              # fn((segment, security_id), age_seconds)
+        self.on_tick = None               # fn(feed, tick) on the reader thread, after the ring commit
+        self.on_batch = None              # fn(feed) after each published batch
+
+        self.connected = False
+        self.reconnects = 0
+        self.messages = 0
+        self.last_message = None          # monotonic
+        self.gaps = deque(maxlen=200)
+        self.stale = set()                # keys with no tick for STALE_SECONDS
+
+        self._owners = {}                 # owner -> set of (segment, security_id, mode)
+        self._active = set()              # instruments on the open socket
+        self._dirty = False
+        self._last_received = {}          # key -> time.time() of its last tick
+        self._last_ts = {}                # key -> exchange ts of its last tick
+        self._conn = None
+        self._resumed = set()             # keys whose next tick follows a reconnect
+        self._wake = threading.Event()
+        self._threads = []
+
+    # ---------- subscriptions (any thread) ----------
+
+    def subscribe(self, owner: str, instruments):
+        """Add (segment, security_id, mode) instruments for `owner`."""
+        with self._lock:
+            self._owners.setdefault(owner, set()).update(
+                (int(seg), int(sid), int(mode)) for seg, sid, mode in instruments
+            )
+            self._dirty = True
+        self._wake.set()
+
+    def unsubscribe(self, owner: str, instruments=None):
+        """Drop some (or all) of `owner`'s instruments."""
+        with self._lock:
+            mine = self._owners.get(owner, set())
+            if instruments is None:
+                mine.clear()
+            else:
+                mine.difference_update((int(seg), int(sid), int(mode)) for seg, sid, mode in instruments)
+            if not mine:
+                self._owners.pop(owner, None)
+            self._dirty = True
+        self._wake.set()
+
+    def wanted(self) -> set:
+        with self._lock:
+            return set().union(*self._owners.values()) if self._owners else set()
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        for target, label in ((self._run, "reader"), (self._watch, "watchdog")):
+            t = threading.Thread(target=target, name=f"{self.name}-{label}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+        self._wake_listeners()
+        conn = self._conn
+        if conn is not None:
+            conn.interrupt()
+        for t in self._threads:
+            t.join(timeout=5)
+
+    def status(self) -> dict:
+        age = time.monotonic() - self.last_message if self.last_message else None
+        return {
+            "connected": self.connected,
+            "instruments": len(self._active),
+            "reconnects": self.reconnects,
+            "messages": self.messages,
+            "last_message_age": round(age, 1) if age is not None else None,
+            "stale": sorted(split_key(key) for key in self.stale),
+            "gaps": len(self.gaps),
+            "dropped": sum(l.dropped for l in self._listeners),
+        }
+
+    # ---------- reader thread ----------
+
+    def _apply_changes(self, conn):
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+        wanted = self.wanted()
+        added, removed = sorted(wanted - self._active), sorted(self._active - wanted)
+        for i in range(0, len(removed), SUBSCRIBE_CHUNK):
+            conn.unsubscribe(removed[i:i + SUBSCRIBE_CHUNK])
+        for i in range(0, len(added), SUBSCRIBE_CHUNK):
+            conn.subscribe(added[i:i + SUBSCRIBE_CHUNK])
+        self._active = wanted
+        if added or removed:
+            print(f"[feed] {self.name}: +{len(added)} -{len(removed)} instruments ({len(wanted)} subscribed)")
+
+    def _run(self):
+        backoff = BACKOFF_MIN
+        while not self._stopping.is_set():
+            wanted = self.wanted()
+            if not wanted:
+                self._wake.wait(1.0)  # nothing to stream: stay disconnected
+                self._wake.clear()
+                continue
+            if len(wanted) > MAX_INSTRUMENTS:
+                print(f"[feed] {self.name}: {len(wanted)} instruments requested, limit {MAX_INSTRUMENTS}")
+
+            conn = None
+            try:
+                with self._lock:
+                    self._dirty = False
+                conn = self.connect(sorted(wanted))
+                self._conn, self._active = conn, wanted
+                self.connected = True
+                self.last_message = time.monotonic()
+                print(f"[feed] {self.name}: connected, {len(wanted)} instruments")
+                next_batch = 0.0
+                while not self._stopping.is_set():
+                    now = time.monotonic()
+                    if now >= next_batch:
+                        self._apply_changes(conn)
+                        next_batch = now + BATCH_SECONDS
+                    if not self._active:
+                        break  # everything unsubscribed: close the socket
+                    packets = conn.read()
+                    self.last_message = time.monotonic()
+                    backoff = BACKOFF_MIN
+                    self.publish(conn, packets, time.time())
+            except Exception as e:
+                if not self._stopping.is_set():
+                    print(f"[feed] {self.name}: connection error: {e!r}")
+            finally:
+                self._conn = None
+                self.connected = False
+                if conn is not None:
+                    conn.close()
+                    self._resumed = set(self._last_ts)
+
+            if self._stopping.is_set() or not self.wanted():
+                continue
+            delay = backoff * random.uniform(0.5, 1.0)
+            print(f"[feed] {self.name}: reconnecting in {delay:.1f}s")
+            self._stopping.wait(delay)
+            backoff = min(backoff * 2, BACKOFF_MAX)
+            self.reconnects += 1
+
+    def publish(self, conn, packets, received: float):
+        """Normalize a batch of raw packets into the ring and wake the listeners."""
+        ring = self.ring
+        last_ts, last_received = self._last_ts, self._last_received
+        for packet in packets:
+            if ring.head >= self._room_until:
+                self._make_room()
+            slot = ring.claim()
+            if not packet or not conn.fill(slot, packet, received):
+                continue
+            ring.commit(slot)
+            self.messages += 1
+
+            key, ts = slot.key, slot.ts
+            previous = last_ts.get(key)
+            last_ts[key] = ts
+            last_received[key] = received
+            if self.stale and key in self.stale:
+                self.stale.discard(key)
+            if previous is not None and ts is not None:
+                resumed = key in self._resumed if self._resumed else False
+                if resumed:
+                    self._resumed.discard(key)
+                if ts - previous > GAP_SECONDS or (resumed and ts > previous):
+                    self._gap(key, previous, ts, "reconnect" if resumed else "silence")
+            if self.on_tick is not None:
+                self.on_tick(self, slot)
+        self._wake_listeners()
+        if self.on_batch is not None:
+            self.on_batch(self)
+
+    def _gap(self, key, last_ts, ts, reason):
+        key, last_dt, dt = split_key(key), datetime.utcfromtimestamp(last_ts), datetime.utcfromtimestamp(ts)
+        self.gaps.append((key, last_dt, dt, reason))
+        if self.on_gap:
+            try:
+                self.on_gap(key, last_dt, dt, reason)
+            except Exception as e:
+                print("[feed] on_gap error:", e)
+
+    # ---------- watchdog thread ----------
+
+    def _watch(self):
+        while not self._stopping.wait(1.0):
+            if not self.calendar.session_open(now_ist()):
+                continue
+            now = time.monotonic()
+            conn = self._conn
+            if conn is not None and self.last_message and now - self.last_message > FEED_STALE_SECONDS:
+                print(f"[feed] {self.name}: no data for {now - self.last_message:.0f}s, reconnecting")
+                self.last_message = now  # one interrupt per stale period
+                conn.interrupt()
+
+            wall = time.time()
+            wanted = {instrument_key(seg, sid) for seg, sid, _ in self.wanted()}
+            for key, received in list(self._last_received.items()):
+                if key not in wanted:
+                    self._last_received.pop(key, None)
+                    self._last_ts.pop(key, None)
+                    self.stale.discard(key)
+                elif key not in self.stale and wall - received > STALE_SECONDS:
+                    self.stale.add(key)
+                    if self.on_stale:
+                        try:
+                            self.on_stale(split_key(key), wall - received)
+                        except Exception as e:
+                            print("[feed] on_stale error:", e)
@@ -0,0 +1,176 @@
+# market_router.py
+"""
+One tick stream from several brokers' feeds at once (Dhan + Alice Blue).
+
+Every source is a market_feed.FeedManager subscribed to the same
+instruments (hot standby). Both connections normalize ticks into the
+same Tick layout and (segment, security_id) keys; AliceConnection maps
+its exchange tokens onto Dhan's ids. The router runs on the sources'
+reader threads (FeedManager.on_tick), so routing adds a lock and a ring
+write per tick, not a thread hop, and publishes into its own ring with
+the usual listen() API.
+
+Per instrument one source is active; its ticks go through, the other
+sources' copies are dropped as duplicates. A standby source takes over
+an instrument when its tick arrives and the active source
+
+    disconnected  has lost its connection
+    stale         has sent nothing for the instrument for ROUTER_STALE_SECONDS
+    lagging       is more than ROUTER_LAG_SECONDS behind in exchange time
+
+and a source earlier in `feeds` takes it back (preferred) once it has
+caught up with the exchange time already routed. Routed ticks never go
+back in exchange time: older ones (a slower source after a switch) are
+dropped as late, and a same-second repeat of the last routed price
+right after a switch as a duplicate.
+
+    router = MarketRouter([FeedManager(DhanConnection.from_env), FeedManager(AliceConnection.from_env)])
+    router.listen(on_tick)
+    router.subscribe("orb", [(IDX, 25, TICKER)])
+    router.start()
+"""
+import os
+import threading
+from collections import Counter, deque
+
+from market_feed import RING_SIZE, TickBus, split_key
+
+ROUTER_STALE_SECONDS = float(os.environ.get("ROUTER_STALE_SECONDS", 2))
+ROUTER_LAG_SECONDS = float(os.environ.get("ROUTER_LAG_SECONDS", 2))
+
+
+class MarketRouter(TickBus):
+    def __init__(self, feeds, name: str = "router", ring_size: int = RING_SIZE):
+        super().__init__(name, ring_size)
+        self.feeds = list(feeds)          # in order of preference
+        self.on_failover = None           # fn((segment, security_id), from_source, to_source, reason)
+
+        self.routed = 0
+        self.duplicates = 0
+        self.late = 0
+        self.switches = Counter()         # reason -> count
+        self.recent = deque(maxlen=200)   # (key, from, to, reason)
+
+        self._rank = {id(feed): i for i, feed in enumerate(self.feeds)}
+        self._heard = [{} for _ in self.feeds]  # per source: key -> received of its last tick
+        self._active = {}                 # key -> rank of the source being routed
+        self._last_ts = {}                # key -> exchange ts of the last routed tick
+        self._last_ltp = {}
+        self._switched = set()            # keys switched since their last routed tick
+        self._route_lock = threading.Lock()
+        for feed in self.feeds:
+            feed.on_tick = self._route
+            feed.on_batch = self._flush
+
+    # ---------- subscriptions / lifecycle (any thread) ----------
+
+    def subscribe(self, owner: str, instruments):
+        instruments = list(instruments)
+        for feed in self.feeds:
+            feed.subscribe(owner, instruments)
+
+    def unsubscribe(self, owner: str, instruments=None):
+        instruments = list(instruments) if instruments is not None else None
+        for feed in self.feeds:
+            feed.unsubscribe(owner, instruments)
+
+    def wanted(self) -> set:
+        return self.feeds[0].wanted() if self.feeds else set()
+
+    def start(self):
+        for feed in self.feeds:
+            feed.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        self._wake_listeners()
+        for feed in self.feeds:
+            feed.stop()
+
+    def status(self) -> dict:
+        active = Counter(self.feeds[rank].name for rank in list(self._active.values()))
+        return {
+            "sources": {feed.name: feed.status() for feed in self.feeds},
+            "active": dict(active),
+            "routed": self.routed,
+            "duplicates": self.duplicates,
+            "late": self.late,
+            "switches": dict(self.switches),
+            "dropped": sum(l.dropped for l in self._listeners),
+        }
+
+    # ---------- sources' reader threads ----------
+
+    def _route(self, feed, tick):
+        rank = self._rank[id(feed)]
+        key, ts = tick.key, tick.ts
+        with self._route_lock:
+            self._heard[rank][key] = tick.received
+            active = self._active.get(key)
+            if active is None:
+                self._active[key] = rank
+            elif active != rank:
+                reason = self._takeover(key, active, rank, tick)
+                if reason is None:
+                    self.duplicates += 1
+                    return
+                self._switch(key, active, rank, reason)
+
+            last = self._last_ts.get(key)
+            if last is not None and ts is not None:
+                if ts < last:
+                    self.late += 1
+                    return
+                if key in self._switched:
+                    self._switched.discard(key)
+                    if ts == last and tick.ltp == self._last_ltp.get(key):
+                        self.duplicates += 1
+                        return
+
+            ring = self.ring
+            if ring.head >= self._room_until:
+                self._make_room()
+            slot = ring.claim()
+            slot.source = tick.source
+            slot.segment = tick.segment
+            slot.security_id = tick.security_id
+            slot.key = key
+            slot.ltp = tick.ltp
+            slot.volume = tick.volume
+            slot.ts = ts
+            slot.received = tick.received
+            ring.commit(slot)
+            self.routed += 1
+            if ts is not None:
+                self._last_ts[key] = ts
+            self._last_ltp[key] = tick.ltp
+
+    def _takeover(self, key, active, rank, tick):
+        """Why source `rank` should replace `active` for this instrument, or None."""
+        if not self.feeds[active].connected:
+            return "disconnected"
+        heard = self._heard[active].get(key)
+        if heard is None or tick.received - heard > ROUTER_STALE_SECONDS:
+            return "stale"
+        last, ts = self._last_ts.get(key), tick.ts
+        if rank < active and (last is None or ts is None or ts >= last):
+            return "preferred"
+        if last is not None and ts is not None and ts - last > ROUTER_LAG_SECONDS:
+            return "lagging"
+        return None
+
+    def _switch(self, key, old, new, reason):
+        self._active[key] = new
+        self._switched.add(key)
+        self.switches[reason] += 1
+        pair, src, dst = split_key(key), self.feeds[old].name, self.feeds[new].name
+        self.recent.append((pair, src, dst, reason))
+        if self.on_failover:
+            try:
+                self.on_failover(pair, src, dst, reason)
+            except Exception as e:
+                print("[router] on_failover error:", e)
+
+    def _flush(self, feed):
+        self._wake_listeners()
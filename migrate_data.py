@@ -0,0 +1,196 @@
+# migrate_data.py
+"""
+Copy data from the old SQLite files into the current database
+(DATABASE_URL, normally PostgreSQL), which is migrated first.
+
+    DATABASE_URL=postgresql://... python migrate_data.py instance/algo_users.db instance/users.db
+
+Handles every layout in instance/:
+  * user: matched by email; a user already in the target keeps its
+    password. Legacy werkzeug hashes are copied (they still verify and are
+    upgraded on login); plaintext passwords (users_old.db, users_v2.db)
+    are bcrypt-hashed on the way in.
+  * broker_connection / strategy_config: copied for users that don't
+    have one yet (per strategy name), with user ids mapped.
+  * trade, paper_trade, live_trade: streamed in id order and written in
+    batches of --batch rows, one transaction per batch. The last copied
+    source id is saved in import_progress in the same transaction, so an
+    interrupted run resumes where it stopped and a rerun copies nothing
+    twice. Memory use does not grow with the size of the history.
+
+Pass the newest file first: the first file to mention a user wins.
+"""
+import argparse
+import os
+import time
+
+import sqlalchemy as sa
+
+import db_config
+import migrations
+from credentials import hash_password
+from models import (
+    User, BrokerConnection, StrategyConfig, Trade, PaperTrade, LiveTrade, ImportProgress,
+)
+
+BATCH_ROWS = 5000
+LEGACY_HASH_PREFIXES = (b"$2", b"scrypt:", b"pbkdf2:")
+
+
+def _password_hash(row) -> bytes:
+    stored = row.get("password_hash") or row.get("password") or b""
+    stored = stored if isinstance(stored, bytes) else stored.encode()
+    if stored.startswith(LEGACY_HASH_PREFIXES):
+        return stored
+    return hash_password(stored.decode())  # legacy plaintext
+
+
+def import_users(src, dst, tables) -> dict:
+    """{source user id: target user id}; creates users missing in the target."""
+    users = tables["user"]
+    target = User.__table__
+    mapping, created = {}, 0
+    with dst.begin() as conn:
+        existing = dict(conn.execute(sa.select(target.c.email, target.c.id)).all())
+        for row in src.execute(sa.select(users)).mappings():
+            email = (row["email"] or "").strip().lower()
+            if not email:
+                continue
+            if email not in existing:
+                result = conn.execute(target.insert().values(email=email, password_hash=_password_hash(row)))
+                existing[email] = result.inserted_primary_key[0]
+                created += 1
+            mapping[row["id"]] = existing[email]
+    print(f"  user: {len(mapping)} matched, {created} created")
+    return mapping
+
+
+def import_user_settings(src, dst, tables, users: dict):
+    """First broker connection per user, strategy configs per (user, name)."""
+    if "broker_connection" in tables:
+        source = tables["broker_connection"]
+        target = BrokerConnection.__table__
+        copied = 0
+        with dst.begin() as conn:
+            have = set(conn.scalars(sa.select(target.c.user_id)))
+            for row in src.execute(sa.select(source).order_by(source.c.id)).mappings():
+                user_id = users.get(row["user_id"])
+                if user_id is None or user_id in have:
+                    continue
+                conn.execute(target.insert().values(
+                    user_id=user_id, broker=row.get("broker") or "aliceblue",
+                    api_key=row.get("api_key"), session_id=row.get("session_id"),
+                    paper_trade=row.get("paper_trade"), trade_mode=row.get("trade_mode"),
+                ))
+                have.add(user_id)
+                copied += 1
+        print(f"  broker_connection: {copied} copied")
+
+    if "strategy_config" in tables:
+        source = tables["strategy_config"]
+        target = StrategyConfig.__table__
+        columns = ("strategy_name", "enabled", "lots", "target_points", "stop_points", "daily_max_loss")
+        copied = 0
+        with dst.begin() as conn:
+            have = set(conn.execute(sa.select(target.c.user_id, target.c.strategy_name)).all())
+            for row in src.execute(sa.select(source).order_by(source.c.id)).mappings():
+                user_id = users.get(row["user_id"])
+                if user_id is None or (user_id, row["strategy_name"]) in have:
+                    continue
+                conn.execute(target.insert().values(
+                    user_id=user_id, **{c: row.get(c) for c in columns}
+                ))
+                have.add((user_id, row["strategy_name"]))
+                copied += 1
+        print(f"  strategy_config: {copied} copied")
+
+
+def _save_progress(conn, source_key, table_name, last_id, rows):
+    progress = ImportProgress.__table__
+    match = (progress.c.source == source_key) & (progress.c.table_name == table_name)
+    updated = conn.execute(progress.update().where(match).values(
+        last_id=last_id, rows=progress.c.rows + rows,
+    ))
+    if not updated.rowcount:
+        conn.execute(progress.insert().values(
+            source=source_key, table_name=table_name, last_id=last_id, rows=rows,
+        ))
+
+
+def copy_rows(src, dst, source_key, source, target, transform, batch: int):
+    """Stream `source` (id order) into `target`, committing every `batch` rows."""
+    progress = ImportProgress.__table__
+    with dst.connect() as conn:
+        last_id = conn.scalar(sa.select(progress.c.last_id).where(
+            (progress.c.source == source_key) & (progress.c.table_name == source.name)
+        )) or 0
+
+    started, copied = time.perf_counter(), 0
+    result = src.execution_options(yield_per=batch).execute(
+        sa.select(source).where(source.c.id > last_id).order_by(source.c.id)
+    )
+    for chunk in result.mappings().partitions():
+        rows = [r for r in (transform(row) for row in chunk) if r is not None]
+        with dst.begin() as conn:
+            if rows:
+                conn.execute(target.insert(), rows)
+            _save_progress(conn, source_key, source.name, chunk[-1]["id"], len(rows))
+        copied += len(rows)
+
+    elapsed = time.perf_counter() - started
+    rate = f", {copied / elapsed:,.0f} rows/s" if copied and elapsed else ""
+    print(f"  {source.name}: {copied} copied (from id > {last_id}){rate}")
+    return copied
+
+
+def import_file(path, dst, batch=BATCH_ROWS):
+    source_key = os.path.realpath(path)
+    src_engine = sa.create_engine(f"sqlite:///{source_key}")
+    md = sa.MetaData()
+    md.reflect(src_engine)
+    tables = md.tables
+    print(f"{path}: {', '.join(sorted(tables)) or 'no tables'}")
+
+    with src_engine.connect() as src:
+        users = import_users(src, dst, tables) if "user" in tables else {}
+        import_user_settings(src, dst, tables, users)
+
+        if "trade" in tables:
+            columns = [c.name for c in Trade.__table__.columns if c.name not in ("id", "user_id")]
+
+            def trade_row(row):
+                user_id = users.get(row["user_id"])
+                if user_id is None:
+                    return None
+                return dict({c: row.get(c) for c in columns}, user_id=user_id)
+
+            copy_rows(src, dst, source_key, tables["trade"], Trade.__table__, trade_row, batch)
+
+        for model in (PaperTrade, LiveTrade):
+            name = model.__tablename__
+            if name in tables:
+                columns = [c.name for c in model.__table__.columns if c.name != "id"]
+                copy_rows(src, dst, source_key, tables[name], model.__table__,
+                          lambda row, columns=columns: {c: row.get(c) for c in columns}, batch)
+    src_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="copy old SQLite files into DATABASE_URL")
+    parser.add_argument("files", nargs="+", help="SQLite files, newest first")
+    parser.add_argument("--to", help="target database URL (default: DATABASE_URL)")
+    parser.add_argument("--batch", type=int, default=BATCH_ROWS, help="rows per transaction")
+    args = parser.parse_args()
+
+    dst = db_config.create_engine(args.to)
+    if dst.url.get_backend_name() == "sqlite" and any(
+        os.path.realpath(f) == os.path.realpath(dst.url.database or "") for f in args.files
+    ):
+        parser.error("the target database is also a source file")
+    migrations.upgrade(dst)
+    for path in args.files:
+        import_file(path, dst, args.batch)
+
+
+if __name__ == "__main__":
+    main()
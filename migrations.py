@@ -0,0 +1,244 @@
+# migrations.py
+"""
+Versioned schema migrations for SQLite and PostgreSQL.
+
+MIGRATIONS is an ordered list of (version, description, function); each
+function gets a SQLAlchemy Connection. They are written to be
+idempotent (create if missing, add column if missing), so upgrade() can
+adopt databases made by the old db.create_all() / instance/*.db files
+as well as empty ones. Tables are spelled out here rather than taken
+from models.py, so an old migration keeps meaning what it meant.
+
+Applied versions are recorded in schema_version. create_app() runs
+upgrade() at start-up; a new table or column needs a new migration (and
+the matching change in models.py).
+
+    python migrations.py            # upgrade DATABASE_URL
+    python migrations.py status
+"""
+from datetime import datetime
+
+import sqlalchemy as sa
+
+MIGRATIONS = []
+
+# Any constant; serialises concurrent upgrades on PostgreSQL
+_PG_LOCK_KEY = 4207331
+
+_meta = sa.MetaData()
+schema_version = sa.Table(
+    "schema_version", _meta,
+    sa.Column("version", sa.Integer, primary_key=True),
+    sa.Column("description", sa.String(200), nullable=False),
+    sa.Column("applied_at", sa.DateTime, nullable=False),
+)
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+def _columns(conn, table) -> set:
+    return {c["name"] for c in sa.inspect(conn).get_columns(table)}
+
+
+def _create_index(conn, name, table, *columns):
+    if name not in {i["name"] for i in sa.inspect(conn).get_indexes(table)}:
+        cols = ", ".join(columns)
+        conn.execute(sa.text(f'CREATE INDEX {name} ON "{table}" ({cols})'))
+
+
+# ---------- migrations ----------
+
+@migration(1, "user, broker_connection, strategy_config, trade")
+def _initial(conn):
+    if sa.inspect(conn).has_table("user") and "password_hash" not in _columns(conn, "user"):
+        # users.db / users_v2.db layout: not upgradable in place
+        raise RuntimeError("legacy user table (no password_hash); import it with migrate_data.py")
+    md = sa.MetaData()
+    sa.Table(
+        "user", md,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("email", sa.String(120), nullable=False, unique=True),
+        sa.Column("password_hash", sa.LargeBinary(60), nullable=False),
+    )
+    sa.Table(
+        "broker_connection", md,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("broker", sa.String(32)),
+        sa.Column("api_key", sa.String(128)),
+        sa.Column("session_id", sa.String(256)),
+        sa.Column("paper_trade", sa.Boolean),
+    )
+    sa.Table(
+        "strategy_config", md,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("strategy_name", sa.String(100), nullable=False),
+        sa.Column("enabled", sa.Boolean),
+        sa.Column("lots", sa.Integer),
+        sa.Column("target_points", sa.Integer),
+        sa.Column("stop_points", sa.Integer),
+        sa.Column("daily_max_loss", sa.Integer),
+    )
+    sa.Table(
+        "trade", md,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("strategy_name", sa.String(100), nullable=False),
+        sa.Column("symbol", sa.String(100), nullable=False),
+        sa.Column("side", sa.String(4), nullable=False),
+        sa.Column("qty", sa.Integer, nullable=False),
+        sa.Column("entry_price", sa.Float, nullable=False),
+        sa.Column("exit_price", sa.Float, nullable=False),
+        sa.Column("pnl", sa.Float, nullable=False),
+        sa.Column("opened_at", sa.DateTime),
+        sa.Column("closed_at", sa.DateTime, nullable=False),
+    )
+    md.create_all(conn, checkfirst=True)
+
+
+@migration(2, "broker_connection.trade_mode")
+def _trade_mode(conn):
+    # NULL keeps meaning "derive from paper_trade", as the views do
+    if "trade_mode" not in _columns(conn, "broker_connection"):
+        conn.execute(sa.text("ALTER TABLE broker_connection ADD COLUMN trade_mode VARCHAR(10)"))
+
+
+@migration(3, "paper_trade, live_trade (Dhan engine)")
+def _engine_trades(conn):
+    md = sa.MetaData()
+    for name in ("paper_trade", "live_trade"):
+        sa.Table(
+            name, md,
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("symbol", sa.String(50)),
+            sa.Column("side", sa.String(10)),
+            sa.Column("qty", sa.Integer),
+            sa.Column("entry_price", sa.Float),
+            sa.Column("exit_price", sa.Float),
+            sa.Column("pnl_rupees", sa.Float),
+            sa.Column("trade_date", sa.DateTime),
+            sa.Column("status", sa.String(20)),
+        )
+    md.create_all(conn, checkfirst=True)
+
+
+@migration(4, "indexes for per-user lookups and trade range scans")
+def _indexes(conn):
+    _create_index(conn, "ix_broker_connection_user_id", "broker_connection", "user_id")
+    _create_index(conn, "ix_strategy_config_user_id", "strategy_config", "user_id")
+    # reports / export / analytics: user_id = ? ORDER BY closed_at, id
+    _create_index(conn, "ix_trade_user_closed", "trade", "user_id", "closed_at", "id")
+
+
+@migration(5, "import_progress (migrate_data.py)")
+def _import_progress(conn):
+    md = sa.MetaData()
+    sa.Table(
+        "import_progress", md,
+        sa.Column("source", sa.String(255), primary_key=True),
+        sa.Column("table_name", sa.String(64), primary_key=True),
+        sa.Column("last_id", sa.Integer, nullable=False),
+        sa.Column("rows", sa.Integer, nullable=False),
+    )
+    md.create_all(conn, checkfirst=True)
+
+
+@migration(6, "archive_month (trade_archive.py)")
+def _archive_month(conn):
+    md = sa.MetaData()
+    sa.Table(
+        "archive_month", md,
+        sa.Column("table_name", sa.String(64), primary_key=True),
+        sa.Column("month", sa.String(7), primary_key=True),
+        sa.Column("file", sa.String(64), nullable=False),
+        sa.Column("rows", sa.Integer, nullable=False),
+        sa.Column("users", sa.Integer, nullable=False),
+        sa.Column("archived_at", sa.DateTime, nullable=False),
+    )
+    md.create_all(conn, checkfirst=True)
+
+
+@migration(7, "strategy_order (order_manager.py)")
+def _strategy_order(conn):
+    md = sa.MetaData()
+    sa.Table("user", md, sa.Column("id", sa.Integer, primary_key=True))
+    sa.Table(
+        "strategy_order", md,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("client_id", sa.String(32), nullable=False, unique=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("strategy_name", sa.String(100)),
+        sa.Column("venue", sa.String(32), nullable=False),
+        sa.Column("symbol", sa.String(100), nullable=False),
+        sa.Column("side", sa.String(4), nullable=False),
+        sa.Column("qty", sa.Integer, nullable=False),
+        sa.Column("price", sa.Float),
+        sa.Column("tag", sa.String(32)),
+        sa.Column("broker_order_id", sa.String(64)),
+        sa.Column("status", sa.String(10), nullable=False),
+        sa.Column("filled_qty", sa.Integer, nullable=False),
+        sa.Column("avg_price", sa.Float),
+        sa.Column("reason", sa.String(200)),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+        sa.Column("updated_at", sa.DateTime, nullable=False),
+    )
+    md.tables["strategy_order"].create(conn, checkfirst=True)
+    _create_index(conn, "ix_strategy_order_user_id", "strategy_order", "user_id")
+
+
+@migration(8, "strategy_order.trigger_price, parent_id (bracket_orders.py)")
+def _bracket_legs(conn):
+    columns = _columns(conn, "strategy_order")
+    if "trigger_price" not in columns:
+        conn.execute(sa.text("ALTER TABLE strategy_order ADD COLUMN trigger_price FLOAT"))
+    if "parent_id" not in columns:
+        conn.execute(sa.text("ALTER TABLE strategy_order ADD COLUMN parent_id VARCHAR(32)"))
+
+
+# ---------- runner ----------
+
+def applied_versions(conn) -> set:
+    if not sa.inspect(conn).has_table("schema_version"):
+        return set()
+    return set(conn.scalars(sa.select(schema_version.c.version)))
+
+
+def upgrade(engine, log=print) -> list:
+    """Apply pending migrations in order; returns the versions applied."""
+    done = []
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(sa.text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_LOCK_KEY})
+        schema_version.create(conn, checkfirst=True)
+        applied = applied_versions(conn)
+        for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+            if version in applied:
+                continue
+            fn(conn)
+            conn.execute(schema_version.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow(),
+            ))
+            log(f"Migration {version:04d} applied: {description}")
+            done.append(version)
+    return done
+
+
+if __name__ == "__main__":
+    import sys
+
+    import db_config
+
+    engine = db_config.create_engine()
+    if sys.argv[1:] == ["status"]:
+        with engine.connect() as conn:
+            applied = applied_versions(conn)
+        for version, description, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+            print(f"{version:04d} {'applied' if version in applied else 'pending'}  {description}")
+    else:
+        upgrade(engine) or print("Schema is up to date.")
@@ -3,7 +3,8 @@ from datetime import datetime
 
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-import bcrypt
+
+from credentials import hash_password, verify_password
 
 db = SQLAlchemy()
 
@@ -20,17 +21,17 @@ class User(UserMixin, db.Model):
     strategies = db.relationship("StrategyConfig", backref="user", lazy=True)
 
     def set_password(self, password: str):
-        self.password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+        self.password_hash = hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        return bcrypt.checkpw(password.encode(), self.password_hash)
+        return verify_password(password, self.password_hash)
 
 
 class BrokerConnection(db.Model):
     __tablename__ = "broker_connection"
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
 
     # Broker identity
     broker = db.Column(db.String(32), default="aliceblue")
@@ -52,7 +53,7 @@ class StrategyConfig(db.Model):
     __tablename__ = "strategy_config"
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
 
     strategy_name = db.Column(db.String(100), nullable=False)  # "banknifty_orb_vwap"
     enabled = db.Column(db.Boolean, default=False)
@@ -65,6 +66,7 @@ class StrategyConfig(db.Model):
 
 class Trade(db.Model):
     __tablename__ = "trade"
+    __table_args__ = (db.Index("ix_trade_user_closed", "user_id", "closed_at", "id"),)
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -80,3 +82,83 @@ class Trade(db.Model):
 
     opened_at = db.Column(db.DateTime, default=datetime.utcnow)
     closed_at = db.Column(db.DateTime, nullable=False)
+
+
+class PaperTrade(db.Model):
+    """Paper ORB engine trades (paper_orb.py); not user-scoped."""
+
+    __tablename__ = "paper_trade"
+
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(50))
+    side = db.Column(db.String(10))
+    qty = db.Column(db.Integer)
+    entry_price = db.Column(db.Float)
+    exit_price = db.Column(db.Float, nullable=True)
+    pnl_rupees = db.Column(db.Float, default=0.0)
+    trade_date = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), default="OPEN")
+
+
+class LiveTrade(db.Model):
+    __tablename__ = "live_trade"
+
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(50))
+    side = db.Column(db.String(10))
+    qty = db.Column(db.Integer)
+    entry_price = db.Column(db.Float)
+    exit_price = db.Column(db.Float, nullable=True)
+    pnl_rupees = db.Column(db.Float, default=0.0)
+    trade_date = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), default="OPEN")
+
+
+class ImportProgress(db.Model):
+    """migrate_data.py bookkeeping: last source row copied per file and table."""
+
+    __tablename__ = "import_progress"
+
+    source = db.Column(db.String(255), primary_key=True)
+    table_name = db.Column(db.String(64), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False)
+    rows = db.Column(db.Integer, nullable=False)
+
+
+class ArchiveMonth(db.Model):
+    """trade_archive.py: which file holds an archived month of a trade table."""
+
+    __tablename__ = "archive_month"
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # "YYYY-MM"
+    file = db.Column(db.String(64), nullable=False)
+    rows = db.Column(db.Integer, nullable=False)
+    users = db.Column(db.Integer, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+
+class StrategyOrder(db.Model):
+    """order_manager.py: one strategy order and its last known broker state."""
+
+    __tablename__ = "strategy_order"
+
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.String(32), nullable=False, unique=True)  # also the broker order tag
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    strategy_name = db.Column(db.String(100))
+    venue = db.Column(db.String(32), nullable=False)  # "aliceblue" / "paper"
+    symbol = db.Column(db.String(100), nullable=False)
+    side = db.Column(db.String(4), nullable=False)
+    qty = db.Column(db.Integer, nullable=False)
+    price = db.Column(db.Float)                       # None -> market
+    trigger_price = db.Column(db.Float)               # stop orders
+    parent_id = db.Column(db.String(32))              # entry client_id of a bracket exit leg
+    tag = db.Column(db.String(32))
+    broker_order_id = db.Column(db.String(64))
+    status = db.Column(db.String(10), nullable=False)  # NEW / ACK / PARTIAL / FILLED / REJECTED / CANCELLED
+    filled_qty = db.Column(db.Integer, nullable=False, default=0)
+    avg_price = db.Column(db.Float)
+    reason = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,359 @@
+# options_chain.py
+"""
+Live option chains for BANKNIFTY / NIFTY with vectorized IV and Greeks.
+
+Each OptionChain keeps one expiry as parallel NumPy arrays (one row per
+strike and side). snapshot() solves implied volatility for every row at
+once (safeguarded Newton on the whole array) and then computes Greeks in
+the same pass, so a few hundred strikes refresh in a few milliseconds.
+
+Strategies use pick_by_delta() instead of rounding spot. Rows carry the
+venue's trading symbol, so a picked row can be ordered as it is.
+"""
+import threading
+import time as _time
+from datetime import date, datetime, time
+
+import numpy as np
+
+from market_calendar import now_ist
+
+RISK_FREE_RATE = 0.065          # annualised, INR
+EXPIRY_TIME = time(15, 30)      # NSE index options expire at close
+YEAR_SECONDS = 365.0 * 24 * 3600
+
+IV_LOW, IV_HIGH = 0.01, 5.0
+IV_ITERATIONS = 30
+IV_PRICE_TOL = 1e-4   # rupees
+
+_SQRT_2PI = np.sqrt(2.0 * np.pi)
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def norm_cdf(x):
+    """Standard normal CDF via Abramowitz-Stegun 7.1.26 (|err| < 1.5e-7)."""
+    x = np.asarray(x, dtype=float)
+    z = np.abs(x) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741
+           + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+
+def bs_price(spot, strike, t, vol, is_call, r=RISK_FREE_RATE):
+    """Black-Scholes price; all arguments broadcast."""
+    sqrt_t = np.sqrt(t)
+    d1 = (np.log(spot / strike) + (r + 0.5 * vol * vol) * t) / (vol * sqrt_t)
+    d2 = d1 - vol * sqrt_t
+    disc = strike * np.exp(-r * t)
+    call = spot * norm_cdf(d1) - disc * norm_cdf(d2)
+    put = disc * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def implied_vol(price, spot, strike, t, is_call, r=RISK_FREE_RATE):
+    """
+    Vectorized IV. Newton steps on vega, clamped to a bisection bracket
+    so deep ITM/OTM rows (tiny vega) still converge. Rows whose price is
+    outside no-arbitrage bounds come back as NaN.
+    """
+    price = np.asarray(price, dtype=float)
+    strike = np.asarray(strike, dtype=float)
+    disc = strike * np.exp(-r * t)
+    intrinsic = np.where(is_call, np.maximum(spot - disc, 0.0), np.maximum(disc - spot, 0.0))
+    upper = np.where(is_call, spot, disc)
+    valid = (price > intrinsic) & (price < upper) & (t > 0)
+
+    lo = np.full(price.shape, IV_LOW)
+    hi = np.full(price.shape, IV_HIGH)
+    vol = np.full(price.shape, 0.2)
+    sqrt_t = np.sqrt(max(t, 1e-12))
+
+    for _ in range(IV_ITERATIONS):
+        d1 = (np.log(spot / strike) + (r + 0.5 * vol * vol) * t) / (vol * sqrt_t)
+        diff = bs_price(spot, strike, t, vol, is_call, r) - price
+        if not np.any(valid & (np.abs(diff) > IV_PRICE_TOL)):
+            break
+        # Maintain the bracket: price is increasing in vol.
+        hi = np.where(diff > 0, vol, hi)
+        lo = np.where(diff <= 0, vol, lo)
+        vega = spot * norm_pdf(d1) * sqrt_t
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = vol - diff / vega
+        inside = (step > lo) & (step < hi) & np.isfinite(step)
+        vol = np.where(inside, step, 0.5 * (lo + hi))
+
+    return np.where(valid, vol, np.nan)
+
+
+def greeks(spot, strike, t, vol, is_call, r=RISK_FREE_RATE):
+    """Delta, gamma, vega (per 1 vol point), theta (per day) as a dict of arrays."""
+    sqrt_t = np.sqrt(t)
+    d1 = (np.log(spot / strike) + (r + 0.5 * vol * vol) * t) / (vol * sqrt_t)
+    d2 = d1 - vol * sqrt_t
+    pdf = norm_pdf(d1)
+    disc = np.exp(-r * t)
+
+    delta = np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0)
+    gamma = pdf / (spot * vol * sqrt_t)
+    vega = spot * pdf * sqrt_t / 100.0
+    common = -spot * pdf * vol / (2.0 * sqrt_t)
+    theta = np.where(
+        is_call,
+        common - r * strike * disc * norm_cdf(d2),
+        common + r * strike * disc * norm_cdf(-d2),
+    ) / 365.0
+    return {"delta": delta, "gamma": gamma, "vega": vega, "theta": theta}
+
+
+def years_to_expiry(expiry: date, now: datetime) -> float:
+    """Years from `now` (naive IST) to the expiry's close."""
+    expiry_dt = datetime.combine(expiry, EXPIRY_TIME)
+    return max((expiry_dt - now).total_seconds(), 0.0) / YEAR_SECONDS
+
+
+class OptionChain:
+    """One underlying + expiry; rows are (strike, side) pairs."""
+
+    def __init__(self, underlying: str, expiry: date, strikes, is_call, symbols):
+        self.underlying = underlying
+        self.expiry = expiry
+        self.strike = np.asarray(strikes, dtype=float)
+        self.is_call = np.asarray(is_call, dtype=bool)
+        self.symbols = list(symbols)   # venue trading symbol per row
+        n = len(self.strike)
+        self.bid = np.zeros(n)
+        self.ask = np.zeros(n)
+        self.ltp = np.zeros(n)
+        self.oi = np.zeros(n, dtype=np.int64)
+        self.iv = np.full(n, np.nan)
+        self.delta = np.full(n, np.nan)
+        self.gamma = np.full(n, np.nan)
+        self.vega = np.full(n, np.nan)
+        self.theta = np.full(n, np.nan)
+        self.spot = None
+        self.updated_at = None
+
+    def __len__(self):
+        return len(self.strike)
+
+    def update_quotes(self, bid=None, ask=None, ltp=None, oi=None):
+        """Replace quote columns in place (arrays aligned with the rows)."""
+        for name, values in (("bid", bid), ("ask", ask), ("ltp", ltp), ("oi", oi)):
+            if values is not None:
+                getattr(self, name)[:] = values
+
+    def mark(self):
+        """Mid where both sides are quoted, else LTP."""
+        two_sided = (self.bid > 0) & (self.ask > 0)
+        return np.where(two_sided, 0.5 * (self.bid + self.ask), self.ltp)
+
+    def snapshot(self, spot: float, now: datetime = None, r: float = RISK_FREE_RATE):
+        """Recompute IV and Greeks for every row in one vectorized pass."""
+        now = now or now_ist()  # EXPIRY_TIME is IST, whatever the server's zone
+        t = years_to_expiry(self.expiry, now)
+        self.spot = float(spot)
+        self.iv = implied_vol(self.mark(), self.spot, self.strike, t, self.is_call, r)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            g = greeks(self.spot, self.strike, t, self.iv, self.is_call, r)
+        self.delta, self.gamma, self.vega, self.theta = g["delta"], g["gamma"], g["vega"], g["theta"]
+        self.updated_at = now
+        return self
+
+    def pick_by_delta(self, option_type: str, target_delta: float = 0.5):
+        """
+        Row closest to |delta| == target_delta for "CE" or "PE".
+        Returns {"symbol", "strike", "delta", "iv", "mark"} or None.
+        """
+        side = self.is_call if option_type == "CE" else ~self.is_call
+        dist = np.where(side & np.isfinite(self.delta), np.abs(np.abs(self.delta) - target_delta), np.inf)
+        if not len(dist) or not np.isfinite(dist.min()):
+            return None
+        i = int(np.argmin(dist))
+        return {
+            "symbol": self.symbols[i],
+            "strike": float(self.strike[i]),
+            "delta": float(self.delta[i]),
+            "iv": float(self.iv[i]),
+            "mark": float(self.mark()[i]),
+        }
+
+    def as_rows(self):
+        """List of dicts, for JSON / templates."""
+        return [
+            {
+                "symbol": self.symbols[i], "strike": float(self.strike[i]),
+                "type": "CE" if self.is_call[i] else "PE",
+                "bid": float(self.bid[i]), "ask": float(self.ask[i]), "ltp": float(self.ltp[i]),
+                "oi": int(self.oi[i]), "iv": float(self.iv[i]), "delta": float(self.delta[i]),
+                "gamma": float(self.gamma[i]), "vega": float(self.vega[i]), "theta": float(self.theta[i]),
+            }
+            for i in range(len(self))
+        ]
+
+
+class OptionsChainService:
+    """
+    Keeps the current expiries' chains fresh.
+
+    `fetch(underlying, expiry) -> (spot, rows)` supplies quotes, where rows
+    is a list of dicts with strike, type ("CE"/"PE"), symbol, bid, ask,
+    ltp and oi. The chain layout is rebuilt only when the strike list
+    changes; otherwise quotes are written into the existing arrays.
+    `expiries(underlying) -> [date]`, when given, lets watch_nearest()
+    follow the front expiry from day to day.
+    """
+
+    def __init__(self, fetch, interval: float = 1.0, expiries=None):
+        self.fetch = fetch
+        self.expiries = expiries
+        self.interval = interval
+        self._chains = {}      # (underlying, expiry) -> OptionChain
+        self._watch = set()    # (underlying, expiry) to refresh
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, underlying: str, expiry: date):
+        with self._lock:
+            self._watch.add((underlying, expiry))
+
+    def unwatch(self, underlying: str, expiry: date):
+        with self._lock:
+            self._watch.discard((underlying, expiry))
+            self._chains.pop((underlying, expiry), None)
+
+    def watch_nearest(self, underlying: str, today: date):
+        """Watch the first expiry on or after `today`, in place of earlier ones."""
+        upcoming = sorted(e for e in self.expiries(underlying) if e >= today)
+        if not upcoming:
+            return None
+        with self._lock:
+            stale = [k for k in self._watch if k[0] == underlying and k[1] != upcoming[0]]
+        for key in stale:
+            self.unwatch(*key)
+        self.watch(underlying, upcoming[0])
+        return upcoming[0]
+
+    def chain(self, underlying: str, expiry: date = None):
+        """Latest chain for an underlying (nearest watched expiry by default)."""
+        with self._lock:
+            keys = sorted(k for k in self._chains if k[0] == underlying)
+            if expiry is not None:
+                keys = [k for k in keys if k[1] == expiry]
+            return self._chains[keys[0]] if keys else None
+
+    def refresh(self, underlying: str, expiry: date, now: datetime = None):
+        spot, rows = self.fetch(underlying, expiry)
+        if not rows:
+            return None
+        key = (underlying, expiry)
+        chain = self._chains.get(key)
+        layout = [(float(r["strike"]), r["type"] == "CE") for r in rows]
+        if chain is None or len(chain) != len(layout) or \
+                [(s, c) for s, c in zip(chain.strike.tolist(), chain.is_call.tolist())] != layout:
+            chain = OptionChain(
+                underlying, expiry,
+                [s for s, _ in layout], [c for _, c in layout],
+                [r.get("symbol") for r in rows],
+            )
+        chain.update_quotes(
+            bid=[r.get("bid") or 0.0 for r in rows],
+            ask=[r.get("ask") or 0.0 for r in rows],
+            ltp=[r.get("ltp") or 0.0 for r in rows],
+            oi=[r.get("oi") or 0 for r in rows],
+        )
+        chain.snapshot(spot, now)
+        with self._lock:
+            self._chains[key] = chain
+        return chain
+
+    def pick_by_delta(self, underlying: str, option_type: str, target_delta: float = 0.5):
+        chain = self.chain(underlying)
+        return chain.pick_by_delta(option_type, target_delta) if chain else None
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = _time.monotonic()
+            with self._lock:
+                targets = list(self._watch)
+            for underlying, expiry in targets:
+                try:
+                    self.refresh(underlying, expiry)
+                except Exception as e:
+                    print(f"[chain] {underlying} {expiry} refresh error:", e)
+            self._stop.wait(max(0.0, self.interval - (_time.monotonic() - started)))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="options-chain", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# ---------- Dhan adapter ----------
+
+DHAN_UNDERLYINGS = {
+    # underlying -> (security_id, segment) for dhanhq.option_chain
+    "NIFTY": (13, "IDX_I"),
+    "BANKNIFTY": (25, "IDX_I"),
+}
+
+
+def venue_symbol(underlying: str, expiry: date, strike: float, option_type: str) -> str:
+    """Trading symbol the order venues are sent, e.g. BANKNIFTY25OCT2852000CE."""
+    return f"{underlying}{expiry.strftime('%y%b%d').upper()}{int(strike)}{option_type}"
+
+
+def _dhan_data(resp):
+    data = resp.get("data") or {}
+    return (data.get("data") or data) if isinstance(data, dict) else data
+
+
+def dhan_chain_fetcher(dhan, symbol_for=venue_symbol):
+    """
+    fetch() for OptionsChainService backed by dhanhq's option_chain API.
+    Dhan identifies legs by security id; rows get `symbol_for(...)` as
+    their symbol and keep the id as "security_id".
+    """
+    def fetch(underlying: str, expiry: date):
+        sec_id, segment = DHAN_UNDERLYINGS[underlying]
+        resp = dhan.option_chain(sec_id, segment, expiry.strftime("%Y-%m-%d"))
+        data = _dhan_data(resp)
+        spot = float(data.get("last_price") or 0.0)
+        rows = []
+        for strike_str, legs in sorted((data.get("oc") or {}).items(), key=lambda kv: float(kv[0])):
+            for side, key in (("CE", "ce"), ("PE", "pe")):
+                leg = legs.get(key)
+                if not leg:
+                    continue
+                rows.append({
+                    "strike": float(strike_str),
+                    "type": side,
+                    "symbol": symbol_for(underlying, expiry, float(strike_str), side),
+                    "security_id": leg.get("security_id"),
+                    "bid": leg.get("top_bid_price"),
+                    "ask": leg.get("top_ask_price"),
+                    "ltp": leg.get("last_price"),
+                    "oi": leg.get("oi"),
+                })
+        return spot, rows
+
+    return fetch
+
+
+def dhan_expiry_fetcher(dhan):
+    """expiries() for OptionsChainService from dhanhq's expiry_list API."""
+    def expiries(underlying: str):
+        sec_id, segment = DHAN_UNDERLYINGS[underlying]
+        dates = _dhan_data(dhan.expiry_list(sec_id, segment))
+        return [datetime.strptime(d, "%Y-%m-%d").date() for d in dates]
+
+    return expiries
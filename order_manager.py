@@ -0,0 +1,667 @@
+# order_manager.py
+"""
+Order state machine for strategy orders, paper and live.
+
+    NEW -> ACK -> PARTIAL -> FILLED
+     |      |       |
+     |      |       +-----> CANCELLED (rest of a partial fill)
+     |      +-------------> CANCELLED / REJECTED
+     +--------------------> REJECTED / FILLED (a fast fill can skip ACK)
+
+Every order gets its client id before it leaves (caller-supplied or
+generated). Submitting the same client id again returns the existing
+order instead of sending a second one. If placement times out or
+errors, the order stays NEW and is marked unconfirmed, and it is never
+re-sent. The reconciliation sweep finds it in the broker's order book
+by its client id where the venue echoes one (paper). Alice orders carry
+no tag (pya3 sends none), so there the sweep matches by venue.match_key()
+instead: symbol, side, quantity, order type and price, placed within
+ORDER_MATCH_SECONDS of our attempt.
+
+Broker events are queued from any thread: streamed updates (paper fills
+via venue.stream) and order-book rows from the reconciliation sweep.
+pump() applies them on the owner's thread (the runner), persists
+changed orders through the store and calls on_update(order, fill_qty),
+so strategies only see order events on the runner thread. Events that
+would move an order backwards are ignored: a late ACK after FILLED, or
+a book row with fewer fills than already recorded.
+
+The sweep thread fetches the order book of every venue with open orders
+every RECONCILE_FAST_SECONDS, and every RECONCILE_SECONDS otherwise. A
+NEW order that is still missing from the book ORDER_MISSING_SECONDS
+after it was sent is REJECTED on a venue that echoes client ids. On
+other venues it may be working or filled all the same, so it stays NEW
+and is flagged for manual review. Its strategy keeps waiting rather
+than entering again. The same happens when more book rows fit an order
+than there are orders to match.
+
+Inside `with manager.batch():` submit() only records the order; the
+batch is persisted in one commit and sent when the block ends. Each
+venue (one broker account) gets its orders in one basket call where it
+has place_many(), and every call waits on the account's broker_limiter
+bucket, ahead of quotes. Accounts of the same broker are sent in
+parallel, at most `parallel` at a time, so when one breakout fires N
+users' entries the last user's order is not N round trips behind the
+first. Outcomes are applied on the owner's thread when the batch ends,
+like a single submit(). A basket call that fails leaves all of its
+orders unconfirmed, since any of them may have been accepted. They are
+reconciled like any other unknown outcome, so baskets are only used on
+venues whose orders can be found again (echoes_client_id or match_key).
+"""
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from market_calendar import IST, now_ist
+from models import db, StrategyOrder
+from paper_fill import PaperOrder
+
+NEW, ACK, PARTIAL, FILLED, REJECTED, CANCELLED = "NEW", "ACK", "PARTIAL", "FILLED", "REJECTED", "CANCELLED"
+TERMINAL = frozenset((FILLED, REJECTED, CANCELLED))
+TRANSITIONS = {
+    NEW: {ACK, PARTIAL, FILLED, REJECTED, CANCELLED},
+    ACK: {PARTIAL, FILLED, REJECTED, CANCELLED},
+    PARTIAL: {PARTIAL, FILLED, CANCELLED},
+    FILLED: set(),
+    REJECTED: set(),
+    CANCELLED: set(),
+}
+
+RECONCILE_SECONDS = float(os.environ.get("ORDER_RECONCILE_SECONDS", 30))
+RECONCILE_FAST_SECONDS = float(os.environ.get("ORDER_RECONCILE_FAST_SECONDS", 2))
+ORDER_MISSING_SECONDS = float(os.environ.get("ORDER_MISSING_SECONDS", 15))
+ORDER_MATCH_SECONDS = float(os.environ.get("ORDER_MATCH_SECONDS", 60))    # book time vs our send time
+ALICE_ORDER_PARALLEL = int(os.environ.get("ALICE_ORDER_PARALLEL", 8))      # accounts sent at once
+ALICE_BASKET_SIZE = int(os.environ.get("ALICE_BASKET_SIZE", 10))
+
+_EPOCH = datetime(1970, 1, 1)  # stored times are naive UTC
+
+
+class OrderRejected(Exception):
+    """The venue refused the order outright (as opposed to an unknown outcome)."""
+
+
+@dataclass
+class ManagedOrder:
+    client_id: str
+    user_id: int
+    venue: object                 # PaperVenue / AliceVenue
+    symbol: str
+    side: str                     # "BUY" / "SELL"
+    qty: int                      # contracts
+    price: float = None           # None -> market (limit price of a stop order)
+    tag: str = None
+    trigger_price: float = None   # stop order
+    parent_id: str = None         # entry order of an exit leg (bracket_orders.py)
+    oco: bool = False             # one-cancels-other with the parent's other legs, at the venue
+    strategy: object = None       # owning strategy instance (not persisted)
+    listener: object = None       # fn(order, fill_qty) before on_update, e.g. a bracket (not persisted)
+    strategy_name: str = None
+    broker_order_id: str = None
+    status: str = NEW
+    filled_qty: int = 0
+    avg_price: float = None
+    reason: str = None
+    sent_at: float = None         # time.time() of the placement attempt
+    unconfirmed: bool = False     # placement outcome unknown: reconcile, never resend
+    review: bool = False          # unconfirmed and not matched in the book: left to a human
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    updated_at: datetime = field(default_factory=datetime.utcnow)
+
+    @property
+    def remaining(self):
+        return self.qty - self.filled_qty
+
+    @property
+    def done(self):
+        return self.status in TERMINAL
+
+    def as_dict(self) -> dict:
+        return {
+            "client_id": self.client_id, "order_id": self.broker_order_id, "symbol": self.symbol,
+            "side": self.side, "qty": self.qty, "status": self.status, "filled_qty": self.filled_qty,
+            "avg_price": self.avg_price, "reason": self.reason, "tag": self.tag, "review": self.review,
+        }
+
+
+# ---------- venues ----------
+
+class PaperVenue:
+    """paper_fill.FillSimulator as a venue; fills and cancels are streamed from its callbacks."""
+
+    name = "paper"
+    echoes_client_id = True   # the book is looked up by client id
+    supports_stop = True
+    supports_oco = True
+    parallel = 0           # in-process: placed on the caller's thread
+    STATUS = {"PENDING": ACK, "OPEN": ACK, "PARTIAL": PARTIAL, "FILLED": FILLED, "CANCELLED": CANCELLED}
+
+    def __init__(self, sim):
+        self.sim = sim
+
+    def place(self, order: ManagedOrder) -> str:
+        return self.sim.submit(PaperOrder(
+            order.symbol, order.side, order.qty, limit_price=order.price, user_id=order.user_id,
+            tag=order.tag, order_id=order.client_id, trigger_price=order.trigger_price,
+            oco_group=order.parent_id if order.oco else None,
+        ), now_ist())
+
+    def cancel(self, order: ManagedOrder):
+        self.sim.cancel(order.broker_order_id or order.client_id)
+
+    def _row(self, paper: PaperOrder) -> dict:
+        return {"client_id": paper.order_id, "broker_order_id": paper.order_id,
+                "status": self.STATUS.get(paper.status, ACK), "filled_qty": paper.filled_qty,
+                "avg_price": paper.avg_price or None}
+
+    def order_book(self, orders) -> list:
+        found = (self.sim.get(o.broker_order_id or o.client_id) for o in orders)
+        return [self._row(p) for p in found if p is not None]
+
+    def stream(self, push):
+        self.sim.on_fill = lambda paper, qty, price, ts: push(self, self._row(paper))
+        self.sim.on_cancel = lambda paper, ts: push(self, self._row(paper))
+
+
+class AliceVenue:
+    """A user's AliceBroker; pya3 has no order-update stream, so state comes from the book."""
+
+    name = "aliceblue"
+    supports_stop = True   # stop-loss limit orders rest at the exchange
+    # Alice bracket orders (pya3 bracket_order / exitboorder) do link a stop
+    # and a target, but only as part of a BO entry: the exits are fixed when
+    # the entry is placed, not attached to a fill, and the entry leaves
+    # the regular order path. Brackets here arm exits for what actually
+    # filled, the same way on paper and live, so the target is watched
+    # locally and never rests unlinked next to the stop.
+    supports_oco = False
+    parallel = ALICE_ORDER_PARALLEL
+    basket_size = ALICE_BASKET_SIZE
+    STATUS = {"complete": FILLED, "rejected": REJECTED, "cancelled": CANCELLED}
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def place(self, order: ManagedOrder) -> str:
+        return self.broker.send_order(order.symbol, order.side, order.qty, order.price,
+                                      trigger_price=order.trigger_price)
+
+    def place_many(self, orders) -> list:
+        """One basket call; a broker order id or an OrderRejected per order."""
+        return self.broker.send_basket([
+            dict(symbol=o.symbol, side=o.side, qty=o.qty, price=o.price, trigger_price=o.trigger_price)
+            for o in orders
+        ])
+
+    @staticmethod
+    def match_key(order: ManagedOrder) -> tuple:
+        """What identifies an order in the book without a client id."""
+        if order.trigger_price is not None:
+            return order.symbol, order.side, order.qty, "SL", _price(order.price), _price(order.trigger_price)
+        if order.price is not None:
+            return order.symbol, order.side, order.qty, "L", _price(order.price), None
+        return order.symbol, order.side, order.qty, "MKT", None, None
+
+    def cancel(self, order: ManagedOrder):
+        if order.broker_order_id:
+            self.broker.cancel_order(order.broker_order_id, order.symbol)
+
+    def order_book(self, orders) -> list:
+        # The book has Alice's trading symbols; map them back to ours
+        symbols = {}
+        for o in orders:
+            try:
+                symbols[self.broker.instrument("NFO", o.symbol)["tradingSymbol"]] = o.symbol
+            except Exception:
+                pass
+        rows = []
+        for r in self.broker.order_book():
+            filled = int(r.get("Fillshares") or 0)
+            status = self.STATUS.get(str(r.get("Status", "")).lower(), PARTIAL if filled else ACK)
+            symbol = str(r.get("Trsym") or "")
+            kind = str(r.get("Prctype") or "").upper()
+            kind = "SL" if kind.startswith("SL") else "MKT" if kind == "MKT" else "L"
+            rows.append({
+                "client_id": r.get("remarks") or None,
+                "broker_order_id": str(r.get("Nstordno") or "") or None,
+                "status": status, "filled_qty": filled,
+                "avg_price": float(r.get("Avgprc") or 0) or None,
+                "reason": r.get("RejReason") or None,
+                "match_key": (
+                    symbols.get(symbol, symbol),
+                    "BUY" if str(r.get("Trantype") or "").upper() in ("B", "BUY") else "SELL",
+                    int(r.get("Qty") or 0), kind,
+                    _price(r.get("Prc")) if kind != "MKT" else None,
+                    _price(r.get("Trgprc")) if kind == "SL" else None,
+                ),
+                "placed_at": _book_time(r.get("OrderedTime")),
+            })
+        return rows
+
+
+def _price(value):
+    return round(float(value), 2) if value not in (None, "") else None
+
+
+def _book_time(value):
+    """Alice order book time ("19/10/2026 10:15:32", IST) as epoch seconds, or None."""
+    for fmt in ("%d/%m/%Y %H:%M:%S", "%d-%b-%Y %H:%M:%S"):
+        try:
+            return datetime.strptime(str(value), fmt).replace(tzinfo=IST).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+# ---------- persistence ----------
+
+class OrderStore:
+    """strategy_order rows; call from a thread with an app context."""
+
+    def save(self, orders):
+        rows = {r.client_id: r for r in StrategyOrder.query.filter(
+            StrategyOrder.client_id.in_([o.client_id for o in orders]))}
+        for o in orders:
+            row = rows.get(o.client_id)
+            if row is None:
+                row = rows[o.client_id] = StrategyOrder(client_id=o.client_id, created_at=o.created_at)
+                db.session.add(row)
+            row.user_id, row.strategy_name, row.venue = o.user_id, o.strategy_name, o.venue.name
+            row.symbol, row.side, row.qty, row.price, row.tag = o.symbol, o.side, o.qty, o.price, o.tag
+            row.trigger_price, row.parent_id = o.trigger_price, o.parent_id
+            row.broker_order_id, row.status, row.reason = o.broker_order_id, o.status, o.reason
+            row.filled_qty, row.avg_price, row.updated_at = o.filled_qty, o.avg_price, o.updated_at
+        db.session.commit()
+
+    @staticmethod
+    def _order(row, venue) -> ManagedOrder:
+        return ManagedOrder(
+            client_id=row.client_id, user_id=row.user_id, venue=venue, symbol=row.symbol, side=row.side,
+            qty=row.qty, price=row.price, tag=row.tag, trigger_price=row.trigger_price,
+            parent_id=row.parent_id, strategy_name=row.strategy_name,
+            broker_order_id=row.broker_order_id, status=row.status, filled_qty=row.filled_qty,
+            avg_price=row.avg_price, reason=row.reason, unconfirmed=row.status == NEW,
+            sent_at=(row.updated_at - _EPOCH).total_seconds() if row.status == NEW else None,
+            created_at=row.created_at, updated_at=row.updated_at,
+        )
+
+    def load(self, client_id, venue_for):
+        row = StrategyOrder.query.filter_by(client_id=client_id).first()
+        venue = row and venue_for(row.user_id, row.venue)
+        return self._order(row, venue) if venue else None
+
+    def open_orders(self, venue_for) -> list:
+        out = []
+        for row in StrategyOrder.query.filter(StrategyOrder.status.notin_(TERMINAL)).all():
+            venue = venue_for(row.user_id, row.venue)
+            if venue is None:
+                print(f"[orders] no venue for open order {row.client_id} ({row.venue}, user {row.user_id})")
+                continue
+            out.append(self._order(row, venue))
+        return out
+
+
+# ---------- manager ----------
+
+class OrderManager:
+    def __init__(self, store: OrderStore = None, venue_for=None):
+        self.store = store                # None: orders live in memory only
+        self.venue_for = venue_for        # fn(user_id, venue_name) -> venue, for persisted orders
+        self.on_update = None             # fn(order, fill_qty), on the pump() thread
+        self.orders = {}                  # client_id -> ManagedOrder
+        self.stats = Counter()
+
+        self._by_broker = {}              # (venue, broker_order_id) -> ManagedOrder
+        self._batch = None                # orders held by batch()
+        self._batch_depth = 0
+        self._pools = {}                  # venue name -> ThreadPoolExecutor
+        self._events = queue.SimpleQueue()
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def new_client_id() -> str:
+        return uuid.uuid4().hex[:20]
+
+    def attach(self, venue):
+        """Start a venue's update stream, if it has one."""
+        stream = getattr(venue, "stream", None)
+        if stream is not None:
+            stream(self.push)
+
+    def load_open(self):
+        """Adopt non-terminal orders from the store (after a restart) for reconciliation."""
+        if not (self.store and self.venue_for):
+            return 0
+        loaded = self.store.open_orders(self.venue_for)
+        with self._lock:
+            for order in loaded:
+                self._track(order)
+        self._wake.set()
+        return len(loaded)
+
+    def _track(self, order):
+        self.orders[order.client_id] = order
+        if order.broker_order_id:
+            self._by_broker[(order.venue, order.broker_order_id)] = order
+
+    def open_orders(self) -> list:
+        with self._lock:
+            return [o for o in self.orders.values() if not o.done]
+
+    # ---------- order entry (owner thread) ----------
+
+    def submit(self, venue, user_id, symbol, side, qty, price=None, tag=None, client_id=None,
+               strategy=None, trigger_price=None, parent_id=None, oco=False, listener=None) -> ManagedOrder:
+        """Create and send an order; one client_id is only ever sent once."""
+        client_id = client_id or self.new_client_id()
+        with self._lock:
+            order = self.orders.get(client_id)
+            if order is None and self.store and self.venue_for:
+                order = self.store.load(client_id, self.venue_for)
+                if order is not None:
+                    self._track(order)
+            if order is not None:
+                self.stats["duplicate"] += 1
+                if order.strategy is None:
+                    order.strategy = strategy
+                if order.listener is None:
+                    order.listener = listener
+                return order
+            order = ManagedOrder(client_id, user_id, venue, symbol, side, qty, price=price, tag=tag,
+                                 trigger_price=trigger_price, parent_id=parent_id, oco=oco,
+                                 strategy=strategy, strategy_name=getattr(strategy, "name", None),
+                                 listener=listener)
+            self._track(order)
+
+        # On record before it leaves: a crash mid-send is reconciled, not re-sent
+        self._dirty[client_id] = order
+        if self._batch is not None:
+            self._batch.append(order)
+            return order
+        self._send([order])
+        return order
+
+    @contextmanager
+    def batch(self):
+        """Hold submit()s made in this block and send them together at its end."""
+        if self._batch_depth == 0:
+            self._batch = []
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                held, self._batch = self._batch, None
+                self._send(held)  # submits made by listeners from here on go out at once
+
+    def _send(self, orders):
+        self._flush()
+        if not orders:
+            return
+        by_venue = {}
+        for order in orders:
+            by_venue.setdefault(order.venue, []).append(order)
+        now = time.time()
+        for order in orders:
+            order.sent_at = now
+        self.stats["sent"] += len(orders)
+        if len(by_venue) > 1:
+            self.stats["batches"] += 1
+
+        futures, outcomes = [], {}
+        for venue, group in by_venue.items():
+            if getattr(venue, "parallel", 0) and len(by_venue) > 1:
+                futures.append((group, self._pool(venue).submit(self._place, venue, group)))
+            else:
+                outcomes.update(zip(map(id, group), self._place(venue, group)))
+        for group, future in futures:
+            outcomes.update(zip(map(id, group), future.result()))
+        for order in orders:
+            self._placed(order, outcomes[id(order)])
+        self._flush()
+
+    def _pool(self, venue):
+        pool = self._pools.get(venue.name)
+        if pool is None:
+            pool = self._pools[venue.name] = ThreadPoolExecutor(
+                venue.parallel, thread_name_prefix=f"orders-{venue.name}")
+        return pool
+
+    @staticmethod
+    def _place(venue, orders) -> list:
+        """Send one account's orders; a broker order id or an exception per order."""
+        findable = getattr(venue, "echoes_client_id", False) or hasattr(venue, "match_key")
+        size = getattr(venue, "basket_size", 1) if hasattr(venue, "place_many") and findable else 1
+        outcomes = []
+        for chunk in (orders[i:i + size] for i in range(0, len(orders), size)):
+            try:
+                if len(chunk) > 1:
+                    outcomes.extend(venue.place_many(chunk))
+                else:
+                    outcomes.append(venue.place(chunk[0]))
+            except Exception as e:
+                outcomes.extend([e] * len(chunk))
+        return outcomes
+
+    def _placed(self, order, outcome):
+        if isinstance(outcome, OrderRejected):
+            self._apply(order, {"status": REJECTED, "reason": str(outcome)[:200]})
+        elif isinstance(outcome, Exception):
+            order.unconfirmed = True
+            order.reason = f"placement outcome unknown: {outcome!r}"[:200]
+            self.stats["unconfirmed"] += 1
+            print(f"[orders] {order.client_id} {order.side} {order.qty} {order.symbol}: {order.reason}; reconciling")
+            self._wake.set()
+        else:
+            self._apply(order, {"status": ACK, "broker_order_id": outcome})
+
+    def cancel(self, client_id) -> bool:
+        order = self.orders.get(client_id)
+        if order is None or order.done:
+            return False
+        try:
+            order.venue.cancel(order)
+        except Exception as e:
+            print(f"[orders] cancel {client_id} error:", e)
+            return False
+        self._wake.set()  # the book (or stream) confirms the cancel
+        return True
+
+    # ---------- broker events (any thread) ----------
+
+    def push(self, venue, row: dict):
+        """Queue one order update from a venue's stream."""
+        self._events.put(("update", venue, row, time.time()))
+
+    def pump(self) -> int:
+        """Apply queued updates and order books; call from the owner thread."""
+        n = 0
+        while True:
+            try:
+                kind, venue, payload, at = self._events.get_nowait()
+            except queue.Empty:
+                break
+            n += 1
+            if kind == "book":
+                self._reconcile(venue, payload, at)
+            else:
+                order = self._find(venue, payload)
+                if order is not None:
+                    self._apply(order, payload)
+        self._flush()
+        return n
+
+    def _find(self, venue, row):
+        order = self.orders.get(row.get("client_id")) if row.get("client_id") else None
+        if order is None and row.get("broker_order_id"):
+            order = self._by_broker.get((venue, row["broker_order_id"]))
+        return order if order is not None and order.venue is venue else None
+
+    def _reconcile(self, venue, rows, fetched_at):
+        seen, unclaimed = set(), []
+        for row in rows:
+            order = self._find(venue, row)
+            if order is not None:
+                seen.add(order.client_id)
+                self._apply(order, row, source="book")
+            else:
+                unclaimed.append(row)
+        missing = [o for o in self.open_orders()
+                   if o.venue is venue and o.status == NEW and o.client_id not in seen and o.sent_at]
+        if missing and hasattr(venue, "match_key"):
+            missing = self._match(venue, missing, unclaimed)
+        for order in missing:
+            if fetched_at - order.sent_at <= ORDER_MISSING_SECONDS:
+                continue
+            if getattr(venue, "echoes_client_id", False):
+                self._apply(order, {"status": REJECTED, "reason": "not in the broker order book"}, source="book")
+            else:
+                self._flag(order, "not found in the broker order book")
+
+    def _match(self, venue, orders, rows) -> list:
+        """Pair unconfirmed orders with untagged book rows; returns the orders left over."""
+        groups = {}
+        for order in orders:
+            groups.setdefault(venue.match_key(order), []).append(order)
+        left = []
+        for key, group in groups.items():
+            group.sort(key=lambda o: o.sent_at)
+            candidates = sorted(
+                (r for r in rows if r.get("match_key") == key and (
+                    r.get("placed_at") is None
+                    or any(abs(r["placed_at"] - o.sent_at) <= ORDER_MATCH_SECONDS for o in group))),
+                key=lambda r: r.get("placed_at") or 0,
+            )
+            if len(candidates) > len(group):
+                for order in group:
+                    self._flag(order, f"{len(candidates)} book orders match {len(group)} sent")
+                continue
+            for order, row in zip(group, candidates):
+                self.stats["matched"] += 1
+                print(f"[orders] {order.client_id} matched to broker order {row.get('broker_order_id')}")
+                self._apply(order, row, source="book")
+            left.extend(group[len(candidates):])
+        return left
+
+    def _flag(self, order, why):
+        """Leave an order we cannot find open, for a human to settle at the broker."""
+        if order.review:
+            return
+        order.review = True
+        order.reason = f"REVIEW: {why}; settle it at the broker"[:200]
+        order.updated_at = datetime.utcnow()
+        self._dirty[order.client_id] = order
+        self.stats["review"] += 1
+        print(f"[orders] {order.client_id} {order.side} {order.qty} {order.symbol} needs manual review: {why}")
+        self._notify(order, 0)
+
+    def _apply(self, order, row, source="stream") -> int:
+        """Move `order` forward by one broker event; returns the newly filled quantity."""
+        if order.done:
+            return 0
+        changed, fill_qty = False, 0
+        status, filled = row.get("status"), row.get("filled_qty")
+
+        broker_order_id = row.get("broker_order_id")
+        if broker_order_id and order.broker_order_id != broker_order_id:
+            order.broker_order_id = broker_order_id
+            self._by_broker[(order.venue, broker_order_id)] = order
+            changed = True
+        if status == FILLED and (filled is None or filled < order.qty):
+            filled = order.qty  # "complete" means the whole quantity traded
+        if filled is not None and filled > order.filled_qty:
+            fill_qty = min(filled, order.qty) - order.filled_qty
+            order.filled_qty += fill_qty
+            order.avg_price = row.get("avg_price") or order.avg_price
+            changed = True
+            if status in (None, NEW, ACK):
+                status = FILLED if order.remaining == 0 else PARTIAL
+        if status == PARTIAL and order.filled_qty == 0:
+            status = ACK
+        if status and status != order.status and status in TRANSITIONS[order.status]:
+            order.status = status
+            order.reason = row.get("reason") or order.reason
+            changed = True
+        if not changed:
+            return 0
+
+        if order.status != NEW and order.unconfirmed:
+            order.unconfirmed = False
+            self.stats["recovered"] += 1
+        if source == "book":
+            self.stats["reconciled"] += 1
+        order.updated_at = datetime.utcnow()
+        self._dirty[order.client_id] = order
+        self._notify(order, fill_qty)
+        return fill_qty
+
+    def _notify(self, order, fill_qty):
+        if order.listener:
+            try:
+                order.listener(order, fill_qty)
+            except Exception as e:
+                print(f"[orders] listener error for {order.client_id}:", e)
+        if self.on_update:
+            try:
+                self.on_update(order, fill_qty)
+            except Exception as e:
+                print(f"[orders] on_update error for {order.client_id}:", e)
+
+    def _flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = list(self._dirty.values()), {}
+        if self.store is None:
+            return
+        try:
+            self.store.save(dirty)
+        except Exception as e:
+            db.session.rollback()
+            print("[orders] save error:", e)
+
+    # ---------- reconciliation sweep ----------
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sweep_loop, name="order-reconcile", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        for pool in self._pools.values():
+            pool.shutdown(wait=False)
+
+    def sweep(self):
+        """Fetch the book of every venue with open orders and queue it for pump()."""
+        by_venue = {}
+        for order in self.open_orders():
+            by_venue.setdefault(order.venue, []).append(order)
+        for venue, orders in by_venue.items():
+            try:
+                rows = venue.order_book(orders)
+            except Exception as e:
+                print(f"[orders] {venue.name} order book error:", e)
+                continue
+            self._events.put(("book", venue, rows, time.time()))
+
+    def _sweep_loop(self):
+        while not self._stopping.is_set():
+            self.sweep()
+            waiting = any(not o.review for o in self.open_orders())
+            self._wake.wait(RECONCILE_FAST_SECONDS if waiting else RECONCILE_SECONDS)
+            self._wake.clear()
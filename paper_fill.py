@@ -0,0 +1,214 @@
+# paper_fill.py
+"""
+Paper execution engine: fills simulated orders against the order book.
+
+Orders wait out a configurable latency, then match against the opposite
+side of the latest depth snapshot for their instrument:
+
+  * market orders cross the spread and walk the book level by level,
+  * limit orders take liquidity only at or better than their price,
+  * whatever the visible depth cannot absorb stays working (partial fill)
+    and continues on the next quote, unless the order is IOC.
+
+Stop orders (trigger_price) wait until the LTP trades through the
+trigger, then work as a market order (or as a limit order at
+limit_price). Orders sharing an oco_group on the same symbol are
+one-cancels-other: the first fill of one cancels the rest, which is
+reported through on_cancel.
+
+Liquidity consumed by one order is not available to the next order on
+the same quote, so N paper users hitting the same option don't all get
+the touch price. Orders are bucketed by symbol, so a quote only costs
+work for the orders on that instrument.
+"""
+import itertools
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from market_calendar import now_ist
+
+TICK_SIZE = 0.05  # NSE F&O price tick
+
+
+@dataclass
+class PaperOrder:
+    symbol: str
+    side: str                     # "BUY" / "SELL"
+    qty: int
+    limit_price: float = None     # None -> market
+    ioc: bool = False
+    trigger_price: float = None   # stop order: dormant until LTP trades through it
+    oco_group: str = None
+    user_id: int = None
+    tag: str = None
+    order_id: str = None
+    submitted_at: datetime = None
+    active_at: datetime = None
+    filled_qty: int = 0
+    avg_price: float = 0.0
+    status: str = "PENDING"       # PENDING / OPEN / PARTIAL / FILLED / CANCELLED
+    triggered: bool = False
+    fills: list = field(default_factory=list)
+
+    @property
+    def remaining(self):
+        return self.qty - self.filled_qty
+
+    def _fill(self, qty, price, ts):
+        cost = self.avg_price * self.filled_qty + price * qty
+        self.filled_qty += qty
+        self.avg_price = cost / self.filled_qty
+        self.fills.append((ts, qty, price))
+        self.status = "FILLED" if self.remaining == 0 else "PARTIAL"
+
+
+class FillSimulator:
+    """
+    latency:        order -> exchange delay before an order can match
+    slippage_ticks: extra ticks paid when only an LTP (no depth) is known
+    max_participation: fraction of each visible level an order may take
+    on_fill(order, qty, price, ts): callback for every (partial) fill
+    on_cancel(order, ts): cancelled by cancel() (ts None), as an IOC remainder or as an OCO sibling
+    """
+
+    def __init__(self, latency_ms: int = 250, slippage_ticks: int = 2,
+                 max_participation: float = 1.0, tick_size: float = TICK_SIZE,
+                 on_fill=None):
+        self.latency = timedelta(milliseconds=latency_ms)
+        self.slippage_ticks = slippage_ticks
+        self.max_participation = max_participation
+        self.tick_size = tick_size
+        self.on_fill = on_fill
+        self.on_cancel = None
+        self._ids = itertools.count(1)
+        self._orders = {}     # symbol -> [PaperOrder] (working only)
+        self._by_id = {}
+        self._lock = threading.Lock()
+
+    # ---------- order entry ----------
+
+    def submit(self, order: PaperOrder, now: datetime = None) -> str:
+        # Same clock as the quotes (naive IST), or latency is off by the server's UTC offset
+        now = now or now_ist()
+        order.order_id = order.order_id or f"PAPER_{next(self._ids)}"
+        order.submitted_at = now
+        order.active_at = now + self.latency
+        with self._lock:
+            self._orders.setdefault(order.symbol, []).append(order)
+            self._by_id[order.order_id] = order
+        return order.order_id
+
+    def cancel(self, order_id: str) -> bool:
+        with self._lock:
+            order = self._by_id.get(order_id)
+            if not order or order.status in ("FILLED", "CANCELLED"):
+                return False
+            order.status = "CANCELLED"
+            self._orders[order.symbol].remove(order)
+        if self.on_cancel:
+            self.on_cancel(order, None)
+        return True
+
+    def get(self, order_id: str):
+        return self._by_id.get(order_id)
+
+    def working(self, symbol: str = None):
+        with self._lock:
+            if symbol:
+                return list(self._orders.get(symbol, ()))
+            return [o for orders in self._orders.values() for o in orders]
+
+    # ---------- matching ----------
+
+    def on_quote(self, symbol: str, ts: datetime, bids=(), asks=(), ltp: float = None):
+        """
+        Match working orders on `symbol` against a depth snapshot.
+
+        bids / asks: sequences of (price, qty), best level first.
+        Returns the number of fills generated.
+        """
+        orders = self._orders.get(symbol)
+        if not orders:
+            return 0
+
+        fills, cancelled = [], []
+        with self._lock:
+            # Per-quote remaining liquidity, shared by all orders on the symbol
+            book = {"BUY": [list(l) for l in asks], "SELL": [list(l) for l in bids]}
+            for order in list(orders):
+                if order.active_at > ts or order.status == "CANCELLED":
+                    continue
+                if order.status == "PENDING":
+                    order.status = "OPEN"
+                if order.trigger_price is not None and not order.triggered:
+                    if not self._triggered(order, bids, asks, ltp):
+                        continue
+                    order.triggered = True
+                self._match(order, book[order.side], ltp, ts, fills)
+                if order.oco_group and order.filled_qty:
+                    for other in list(orders):
+                        if other is not order and other.oco_group == order.oco_group:
+                            other.status = "CANCELLED"
+                            orders.remove(other)
+                            cancelled.append(other)
+                if order.remaining == 0:
+                    orders.remove(order)
+                elif order.ioc:
+                    order.status = "CANCELLED"
+                    orders.remove(order)
+                    cancelled.append(order)
+
+        if self.on_fill:
+            for order, qty, price in fills:
+                self.on_fill(order, qty, price, ts)
+        if self.on_cancel:
+            for order in cancelled:
+                self.on_cancel(order, ts)
+        return len(fills)
+
+    @staticmethod
+    def _triggered(order: PaperOrder, bids, asks, ltp) -> bool:
+        last = ltp
+        if last is None:
+            levels = asks if order.side == "BUY" else bids
+            last = levels[0][0] if levels else None
+        if last is None:
+            return False
+        return last >= order.trigger_price if order.side == "BUY" else last <= order.trigger_price
+
+    def _match(self, order: PaperOrder, levels, ltp, ts, fills):
+        buy = order.side == "BUY"
+
+        if not levels:
+            # No depth: fill everything at LTP plus slippage for crossing
+            if ltp is None:
+                return
+            slip = self.slippage_ticks * self.tick_size
+            price = ltp + slip if buy else max(ltp - slip, self.tick_size)
+            if order.limit_price is not None and (price > order.limit_price if buy else price < order.limit_price):
+                return
+            qty = order.remaining
+            order._fill(qty, round(price, 2), ts)
+            fills.append((order, qty, order.fills[-1][2]))
+            return
+
+        for level in levels:
+            price, avail = level
+            if order.remaining == 0:
+                break
+            if order.limit_price is not None and (price > order.limit_price if buy else price < order.limit_price):
+                break
+            take = min(order.remaining, int(avail * self.max_participation))
+            if take <= 0:
+                continue
+            level[1] -= take
+            order._fill(take, price, ts)
+            fills.append((order, take, price))
+
+    def replay(self, quotes):
+        """Feed recorded quotes: iterable of (symbol, ts, bids, asks, ltp)."""
+        n = 0
+        for symbol, ts, bids, asks, ltp in quotes:
+            n += self.on_quote(symbol, ts, bids, asks, ltp)
+        return n
@@ -1,13 +1,17 @@
 import os
-import time
-from datetime import datetime, time as dtime
+from datetime import time as dtime
 from dhanhq import dhanhq
-from app import app, db, PaperTrade  # reuse Flask DB models
+from app import create_app
+from broker_limiter import limited
+from market_calendar import ORB, PRE_OPEN, SQUARE_OFF, TRADE, SessionScheduler, now_ist
+from models import db, PaperTrade  # reuse Flask DB models
+from paper_fill import FillSimulator, PaperOrder
 
 CLIENT_ID = os.environ["DHAN_CLIENT_ID"]
 ACCESS_TOKEN = os.environ["DHAN_ACCESS_TOKEN"]
 
-dhan = dhanhq(client_id=CLIENT_ID, access_token=ACCESS_TOKEN)
+dhan = limited(dhanhq(client_id=CLIENT_ID, access_token=ACCESS_TOKEN), "dhan", CLIENT_ID)
+app = create_app()
 
 EXCHANGE_SEGMENT = "NSE_FNO"     # BANKNIFTY options
 INDEX_SEGMENT = "NSE_INDEX"     # BANKNIFTY index
@@ -27,6 +31,12 @@ ORB_END = dtime(9, 20)
 TRADE_START = dtime(9, 20)
 TRADE_END = dtime(10, 0)
 
+# Paper fills: wait out order latency, then cross the spread / walk depth
+sim = FillSimulator(
+    latency_ms=int(os.environ.get("PAPER_LATENCY_MS", 250)),
+    slippage_ticks=int(os.environ.get("PAPER_SLIPPAGE_TICKS", 2)),
+)
+
 def get_index_ltp():
     resp = dhan.get_quote(INDEX_SEGMENT, INDEX_SECURITY_ID)
     return float(resp["ltp"])
@@ -35,110 +45,165 @@ def get_option_ltp(sec_id):
     resp = dhan.get_quote(EXCHANGE_SEGMENT, sec_id)
     return float(resp["ltp"])
 
-def now_ist():
-    return datetime.now()
+def get_option_quote(sec_id):
+    """(ltp, bids, asks) with 5-level depth; falls back to LTP only."""
+    try:
+        resp = dhan.quote_data({EXCHANGE_SEGMENT: [int(sec_id)]})
+        q = resp["data"]["data"][EXCHANGE_SEGMENT][str(sec_id)]
+        depth = q.get("depth") or {}
+        bids = [(float(l["price"]), int(l["quantity"])) for l in depth.get("buy", []) if l.get("quantity")]
+        asks = [(float(l["price"]), int(l["quantity"])) for l in depth.get("sell", []) if l.get("quantity")]
+        return float(q["last_price"]), bids, asks
+    except Exception:
+        return get_option_ltp(sec_id), [], []
 
 def in_range(dt, start, end):
     return start <= dt.time() <= end
 
-def main():
-    print("Starting BANKNIFTY ORB paper-trade engine...")
-    or_high = None
-    or_low = None
-    in_position = False
-    side = None
-    entry_price = None
-    entry_time = None
-    trade_id = None
-
-    while True:
-        ts = now_ist()
-        t = ts.time()
 
+class OrbDay:
+    """One trading day of the paper ORB engine; a fresh one starts at pre-open."""
+
+    def __init__(self):
+        self.or_high = None
+        self.or_low = None
+        self.in_position = False
+        self.side = None
+        self.entry_price = None
+        self.trade_id = None
+        self.entry_order = None
+        self.exit_order = None
+        self.exit_reason = None
+
+    def build_range(self, ts):
+        """ORB phase job: widen the opening range with the index LTP."""
         try:
             idx_ltp = get_index_ltp()
         except Exception as e:
             print("Index LTP error:", e)
-            time.sleep(1)
-            continue
-
-        # Build opening range
-        if ORB_START <= t < ORB_END:
-            or_high = max(or_high or idx_ltp, idx_ltp)
-            or_low = min(or_low or idx_ltp, idx_ltp)
-            print(f"{ts} ORB | LTP={idx_ltp} | H={or_high} L={or_low}")
-            time.sleep(5)
-            continue
-
-        # Look for breakout
-        if in_range(ts, TRADE_START, TRADE_END) and or_high and or_low and not in_position:
-            if idx_ltp > or_high:
-                side = "CE"
-                opt_id = ATM_CALL_SECURITY_ID
-            elif idx_ltp < or_low:
-                side = "PE"
-                opt_id = ATM_PUT_SECURITY_ID
-            else:
-                time.sleep(2)
-                continue
-
-            entry_price = get_option_ltp(opt_id)
-            in_position = True
-            entry_time = ts
+            return
+        self.or_high = max(self.or_high or idx_ltp, idx_ltp)
+        self.or_low = min(self.or_low or idx_ltp, idx_ltp)
+        print(f"{ts} ORB | LTP={idx_ltp} | H={self.or_high} L={self.or_low}")
+
+    def trade(self, ts):
+        """TRADE / SQUARE_OFF job: look for the breakout, then manage the position."""
+        if not self.in_position:
+            self.look_for_breakout(ts)
+        if self.in_position:
+            self.manage(ts)
+
+    def look_for_breakout(self, ts):
+        if not (in_range(ts, TRADE_START, TRADE_END) and self.or_high and self.or_low):
+            return  # flat outside the entry window: no API calls
+        try:
+            idx_ltp = get_index_ltp()
+        except Exception as e:
+            print("Index LTP error:", e)
+            return
+        if idx_ltp > self.or_high:
+            self.side = "CE"
+        elif idx_ltp < self.or_low:
+            self.side = "PE"
+        else:
+            return
+
+        opt_id = ATM_CALL_SECURITY_ID if self.side == "CE" else ATM_PUT_SECURITY_ID
+        self.entry_order = sim.get(sim.submit(PaperOrder(opt_id, "BUY", ENTRY_LOTS * LOT_SIZE), ts))
+        self.in_position = True
+        print(f"{ts} PAPER BUY {self.side} sent ({self.entry_order.order_id})")
+
+    def manage(self, ts):
+        t = ts.time()
+        opt_id = ATM_CALL_SECURITY_ID if self.side == "CE" else ATM_PUT_SECURITY_ID
+        try:
+            ltp, bids, asks = get_option_quote(opt_id)
+        except Exception as e:
+            print("Option LTP error:", e)
+            return
+        sim.on_quote(opt_id, now_ist(), bids, asks, ltp)
 
+        # Entry (partially) filled -> open the trade at the average fill
+        if self.trade_id is None and self.entry_order.filled_qty:
+            self.entry_price = self.entry_order.avg_price
             with app.app_context():
                 trade = PaperTrade(
                     symbol="BANKNIFTY",
-                    side=side,
-                    qty=ENTRY_LOTS * LOT_SIZE,
-                    entry_price=entry_price,
-                    entry_time=str(ts),
+                    side=self.side,
+                    qty=self.entry_order.filled_qty,
+                    entry_price=self.entry_price,
                     status="OPEN",
                 )
                 db.session.add(trade)
                 db.session.commit()
-                trade_id = trade.id
-
-            print(f"{ts} PAPER ENTRY {side} @ {entry_price} (id={trade_id})")
-
-        # Manage open paper trade
-        if in_position and trade_id is not None:
-            opt_id = ATM_CALL_SECURITY_ID if side == "CE" else ATM_PUT_SECURITY_ID
-            try:
-                ltp = get_option_ltp(opt_id)
-            except Exception as e:
-                print("Option LTP error:", e)
-                time.sleep(1)
-                continue
-
-            pnl_pts = (ltp - entry_price) if side == "CE" else (entry_price - ltp)
-            pnl_rs = pnl_pts * LOT_SIZE * ENTRY_LOTS
-            print(f"{ts} {side} PAPER PNL {pnl_pts:.1f} pts (~₹{pnl_rs:.0f})")
-
-            exit_reason = None
+                self.trade_id = trade.id
+            print(f"{ts} PAPER ENTRY {self.side} @ {self.entry_price:.2f} (id={self.trade_id})")
+
+        if self.trade_id is None:
+            if t > TRADE_END:
+                sim.cancel(self.entry_order.order_id)
+                self.in_position = False
+            return
+
+        # Long option either way: PnL is premium change, valued at the bid
+        entry_price = self.entry_price = self.entry_order.avg_price  # may move while the entry is still partial
+        mark = bids[0][0] if bids else ltp
+        pnl_pts = mark - entry_price
+        pnl_rs = pnl_pts * self.entry_order.filled_qty
+        print(f"{ts} {self.side} PAPER PNL {pnl_pts:.1f} pts (~₹{pnl_rs:.0f})")
+
+        if self.exit_order is None:
             if pnl_pts >= TARGET_PTS:
-                exit_reason = "TARGET"
+                self.exit_reason = "TARGET"
             elif pnl_pts <= -STOP_PTS:
-                exit_reason = "STOP"
+                self.exit_reason = "STOP"
             elif t > TRADE_END:
-                exit_reason = "TIME"
-
-            if exit_reason:
-                with app.app_context():
-                    trade = PaperTrade.query.get(trade_id)
-                    if trade:
-                        trade.exit_price = ltp
-                        trade.exit_time = str(ts)
-                        trade.pnl_points = pnl_pts
-                        trade.pnl_rupees = pnl_rs
-                        trade.status = f"CLOSED_{exit_reason}"
-                        db.session.commit()
-
-                print(f"{ts} PAPER EXIT {exit_reason} {pnl_pts:.1f} pts (~₹{pnl_rs:.0f})")
-                in_position = False
-                trade_id = None
-
-        time.sleep(2)
+                self.exit_reason = "TIME"
+            if self.exit_reason:
+                if self.entry_order.remaining:
+                    sim.cancel(self.entry_order.order_id)
+                self.exit_order = sim.get(sim.submit(
+                    PaperOrder(opt_id, "SELL", self.entry_order.filled_qty), now_ist()
+                ))
+
+        if self.exit_order is not None and self.exit_order.status == "FILLED":
+            exit_price = self.exit_order.avg_price
+            pnl_pts = exit_price - entry_price
+            pnl_rs = pnl_pts * self.exit_order.filled_qty
+            with app.app_context():
+                trade = db.session.get(PaperTrade, self.trade_id)
+                if trade:
+                    trade.qty = self.exit_order.filled_qty
+                    trade.entry_price = entry_price
+                    trade.exit_price = exit_price
+                    trade.pnl_rupees = pnl_rs
+                    trade.status = f"CLOSED_{self.exit_reason}"
+                    db.session.commit()
+
+            print(f"{ts} PAPER EXIT {self.exit_reason} @ {exit_price:.2f} {pnl_pts:.1f} pts (~₹{pnl_rs:.0f})")
+            self.in_position = False
+            self.trade_id = None
+            self.entry_order = self.exit_order = self.exit_reason = None
+
+
+def main():
+    print("Starting BANKNIFTY ORB paper-trade engine...")
+    day = OrbDay()
+
+    def new_day(ts):
+        nonlocal day
+        day = OrbDay()
+
+    # Index polled every 5 s in the opening range, position every 2 s
+    # after it; nothing runs outside 09:15-15:30 IST on trading days.
+    sched = SessionScheduler()
+    sched.on_phase(PRE_OPEN, new_day)
+    sched.every(5, lambda ts: day.build_range(ts), phases=(ORB,))
+    sched.every(2, lambda ts: day.trade(ts), phases=(TRADE, SQUARE_OFF))
+    try:
+        sched.run()
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     main()
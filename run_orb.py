@@ -1,40 +1,55 @@
 # file: run_orb.py
+"""
+Print the NIFTY / BANKNIFTY index ticks from Dhan's v2 MarketFeed and,
+when ALICE_USER_ID / ALICE_API_KEY are set, Alice Blue's websocket too.
+
+Each broker is a market_feed.FeedManager (the socket is reopened with
+backoff after any error and a feed that goes silent in market hours is
+restarted); with both, market_router.MarketRouter merges them and fails
+over per instrument. Extra instruments can be added at runtime with
+FEED.subscribe(...).
+"""
 import os
-from dhanhq import DhanContext, MarketFeed
+import time
+
+from market_feed import IDX, TICKER, AliceConnection, DhanConnection, FeedManager
+from market_router import MarketRouter
 
 # ========= ENV CONFIG =========
 CLIENT_ID = os.environ["DHAN_CLIENT_ID"]       # e.g. "1100734437"
 ACCESS_TOKEN = os.environ["DHAN_ACCESS_TOKEN"] # 24-hr token
+ALICE_USER_ID = os.environ.get("ALICE_USER_ID")
+ALICE_API_KEY = os.environ.get("ALICE_API_KEY")
 
 print("PY CLIENT_ID:", CLIENT_ID)
 print("PY TOKEN   :", ACCESS_TOKEN[:20] + "...")
 
-# Create context
-dhan_context = DhanContext(CLIENT_ID, ACCESS_TOKEN)
-
 # ========= INSTRUMENTS (v2) =========
-# Use NSE as per DhanHQ-py docs; library maps it to proper segments internally. [web:229][web:288]
-# Replace "13" and "25" with your NIFTY and BANKNIFTY security_ids as needed.
+# Replace 13 and 25 with your NIFTY and BANKNIFTY security_ids as needed.
 instruments = [
-    (MarketFeed.NSE, "13", MarketFeed.Ticker),   # NIFTY index ticker
-    (MarketFeed.NSE, "25", MarketFeed.Ticker),   # BANKNIFTY index ticker
+    (IDX, 13, TICKER),   # NIFTY index ticker
+    (IDX, 25, TICKER),   # BANKNIFTY index ticker
 ]
 
-version = "v2"
-
-try:
-    data = MarketFeed(dhan_context, instruments, version)
-    print("Connecting MarketFeed v2...")
-    while True:
-        data.run_forever()          # maintain connection
-        response = data.get_data()  # get latest batch
-
-        # response is usually a list of dicts
-        if isinstance(response, list):
-            for tick in response:
-                print(tick)
-        else:
-            print(response)
-
-except Exception as e:
-    print("MarketFeed error:", e)
+feeds = [FeedManager(lambda subs: DhanConnection(subs, CLIENT_ID, ACCESS_TOKEN), name="dhan")]
+if ALICE_USER_ID and ALICE_API_KEY:
+    feeds.append(FeedManager(lambda subs: AliceConnection(subs, ALICE_USER_ID, ALICE_API_KEY), name="alice"))
+for feed in feeds:
+    feed.on_gap = lambda key, last, ts, reason, name=feed.name: print(f"GAP {name} {key} {last} -> {ts} ({reason})")
+    feed.on_stale = lambda key, age, name=feed.name: print(f"STALE {name} {key}: no tick for {age:.0f}s")
+
+FEED = MarketRouter(feeds) if len(feeds) > 1 else feeds[0]
+if isinstance(FEED, MarketRouter):
+    FEED.on_failover = lambda key, src, dst, reason: print(f"FAILOVER {key} {src} -> {dst} ({reason})")
+
+if __name__ == "__main__":
+    FEED.listen(print)
+    FEED.subscribe("run_orb", instruments)
+    print("Connecting MarketFeed v2" + (" + Alice Blue..." if len(feeds) > 1 else "..."))
+    FEED.start()
+    try:
+        while True:
+            time.sleep(60)
+            print("Feed status:", FEED.status())
+    except KeyboardInterrupt:
+        FEED.stop()
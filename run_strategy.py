@@ -1,23 +1,310 @@
 # run_strategy.py - Run this separately for live trading
-from apscheduler.schedulers.background import BackgroundScheduler
-from strategies.banknifty_orb_vwap import BankNiftyORB
-from pya3 import Aliceblue
-
-scheduler = BackgroundScheduler()
-strategy = BankNiftyORB()
-
-def tick_loop():
-    """Fetch BankNifty LTP every second during market hours."""
-    if strategy.broker.connect():
-        ltp_data = strategy.broker.alice.get_ltp("NSE", "NIFTY BANK")
-        strategy.on_tick("BANKNIFTY", ltp_data["ltp"], ltp_data.get("volume", 0))
-
-scheduler.add_job(tick_loop, "interval", seconds=5)  # 5-sec ticks
-scheduler.start()
-
-print("Live trading started. Press Ctrl+C to stop.")
-try:
-    while True:
-        time.sleep(1)
-except KeyboardInterrupt:
-    scheduler.shutdown()
+"""
+Strategy runner.
+
+Loads only the strategies that have at least one enabled StrategyConfig
+row, creates one instance per row, and feeds them BANKNIFTY ticks and a
+1-second timer. Every SYNC_SECONDS it re-reads the configs (deploy /
+disable from the dashboard takes effect without a restart) and reloads
+strategy modules whose source changed on disk.
+
+Everything runs on a market_calendar.SessionScheduler: configs are
+synced from pre-open, ticks and timers flow only during market hours
+(09:15-15:30 IST on NSE trading days), and the process sleeps through
+nights, weekends and holidays.
+
+Orders go through order_manager.OrderManager, paper and live alike.
+Strategies hear about an order on the runner thread: on_order for every
+state change, and on_fill once the order is complete. A live order is
+no longer assumed filled just because the broker accepted it. Entries
+placed with submit_bracket carry target / stop / time exits, managed by
+bracket_orders.BracketManager at the venue where it can hold them.
+
+With DHAN_CLIENT_ID / DHAN_ACCESS_TOKEN set, an OptionsChainService keeps
+the front-expiry chain of every running underlying fresh, so strategies
+pick strikes by delta (StrategyContext.pick_option); without it they
+fall back to the ATM strike.
+"""
+import os
+
+import broker_limiter
+from app import create_app
+from bracket_orders import BracketManager
+from broker_alice import AliceBroker
+from market_calendar import MARKET_PHASES, PRE_OPEN, CLOSED, SessionScheduler, now_ist
+from models import db, StrategyConfig, User
+from options_chain import OptionsChainService, dhan_chain_fetcher, dhan_expiry_fetcher
+from order_manager import REJECTED, AliceVenue, OrderManager, OrderStore, PaperVenue
+from paper_fill import FillSimulator
+from strategies.base import StrategyContext
+from strategy_registry import registry
+
+TICK_SECONDS = 5   # index LTP poll interval
+SYNC_SECONDS = 30  # config / code reload interval
+OPTION_CHAIN_SECONDS = float(os.environ.get("OPTION_CHAIN_SECONDS", 3))  # Dhan: one chain call per 3 s
+
+# One simulator shared by every paper user, as one venue
+paper_sim = FillSimulator(latency_ms=int(os.environ.get("PAPER_LATENCY_MS", 250)))
+paper_venue = PaperVenue(paper_sim)
+orders = OrderManager(store=OrderStore())
+brackets = BracketManager(orders)
+
+
+def _on_order_update(order, fill_qty):
+    strategy = order.strategy
+    if strategy is None:
+        return  # adopted from the store after a restart; only reconciled
+    strategy.on_order(order.as_dict())
+    if order.done and order.filled_qty:
+        # report the entry/exit once it is complete (a cancelled partial counts)
+        strategy.on_fill({
+            "order_id": order.client_id, "symbol": order.symbol, "side": order.side,
+            "qty": order.filled_qty, "price": order.avg_price, "ts": now_ist(), "tag": order.tag,
+        })
+
+
+orders.on_update = _on_order_update
+orders.attach(paper_venue)
+
+
+class BrokerContext(StrategyContext):
+    """
+    Routes strategy orders through the OrderManager to the owner's
+    AliceBroker, or to the shared paper venue when there is no live
+    session.
+    """
+
+    def __init__(self, user, option_chains=None):
+        self.broker = AliceBroker(user)
+        self.broker.connect()
+        self.option_chains = option_chains
+        self.venue = AliceVenue(self.broker) if self.broker.alice else paper_venue
+
+    @property
+    def paper(self):
+        return self.venue is paper_venue
+
+    def submit_order(self, strategy, symbol, side, qty, price=None, tag=None, client_id=None):
+        order = orders.submit(self.venue, self.broker.owner.id, symbol, side, qty * strategy.lot_qty,
+                              price=price, tag=tag, client_id=client_id, strategy=strategy)
+        return None if order.status == REJECTED else order.client_id
+
+    def submit_bracket(self, strategy, symbol, side, qty, target, stop, time_limit=None, tag="ENTRY",
+                       client_id=None):
+        bracket = brackets.submit(self.venue, self.broker.owner.id, symbol, side, qty * strategy.lot_qty,
+                                  target, stop, time_limit=time_limit, tag=tag, client_id=client_id,
+                                  strategy=strategy)
+        return None if bracket.entry.status == REJECTED else bracket.id
+
+    def exit_bracket(self, strategy, client_id, reason="EXIT"):
+        return brackets.exit(client_id, reason)
+
+
+class StrategyRunner:
+    def __init__(self, registry=registry, option_chains=None):
+        self.registry = registry
+        self.option_chains = option_chains  # OptionsChainService for delta-based strikes
+        self.instances = {}  # StrategyConfig.id -> (name, strategy)
+        self.contexts = {}   # user_id -> BrokerContext
+        self.chain_days = {}  # underlying -> day its chain expiry was picked
+
+    def _context(self, user_id):
+        if user_id not in self.contexts:
+            self.contexts[user_id] = BrokerContext(
+                db.session.get(User, user_id), self.option_chains
+            )
+        return self.contexts[user_id]
+
+    def _stop(self, cfg_id):
+        name, strategy = self.instances.pop(cfg_id)
+        try:
+            strategy.on_stop()
+        except Exception as e:
+            print(f"[runner] {name} on_stop error:", e)
+
+    def sync(self):
+        """Match running instances to enabled configs and reload edited code."""
+        available = set(self.registry.discover())
+        configs = {
+            c.id: c for c in StrategyConfig.query.filter_by(enabled=True).all()
+            if c.strategy_name in available
+        }
+
+        for cfg_id in [i for i in self.instances if i not in configs]:
+            self._stop(cfg_id)
+
+        reloaded = set(self.registry.refresh())
+        for cfg_id, (name, _) in list(self.instances.items()):
+            if name in reloaded:
+                print(f"[runner] {name} changed on disk, restarting config {cfg_id}")
+                self._stop(cfg_id)
+
+        for cfg_id, cfg in configs.items():
+            if cfg_id in self.instances:
+                continue
+            try:
+                strategy = self.registry.create(cfg.strategy_name, cfg, self._context(cfg.user_id))
+            except Exception as e:
+                print(f"[runner] cannot start {cfg.strategy_name} for user {cfg.user_id}:", e)
+                continue
+            self.instances[cfg_id] = (cfg.strategy_name, strategy)
+
+        running = {name for name, _ in self.instances.values()}
+        for name in self.registry.loaded():
+            if name not in running:
+                self.registry.unload(name)
+
+    def watch_chains(self, today):
+        """Keep the option chains on the front expiry of every running underlying."""
+        if self.option_chains is None:
+            return
+        for underlying in {s for _, st in self.instances.values() for s in st.symbols}:
+            if self.chain_days.get(underlying) == today:
+                continue
+            try:
+                expiry = self.option_chains.watch_nearest(underlying, today)
+            except Exception as e:
+                print(f"[runner] {underlying} option expiries error:", e)
+                continue
+            self.chain_days[underlying] = today
+            print(f"[runner] {underlying} option chain: expiry {expiry}")
+        self.option_chains.start()
+
+    def dispatch_tick(self, symbol, ltp, volume=0, ts=None):
+        # Every user's reaction to this tick goes out as one batch
+        with orders.batch():
+            for name, strategy in list(self.instances.values()):
+                if symbol in strategy.symbols:
+                    try:
+                        strategy.on_tick(symbol, ltp, volume, ts)
+                    except Exception as e:
+                        print(f"[runner] {name} on_tick error:", e)
+
+    def timer(self, ts):
+        with orders.batch():
+            for name, strategy in list(self.instances.values()):
+                try:
+                    strategy.on_timer(ts)
+                except Exception as e:
+                    print(f"[runner] {name} on_timer error:", e)
+
+    def venue_for(self, user_id, name):
+        """Venue for an order persisted before a restart (OrderManager.venue_for)."""
+        if name == paper_venue.name:
+            return paper_venue
+        venue = self._context(user_id).venue
+        return venue if venue.name == name else None
+
+    def feed_brokers(self):
+        """Connected live brokers, the market-data sources in order of preference."""
+        return [ctx.broker for ctx in self.contexts.values() if ctx.broker.alice]
+
+
+def quote(brokers, exchange, symbol):
+    """(ltp, bids, asks) from the first broker that answers; raises the last error."""
+    error = None
+    for broker in brokers:
+        try:
+            return broker.quote(exchange, symbol)
+        except Exception as e:
+            error = e
+    raise error or RuntimeError("no market-data broker")
+
+
+def feed_option_quotes(brokers, ts):
+    """Quote options with working paper orders or locally watched bracket exits."""
+    paper = {o.symbol for o in paper_sim.working()}
+    for symbol in paper | brackets.watching():
+        try:
+            ltp, bids, asks = quote(brokers, "NFO", symbol)
+        except Exception as e:
+            print(f"Option quote error {symbol}:", e)
+            continue
+        if symbol in paper:
+            # Paper fills walk the depth; LTP plus slippage only without it
+            paper_sim.on_quote(symbol, ts, bids=bids, asks=asks, ltp=ltp)
+        with orders.batch():
+            brackets.on_tick(symbol, ltp, ts)
+
+
+def schedule(runner, sched):
+    """Register the runner's jobs on a SessionScheduler."""
+
+    def sync(ts):
+        runner.sync()
+        runner.watch_chains(ts.date())
+        print(f"[runner] running: {sorted(n for n, _ in runner.instances.values())}")
+
+    def tick(ts):
+        brokers = runner.feed_brokers()
+        if brokers:
+            try:
+                ltp, _, _ = quote(brokers, "NSE", "NIFTY BANK")
+                runner.dispatch_tick("BANKNIFTY", ltp, 0, ts)
+            except Exception as e:
+                print("LTP error:", e)
+            feed_option_quotes(brokers, ts)
+
+    def pump(ts):
+        # Exit legs of every bracket filled since the last pump go out together
+        with orders.batch():
+            orders.pump()
+            brackets.on_timer()
+
+    def closed(ts):
+        db.session.rollback()  # don't sit "idle in transaction" overnight
+        if runner.option_chains:
+            runner.option_chains.stop()
+        for bucket, state in broker_limiter.stats().items():
+            print(f"[runner] {bucket}: granted {state['granted']}, coalesced {state['coalesced']}, "
+                  f"max queued {state['max_queued']}, max wait {state['max_wait_ms']} ms")
+        print("[runner] market closed, idle until pre-open")
+
+    sched.every(SYNC_SECONDS, sync, phases=(PRE_OPEN,) + MARKET_PHASES)
+    sched.every(TICK_SECONDS, tick, phases=MARKET_PHASES)
+    sched.every(1, runner.timer, phases=MARKET_PHASES)
+    sched.every(1, pump, phases=MARKET_PHASES)
+    sched.on_phase(CLOSED, closed)
+    return sched
+
+
+def option_chain_service():
+    """Dhan-backed option chains for pick_option(), or None without Dhan credentials."""
+    client_id, token = os.environ.get("DHAN_CLIENT_ID"), os.environ.get("DHAN_ACCESS_TOKEN")
+    if not (client_id and token):
+        print("[runner] no DHAN_CLIENT_ID / DHAN_ACCESS_TOKEN: strikes fall back to ATM")
+        return None
+    from dhanhq import dhanhq
+
+    dhan = broker_limiter.limited(dhanhq(client_id=client_id, access_token=token), "dhan", client_id)
+    return OptionsChainService(dhan_chain_fetcher(dhan), interval=OPTION_CHAIN_SECONDS,
+                               expiries=dhan_expiry_fetcher(dhan))
+
+
+def main():
+    # Same factory as the web app; ALGOSPHERE_DB_URI still overrides the DB
+    db_uri = os.environ.get("ALGOSPHERE_DB_URI")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": db_uri} if db_uri else None)
+    runner = StrategyRunner(option_chains=option_chain_service())
+    sched = schedule(runner, SessionScheduler())
+
+    print("Live trading started. Press Ctrl+C to stop.")
+    with app.app_context():
+        orders.venue_for = runner.venue_for
+        adopted = orders.load_open()
+        if adopted:
+            print(f"[runner] reconciling {adopted} open orders from the last run")
+        orders.start()
+        try:
+            sched.run()
+        except KeyboardInterrupt:
+            for cfg_id in list(runner.instances):
+                runner._stop(cfg_id)
+        finally:
+            orders.stop()
+            if runner.option_chains:
+                runner.option_chains.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# session_health.py
+"""
+Broker session health, tracked in the background.
+
+Every worker process keeps an in-memory state per user who polled
+/broker/status recently ("watched", ACTIVE_SECONDS). A daemon thread
+pings each watched LIVE session every VALIDATE_SECONDS (all of them
+concurrently, through alice_async) and stores the result. The status
+endpoint then reads the cache and never talks to the broker itself.
+
+States carry an ETag derived from their content, so pollers can send
+If-None-Match and either get 304 at once or long-poll (`wait`) until the
+state actually changes.
+"""
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+
+from models import db, BrokerConnection, User
+
+VALIDATE_SECONDS = float(os.environ.get("SESSION_VALIDATE_SECONDS", 60))
+ACTIVE_SECONDS = float(os.environ.get("SESSION_ACTIVE_SECONDS", 600))
+MAX_WAIT_SECONDS = 50  # below gunicorn's timeout
+
+
+def load_live_sessions(user_ids) -> dict:
+    """{user_id: AliceSession or None (not LIVE / no credentials)}; needs an app context."""
+    from alice_async import AliceSession
+
+    rows = db.session.execute(
+        select(BrokerConnection.user_id, User.email, BrokerConnection.api_key,
+               BrokerConnection.session_id, BrokerConnection.trade_mode,
+               BrokerConnection.paper_trade)
+        .join(User, User.id == BrokerConnection.user_id)
+        .where(BrokerConnection.user_id.in_(list(user_ids)))
+        .order_by(BrokerConnection.id)
+    ).all()
+    sessions = dict.fromkeys(user_ids)
+    seen = set()
+    for user_id, email, api_key, session_id, trade_mode, paper_trade in rows:
+        if user_id in seen:
+            continue  # the views use the user's first connection row
+        seen.add(user_id)
+        mode = trade_mode or ("PAPER" if paper_trade else "LIVE")
+        live = mode == "LIVE" and api_key and session_id
+        sessions[user_id] = AliceSession(email, api_key, session_id) if live else None
+    return sessions
+
+
+def etag(state: dict) -> str:
+    return "broker-%d%d%d" % (state["connected"], state["live"], state["paper"])
+
+
+def _state(connected: bool, checked: bool = True) -> dict:
+    return {
+        "connected": connected, "live": connected, "paper": not connected,
+        "checked_at": datetime.utcnow().isoformat(timespec="seconds") + "Z" if checked else None,
+    }
+
+
+class SessionHealth:
+    def __init__(self, interval: float = VALIDATE_SECONDS, active_ttl: float = ACTIVE_SECONDS):
+        self.interval = interval
+        self.active_ttl = active_ttl
+        self.app = None
+        self._states = {}        # user_id -> state dict
+        self._watched = {}       # user_id -> last poll (monotonic)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._async_waiters = {}  # user_id -> [(loop, future)]
+        self._pid = None
+        self._loop = None
+        self._wake = None
+
+    def init_app(self, app):
+        self.app = app
+
+    # ---------- reads (request path) ----------
+
+    def status(self, user_id: int):
+        """Cached state for user_id (None if unknown); marks the user watched."""
+        self._ensure_running()
+        with self._lock:
+            self._watched[user_id] = time.monotonic()
+            return self._states.get(user_id)
+
+    def seed(self, user_id: int, live: bool) -> dict:
+        """First state from the DB alone; a LIVE session is checked right away."""
+        # Paper is final; LIVE with credentials is assumed good until pinged
+        state = _state(live, checked=not live)
+        with self._lock:
+            state = self._states.setdefault(user_id, state)
+        if live:
+            self.check_now()
+        return state
+
+    def wait(self, user_id: int, tag: str, timeout: float) -> dict:
+        """Block until the state's ETag differs from `tag` (or timeout)."""
+        with self._changed:
+            self._changed.wait_for(
+                lambda: user_id not in self._states or etag(self._states[user_id]) != tag,
+                timeout=min(timeout, MAX_WAIT_SECONDS),
+            )
+            return self._states.get(user_id)
+
+    async def wait_async(self, user_id: int, tag: str, timeout: float) -> dict:
+        """Event-loop version of wait(): no thread is held while waiting."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._states.get(user_id)
+            if state is None or etag(state) != tag:
+                return state
+            waiter = (loop, loop.create_future())
+            self._async_waiters.setdefault(user_id, []).append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], min(timeout, MAX_WAIT_SECONDS))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                waiters = self._async_waiters.get(user_id, [])
+                if waiter in waiters:
+                    waiters.remove(waiter)
+        with self._lock:
+            return self._states.get(user_id)
+
+    # ---------- writes ----------
+
+    def forget(self, user_id: int):
+        """Credentials or mode changed: drop the cached state and re-check."""
+        with self._lock:
+            self._states.pop(user_id, None)
+            self._notify(user_id)
+        self.check_now()
+
+    def check_now(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _set(self, user_id: int, state: dict):
+        with self._lock:
+            old = self._states.get(user_id)
+            self._states[user_id] = state
+            if old is None or etag(old) != etag(state):
+                self._notify(user_id)
+
+    def _notify(self, user_id: int):
+        # caller holds self._lock
+        self._changed.notify_all()
+        for loop, future in self._async_waiters.pop(user_id, ()):
+            loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+
+    # ---------- validator ----------
+
+    def _ensure_running(self):
+        # One validator per process, started lazily so it lives in the
+        # forked worker rather than the preloading master.
+        if self._pid == os.getpid() or self.app is None:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._loop = None
+        threading.Thread(target=asyncio.run, args=(self._run(),),
+                         name="session-validator", daemon=True).start()
+
+    async def _run(self):
+        self._wake = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await self.validate()
+            except Exception as e:
+                print("Session validator error:", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def validate(self):
+        """Ping every watched LIVE session once, concurrently."""
+        now = time.monotonic()
+        with self._lock:
+            for user_id in [u for u, seen in self._watched.items() if now - seen > self.active_ttl]:
+                del self._watched[user_id]
+                self._states.pop(user_id, None)
+            user_ids = list(self._watched)
+        if not user_ids:
+            return
+
+        def load():
+            with self.app.app_context():
+                return load_live_sessions(user_ids)
+
+        sessions = await asyncio.get_running_loop().run_in_executor(None, load)
+        live = {u: s for u, s in sessions.items() if s is not None}
+        results = await asyncio.gather(*(s.is_valid() for s in live.values()),
+                                       return_exceptions=True)
+        valid = {u: r is True for u, r in zip(live, results)}
+        for user_id in user_ids:
+            self._set(user_id, _state(valid.get(user_id, False)))
+
+
+session_health = SessionHealth()
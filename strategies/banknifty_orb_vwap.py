@@ -3,6 +3,8 @@ from dataclasses import dataclass
 from datetime import datetime, time, timedelta
 from collections import deque
 
+from strategies.base import BaseStrategy
+
 @dataclass
 class StrategyParams:
     lot_size: int = 3
@@ -10,6 +12,7 @@ class StrategyParams:
     stop_pts: int = 50
     trade_window_start: time = time(9, 20)
     trade_window_end: time = time(10, 0)
+    target_delta: float = 0.5  # option strike selection (|delta| of the leg bought)
 
 class BankNiftyOrbVwap:
     def __init__(self, params: StrategyParams):
@@ -97,3 +100,124 @@ class BankNiftyOrbVwap:
         self.position_side = None
         self.entry_price = None
         self.entry_time = None
+
+
+BANKNIFTY_STRIKE_STEP = 100
+BRACKET_TIME_LIMIT = 600  # seconds, the backtest's 10-minute exit
+
+
+class BankNiftyOrbVwapStrategy(BaseStrategy):
+    """
+    Registry adapter: builds 1-minute candles from BANKNIFTY ticks, feeds
+    them to BankNiftyOrbVwap and turns its signals into option orders.
+    Entries are brackets: the target / stop in underlying points, scaled
+    by the leg's delta, rest at the broker as option-price exits. Exits
+    are still evaluated on the underlying, as in the backtest, and close
+    the bracket through exit_bracket().
+    """
+
+    name = "banknifty_orb_vwap"
+    symbols = ("BANKNIFTY",)
+    lot_qty = 15
+
+    def __init__(self, config=None, ctx=None):
+        super().__init__(config, ctx)
+        defaults = StrategyParams()
+        self.p = StrategyParams(
+            lot_size=getattr(config, "lots", None) or defaults.lot_size,
+            target_pts=getattr(config, "target_points", None) or defaults.target_pts,
+            stop_pts=getattr(config, "stop_points", None) or defaults.stop_pts,
+        )
+        self.core = BankNiftyOrbVwap(self.p)
+        self.day = None
+        self.bar = None          # [minute, open, high, low, close, volume]
+        self.last_ltp = None
+        self.option_symbol = None
+        self.bracket_id = None
+        self.pending = None      # "ENTRY" / "EXIT" while an order is in flight
+        self.pending_side = None
+
+    # ---------- candle building ----------
+
+    def on_tick(self, symbol, ltp, volume=0, ts=None):
+        ts = ts or datetime.now()
+        if ts.date() != self.day:
+            self.day = ts.date()
+            self.core = BankNiftyOrbVwap(self.p)
+            self.bar = None
+
+        self.last_ltp = ltp
+        minute = ts.replace(second=0, microsecond=0)
+        if self.bar and self.bar[0] != minute:
+            self._flush_bar(symbol)
+        if not self.bar:
+            self.bar = [minute, ltp, ltp, ltp, ltp, 0]
+        bar = self.bar
+        bar[2] = max(bar[2], ltp)
+        bar[3] = min(bar[3], ltp)
+        bar[4] = ltp
+        bar[5] += volume or 0
+
+        self._check_exit(ts, ltp)
+
+    def on_timer(self, ts):
+        # Close the running candle even if no tick arrives in the next minute.
+        if self.bar and ts.replace(second=0, microsecond=0) > self.bar[0]:
+            self._flush_bar(self.symbols[0])
+        if self.last_ltp is not None:
+            self._check_exit(ts, self.last_ltp)
+
+    def _flush_bar(self, symbol):
+        minute, o, h, l, c, v = self.bar
+        self.bar = None
+        self.on_candle(symbol, minute, o, h, l, c, v)
+
+    # ---------- signals / orders ----------
+
+    def on_candle(self, symbol, ts, open_, high, low, close, volume):
+        signal = self.core.on_1min_candle(ts, high, low, close, volume)
+        if not signal or self.core.in_position or self.pending:
+            return
+        picked = self.ctx.pick_option("BANKNIFTY", signal, self.p.target_delta)
+        if picked:
+            self.option_symbol = picked["symbol"]
+        else:
+            # No live chain: fall back to the ATM strike
+            strike = round(close / BANKNIFTY_STRIKE_STEP) * BANKNIFTY_STRIKE_STEP
+            self.option_symbol = f"BANKNIFTY{ts.strftime('%y%b%d').upper()}{strike}{signal}"
+        self.pending, self.pending_side = "ENTRY", signal
+        self.bracket_id = self.ctx.submit_bracket(
+            self, self.option_symbol, "BUY", self.p.lot_size,
+            target=self.p.target_pts * self.p.target_delta, stop=self.p.stop_pts * self.p.target_delta,
+            time_limit=BRACKET_TIME_LIMIT, tag="ENTRY",
+        )
+        if not self.bracket_id:
+            self.pending = self.pending_side = None
+
+    def _check_exit(self, ts, ltp):
+        if not self.core.in_position or self.pending:
+            return
+        reason = self.core.on_option_tick(ts, ltp)
+        if reason and self.ctx.exit_bracket(self, self.bracket_id, reason):
+            self.pending = "EXIT"
+
+    def on_order(self, order):
+        # Entry never traded: no position, allow a new signal. Exit legs
+        # cancelled by their sibling's fill change nothing here.
+        if (order["client_id"] == self.bracket_id and order["status"] in ("REJECTED", "CANCELLED")
+                and not order["filled_qty"]):
+            self.bracket_id = self.pending = self.pending_side = None
+
+    def on_fill(self, fill):
+        ts = fill.get("ts") or datetime.now()
+        if fill.get("tag") == "ENTRY":
+            # Exits are tracked on the underlying, so anchor at its price.
+            self.core.enter(self.pending_side, self.last_ltp, ts)
+        elif self.core.in_position:
+            # Any exit leg: target / stop at the broker, or our own exit
+            self.core.exit()
+            self.option_symbol = self.bracket_id = None
+        self.pending = self.pending_side = None
+
+
+STRATEGY = BankNiftyOrbVwapStrategy
@@ -0,0 +1,85 @@
+# strategies/base.py
+"""
+Common event interface for registry-loaded strategies.
+
+A strategy module in strategies/ exposes `STRATEGY = <BaseStrategy subclass>`.
+The runner creates one instance per enabled StrategyConfig row and feeds
+it events; the strategy talks back only through its StrategyContext.
+"""
+from datetime import datetime
+
+
+class StrategyContext:
+    """Execution hooks the runner hands to each strategy instance."""
+
+    option_chains = None  # OptionsChainService, when the runner has one
+
+    def pick_option(self, underlying: str, option_type: str, target_delta: float):
+        """Chain row nearest the target delta, or None without a live chain."""
+        if self.option_chains is None:
+            return None
+        return self.option_chains.pick_by_delta(underlying, option_type, target_delta)
+
+    def submit_order(self, strategy, symbol: str, side: str, qty: int,
+                     price: float = None, tag: str = None, client_id: str = None):
+        """
+        Send an order; return its client order id, or None if rejected.
+        Re-submitting a client_id returns the same order, never a second one.
+        """
+        raise NotImplementedError
+
+    def submit_bracket(self, strategy, symbol: str, side: str, qty: int, target: float, stop: float,
+                       time_limit: float = None, tag: str = "ENTRY", client_id: str = None):
+        """
+        Send an entry with exits `target` / `stop` price points from its fill
+        and an optional time limit in seconds; return its client order id, or
+        None if rejected. Exit fills reach on_fill tagged TARGET_EXIT,
+        STOP_EXIT, TIME_EXIT or the exit_bracket() reason.
+        """
+        raise NotImplementedError
+
+    def exit_bracket(self, strategy, client_id: str, reason: str = "EXIT") -> bool:
+        """Close a bracket at market (cancels its resting exits first)."""
+        raise NotImplementedError
+
+    def log(self, strategy, msg: str):
+        print(f"[{strategy.name}:{getattr(strategy.config, 'user_id', '-')}] {msg}")
+
+
+class BaseStrategy:
+    """Event-driven strategy. Override the on_* hooks you need."""
+
+    name = None       # registry name, defaults to the module name
+    symbols = ()      # underlying symbols to subscribe to
+    lot_qty = 1       # contract quantity per lot of the traded instrument
+
+    def __init__(self, config=None, ctx: StrategyContext = None):
+        self.config = config  # StrategyConfig row (or any object with the same fields)
+        self.ctx = ctx
+
+    def on_tick(self, symbol: str, ltp: float, volume: int = 0, ts: datetime = None):
+        """Last-traded-price update for a subscribed symbol."""
+
+    def on_candle(self, symbol: str, ts: datetime, open_: float, high: float,
+                  low: float, close: float, volume: int):
+        """Completed 1-minute candle."""
+
+    def on_fill(self, fill: dict):
+        """
+        Order fill: {"order_id", "symbol", "side", "qty", "price", "ts", "tag"}.
+        """
+
+    def on_order(self, order: dict):
+        """
+        Order state change: {"client_id", "order_id", "symbol", "side", "qty",
+        "status", "filled_qty", "avg_price", "reason", "tag", "review"};
+        status is one of NEW / ACK / PARTIAL / FILLED / REJECTED / CANCELLED.
+        review is set on a NEW order whose outcome the broker could not
+        confirm; it stays open until settled by hand.
+        """
+
+    def on_timer(self, ts: datetime):
+        """Periodic clock event from the runner (about once a second)."""
+
+    def on_stop(self):
+        """Called before the runner unloads or reloads this strategy."""
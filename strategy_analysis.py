@@ -0,0 +1,318 @@
+# strategy_analysis.py
+"""
+Out-of-sample validation for BankNiftyOrbVwap.
+
+Two modes, both fanned out over a process pool and cached on disk by
+(data hash, params) so a rerun over the same candles is instant:
+
+  * walk-forward: for each rolling window, grid-search StrategyParams on
+    the in-sample days and replay the winner on the following
+    out-of-sample days.
+  * monte-carlo: bootstrap-resample a trade sequence thousands of times
+    to get max-drawdown and risk-of-ruin distributions.
+
+Usage:
+    python strategy_analysis.py walkforward --from 2023-01-01 --to 2025-12-31
+    python strategy_analysis.py montecarlo --from 2023-01-01 --to 2025-12-31
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from datetime import date, datetime, time
+
+import numpy as np
+
+from backtest import params_key, run_backtest, summarize
+from candle_store import DEFAULT_ROOT, CandleStore
+from strategies.banknifty_orb_vwap import StrategyParams
+
+CACHE_DIR = os.path.join("instance", "analysis_cache")
+
+# Default grid: 4 x 4 x 3 = 48 parameter sets per window
+DEFAULT_GRID = {
+    "target_pts": [40, 60, 80, 100],
+    "stop_pts": [30, 40, 50, 70],
+    "trade_window_end": [time(9, 45), time(10, 0), time(10, 30)],
+}
+
+BANKNIFTY_LOT_QTY = 15
+
+
+# ---------- cache ----------
+
+class ResultCache:
+    """JSON files keyed by sha1(kind, data hash, params)."""
+
+    def __init__(self, root: str = CACHE_DIR):
+        self.root = root
+
+    @staticmethod
+    def key(kind: str, data_hash: str, params: dict) -> str:
+        raw = json.dumps([kind, data_hash, params], sort_keys=True)
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def get(self, key: str):
+        path = os.path.join(self.root, key[:2], key + ".json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, key: str, value):
+        folder = os.path.join(self.root, key[:2])
+        os.makedirs(folder, exist_ok=True)
+        tmp = os.path.join(folder, f"{key}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp, os.path.join(folder, key + ".json"))
+
+
+def data_hash(arr: np.ndarray) -> str:
+    """Content hash of a (possibly memory-mapped) array."""
+    h = hashlib.sha1(str(arr.dtype).encode())
+    h.update(np.ascontiguousarray(arr).view(np.uint8))
+    return h.hexdigest()
+
+
+# ---------- grid / batching ----------
+
+def param_grid(base: StrategyParams, grid: dict):
+    """Expand {field: [values]} into StrategyParams instances."""
+    fields = sorted(grid)
+    for values in itertools.product(*(grid[f] for f in fields)):
+        yield replace(base, **dict(zip(fields, values)))
+
+
+def _chunks(seq, size):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def _backtest_batch(store_root, symbol, start, end, params_batch):
+    """
+    Worker: load one slice from the memory-mapped store (no pickling of
+    candles) and run every params set in the batch over it.
+    """
+    candles = CandleStore(store_root).load(symbol, start, end)
+    return [
+        (params_key(p), run_backtest(candles, p)["pnl_pts"].tolist())
+        for p in params_batch
+    ]
+
+
+def _score(pnl, objective: str) -> float:
+    stats = summarize_pnl(pnl)
+    if objective == "calmar":
+        return stats["total_pts"] / (stats["max_dd_pts"] or 1.0)
+    return stats["total_pts"]
+
+
+def summarize_pnl(pnl) -> dict:
+    pnl = np.asarray(pnl, dtype=float)
+    arr = np.zeros(len(pnl), dtype=[("pnl_pts", "f8")])
+    arr["pnl_pts"] = pnl
+    return summarize(arr)
+
+
+# ---------- walk-forward ----------
+
+def walk_forward(symbol: str, start, end, train_days: int = 60, test_days: int = 20,
+                 grid: dict = None, base: StrategyParams = None, objective: str = "total_pts",
+                 store_root: str = DEFAULT_ROOT, workers: int = None, batch_size: int = 8,
+                 cache: ResultCache = None):
+    """
+    Rolling walk-forward optimisation over StrategyParams.
+
+    Windows advance by test_days. Every (window slice, params) backtest
+    is cached, so only new windows or new grid points are computed on a
+    rerun. Returns {"windows": [...], "oos": summary, "oos_pnl": [...]}.
+    """
+    store = CandleStore(store_root)
+    cache = cache or ResultCache()
+    base = base or StrategyParams()
+    grid = grid or DEFAULT_GRID
+    candidates = list(param_grid(base, grid))
+
+    days = store.days(symbol, start, end)
+    windows = []
+    i = 0
+    while i + train_days + test_days <= len(days):
+        train = (days[i], days[i + train_days - 1])
+        test = (days[i + train_days], days[i + train_days + test_days - 1])
+        windows.append((train, test))
+        i += test_days
+
+    # Resolve cached results first; only misses go to the pool.
+    slice_hashes = {}
+    results = {}  # (slice, params_json) -> pnl list
+    todo = {}     # slice -> [params]
+    for train, test in windows:
+        for sl in (train, test):
+            if sl not in slice_hashes:
+                slice_hashes[sl] = data_hash(store.load(symbol, *sl))
+        for p in candidates:
+            pk = json.dumps(params_key(p), sort_keys=True)
+            hit = cache.get(cache.key("backtest", slice_hashes[train], params_key(p)))
+            if hit is None:
+                todo.setdefault(train, []).append(p)
+            else:
+                results[(train, pk)] = hit
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for sl, plist in todo.items():
+            for batch in _chunks(plist, batch_size):
+                fut = pool.submit(_backtest_batch, store_root, symbol, sl[0], sl[1], batch)
+                futures[fut] = sl
+        for fut, sl in futures.items():
+            for pk_dict, pnl in fut.result():
+                cache.put(cache.key("backtest", slice_hashes[sl], pk_dict), pnl)
+                results[(sl, json.dumps(pk_dict, sort_keys=True))] = pnl
+
+        # Pick the in-sample winner per window, then replay it out of sample.
+        chosen = []
+        oos_futures = []
+        for train, test in windows:
+            best = max(
+                candidates,
+                key=lambda p: _score(results[(train, json.dumps(params_key(p), sort_keys=True))], objective),
+            )
+            chosen.append(best)
+            hit = cache.get(cache.key("backtest", slice_hashes[test], params_key(best)))
+            if hit is None:
+                oos_futures.append(pool.submit(_backtest_batch, store_root, symbol, test[0], test[1], [best]))
+            else:
+                oos_futures.append(hit)
+
+        out_windows = []
+        oos_pnl = []
+        for (train, test), best, fut in zip(windows, chosen, oos_futures):
+            if isinstance(fut, list):
+                pnl = fut
+            else:
+                pk_dict, pnl = fut.result()[0]
+                cache.put(cache.key("backtest", slice_hashes[test], pk_dict), pnl)
+            oos_pnl.extend(pnl)
+            out_windows.append({
+                "train": [str(train[0]), str(train[1])],
+                "test": [str(test[0]), str(test[1])],
+                "params": params_key(best),
+                "in_sample": summarize_pnl(results[(train, json.dumps(params_key(best), sort_keys=True))]),
+                "out_of_sample": summarize_pnl(pnl),
+            })
+
+    return {"windows": out_windows, "oos": summarize_pnl(oos_pnl), "oos_pnl": oos_pnl}
+
+
+# ---------- monte carlo ----------
+
+def _mc_batch(pnl, n_sims, capital, ruin_equity, seed):
+    """
+    Worker: n_sims bootstrap paths in one vectorised pass.
+    Returns (max_drawdowns, final_equity, ruined_flags) as lists.
+    """
+    rng = np.random.default_rng(seed)
+    pnl = np.asarray(pnl, dtype=float)
+    idx = rng.integers(0, len(pnl), size=(n_sims, len(pnl)))
+    equity = capital + np.cumsum(pnl[idx], axis=1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), capital)
+    max_dd = (peak - equity).max(axis=1)
+    ruined = equity.min(axis=1) <= ruin_equity
+    return max_dd.tolist(), equity[:, -1].tolist(), ruined.tolist()
+
+
+def monte_carlo(pnl_rupees, n_sims: int = 10000, capital: float = 100000.0,
+                ruin_fraction: float = 0.5, batch_size: int = 1000, seed: int = 7,
+                workers: int = None, cache: ResultCache = None):
+    """
+    Bootstrap the trade sequence n_sims times.
+
+    A path is "ruined" if equity ever falls to capital * (1 - ruin_fraction).
+    Seeds are derived per batch so results are reproducible and cacheable.
+    """
+    pnl = np.asarray(pnl_rupees, dtype=float)
+    if not len(pnl):
+        return {"sims": 0}
+
+    cache = cache or ResultCache()
+    opts = {"n_sims": n_sims, "capital": capital, "ruin_fraction": ruin_fraction,
+            "batch_size": batch_size, "seed": seed}
+    key = cache.key("montecarlo", data_hash(pnl), opts)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+
+    ruin_equity = capital * (1 - ruin_fraction)
+    seeds = np.random.SeedSequence(seed).spawn((n_sims + batch_size - 1) // batch_size)
+    sizes = [min(batch_size, n_sims - i * batch_size) for i in range(len(seeds))]
+
+    dd, final, ruined = [], [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_mc_batch, pnl, size, capital, ruin_equity, s)
+            for size, s in zip(sizes, seeds)
+        ]
+        for fut in futures:
+            a, b, c = fut.result()
+            dd.extend(a)
+            final.extend(b)
+            ruined.extend(c)
+
+    dd = np.asarray(dd)
+    final = np.asarray(final)
+    pct = [5, 25, 50, 75, 95]
+    result = {
+        "sims": int(n_sims),
+        "trades_per_path": int(len(pnl)),
+        "max_dd_pct": dict(zip(map(str, pct), np.percentile(dd, pct).round(2).tolist())),
+        "final_equity_pct": dict(zip(map(str, pct), np.percentile(final, pct).round(2).tolist())),
+        "risk_of_ruin": float(np.mean(ruined)),
+    }
+    cache.put(key, result)
+    return result
+
+
+# ---------- CLI ----------
+
+def _parse_date(s: str) -> date:
+    return datetime.strptime(s, "%Y-%m-%d").date()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="BankNiftyOrbVwap walk-forward / Monte Carlo")
+    ap.add_argument("mode", choices=["walkforward", "montecarlo"])
+    ap.add_argument("--symbol", default="BANKNIFTY")
+    ap.add_argument("--from", dest="start", type=_parse_date, required=True)
+    ap.add_argument("--to", dest="end", type=_parse_date, required=True)
+    ap.add_argument("--train-days", type=int, default=60)
+    ap.add_argument("--test-days", type=int, default=20)
+    ap.add_argument("--objective", choices=["total_pts", "calmar"], default="total_pts")
+    ap.add_argument("--sims", type=int, default=10000)
+    ap.add_argument("--capital", type=float, default=100000.0)
+    ap.add_argument("--lots", type=int, default=StrategyParams().lot_size)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    wf = walk_forward(args.symbol, args.start, args.end, args.train_days, args.test_days,
+                      objective=args.objective, workers=args.workers)
+
+    if args.mode == "walkforward":
+        for w in wf["windows"]:
+            print(f"{w['test'][0]}..{w['test'][1]}  params={w['params']}  "
+                  f"IS={w['in_sample']['total_pts']:.1f}  OOS={w['out_of_sample']['total_pts']:.1f}")
+        print("Out-of-sample:", wf["oos"])
+        return
+
+    # Monte Carlo on the stitched out-of-sample trades, in rupees.
+    pnl_rs = np.asarray(wf["oos_pnl"]) * BANKNIFTY_LOT_QTY * args.lots
+    print(json.dumps(monte_carlo(pnl_rs, n_sims=args.sims, capital=args.capital,
+                                 workers=args.workers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# strategy_registry.py
+"""
+Discovers strategy modules in strategies/ and loads them on demand.
+
+discover() only lists file names, so the web app and the runner can show
+or validate strategy names without importing any strategy code. load()
+imports a single module; refresh() reloads modules whose file changed on
+disk, which is how the runner picks up edits without a restart.
+"""
+import importlib
+import os
+import pkgutil
+import sys
+import threading
+
+from strategies.base import BaseStrategy
+
+STRATEGY_PACKAGE = "strategies"
+STRATEGY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), STRATEGY_PACKAGE)
+
+# Helper modules living in strategies/ that are not strategies themselves
+_NOT_STRATEGIES = {"base"}
+
+
+class StrategyNotFound(LookupError):
+    pass
+
+
+class StrategyRegistry:
+    def __init__(self, path: str = STRATEGY_DIR, package: str = STRATEGY_PACKAGE):
+        self.path = path
+        self.package = package
+        self._loaded = {}  # name -> (module, mtime)
+        self._failed = {}  # name -> mtime of an edit that did not load
+        self._lock = threading.RLock()
+
+    def discover(self):
+        """Sorted strategy names available in the strategies folder (no imports)."""
+        return sorted(
+            m.name for m in pkgutil.iter_modules([self.path])
+            if not m.name.startswith("_") and m.name not in _NOT_STRATEGIES
+        )
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name + ".py")
+
+    def load(self, name: str):
+        """Import (once) and return the strategy class for `name`."""
+        with self._lock:
+            if name in self._loaded:
+                return self._strategy_class(name, self._loaded[name][0])
+
+            if name not in self.discover():
+                raise StrategyNotFound(name)
+
+            module = importlib.import_module(f"{self.package}.{name}")
+            cls = self._strategy_class(name, module)
+            self._loaded[name] = (module, os.path.getmtime(self._file(name)))
+            return cls
+
+    def unload(self, name: str):
+        """Forget a loaded strategy module so the next load() re-imports it."""
+        with self._lock:
+            self._loaded.pop(name, None)
+            self._failed.pop(name, None)
+            sys.modules.pop(f"{self.package}.{name}", None)
+
+    def reload(self, name: str):
+        """Re-import a strategy module from disk and return its class."""
+        with self._lock:
+            self.unload(name)
+            return self.load(name)
+
+    def refresh(self):
+        """
+        Reload loaded modules whose source changed on disk and drop ones
+        whose file was removed. Returns the list of names reloaded/removed.
+        """
+        changed = []
+        with self._lock:
+            for name, (_, mtime) in list(self._loaded.items()):
+                try:
+                    current = os.path.getmtime(self._file(name))
+                except OSError:
+                    self.unload(name)
+                    changed.append(name)
+                    continue
+                if current != mtime and current != self._failed.get(name):
+                    module = self._loaded[name][0]
+                    try:
+                        self.reload(name)
+                    except Exception as e:
+                        # Keep running the old code if the edit is broken;
+                        # the next save is picked up again.
+                        print(f"[registry] reload {name} failed:", e)
+                        self._loaded[name] = (module, mtime)
+                        sys.modules[f"{self.package}.{name}"] = module
+                        self._failed[name] = current
+                        continue
+                    self._failed.pop(name, None)
+                    changed.append(name)
+        return changed
+
+    def loaded(self):
+        with self._lock:
+            return sorted(self._loaded)
+
+    def create(self, name: str, config=None, ctx=None) -> BaseStrategy:
+        """Instantiate strategy `name` for one StrategyConfig row."""
+        return self.load(name)(config=config, ctx=ctx)
+
+    def _strategy_class(self, name: str, module):
+        cls = getattr(module, "STRATEGY", None)
+        if not (isinstance(cls, type) and issubclass(cls, BaseStrategy)):
+            raise StrategyNotFound(f"{name}: module has no STRATEGY = <BaseStrategy subclass>")
+        if cls.name is None:
+            cls.name = name
+        return cls
+
+
+# Process-wide registry used by the web app and the runner
+registry = StrategyRegistry()
@@ -0,0 +1,451 @@
+# trade_archive.py
+"""
+Hot/cold tiers for trade, paper_trade and live_trade.
+
+The current month (ARCHIVE_HOT_MONTHS months, counting the current one)
+stays in the database. roll() moves older, closed rows into one
+compressed columnar file per table and month:
+
+    instance/archive/trade/2025-01.3.npz       version 3 of January 2025
+
+Each file is an np.savez_compressed zip with one member per user and
+column ("12.closed_at", "12.pnl", ...; user 0 for tables without a
+user), each user's rows sorted by (time, id), plus "users". Reading one
+user's month only inflates that user's members, so the zip directory is
+the user index and the month is the date index.
+
+The archive_month table says which file version holds each month.
+roll() writes a new version next to the old one, then switches the
+pointer and deletes the archived rows from the hot table in a single
+transaction: readers see every row exactly once, in either tier, and
+can simply add the two together (see dashboard_routes.reports and
+analytics.load_columns). Rows that land in an archived month later
+(imports, late closes) stay hot until the next roll merges them in.
+
+    python trade_archive.py roll        # e.g. nightly, or from a scheduler
+    python trade_archive.py status
+
+TRADE_ARCHIVE_DIR must be on persistent disk shared by every process
+that serves reports (not a Heroku dyno's ephemeral filesystem). On a
+dyno roll() refuses to run until it is set explicitly, and a month file
+that archive_month names but the directory lacks is an error, not an
+empty month.
+"""
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import sqlalchemy as sa
+
+import db_config
+from models import db, ArchiveMonth, Trade, PaperTrade, LiveTrade
+
+ARCHIVE_DIR = os.environ.get("TRADE_ARCHIVE_DIR", os.path.join(db_config.INSTANCE_PATH, "archive"))
+ARCHIVE_HOT_MONTHS = max(int(os.environ.get("ARCHIVE_HOT_MONTHS", 1)), 1)
+ARCHIVE_CACHE_ENTRIES = int(os.environ.get("ARCHIVE_CACHE_ENTRIES", 256))
+DELETE_CHUNK = 1000
+
+_FILL = {"M8[us]": None, "i8": 0, "f8": np.nan, "?": False, "U": ""}
+
+
+class TableSpec:
+    """How a hot table maps onto archive files."""
+
+    def __init__(self, model, time_col, user_col=None, closed=None):
+        self.model = model
+        self.table = model.__table__
+        self.name = self.table.name
+        self.time_col = time_col
+        self.user_col = user_col
+        self.closed = closed  # extra filter: only finished rows are archived
+        self.columns = [c.name for c in self.table.columns]
+        self.kinds = {c.name: _kind(c.type) for c in self.table.columns}
+        self.row = namedtuple(f"Archived{model.__name__}", self.columns)
+
+
+def _kind(col_type) -> str:
+    if isinstance(col_type, sa.DateTime):
+        return "M8[us]"
+    if isinstance(col_type, sa.Boolean):
+        return "?"
+    if isinstance(col_type, sa.Integer):
+        return "i8"
+    if isinstance(col_type, sa.Float):
+        return "f8"
+    return "U"
+
+
+TABLES = {
+    spec.name: spec for spec in (
+        TableSpec(Trade, "closed_at", "user_id"),
+        TableSpec(PaperTrade, "trade_date", closed=PaperTrade.exit_price.isnot(None)),
+        TableSpec(LiveTrade, "trade_date", closed=LiveTrade.exit_price.isnot(None)),
+    )
+}
+
+
+def month_start(month: str) -> datetime:
+    return datetime.strptime(month, "%Y-%m")
+
+
+def _next_month(d: datetime) -> datetime:
+    return datetime(d.year + (d.month == 12), d.month % 12 + 1, 1)
+
+
+def hot_boundary(now: datetime = None) -> datetime:
+    """Start of the oldest month that stays in the database."""
+    now = now or datetime.utcnow()
+    months = now.year * 12 + now.month - 1 - (ARCHIVE_HOT_MONTHS - 1)
+    return datetime(months // 12, months % 12 + 1, 1)
+
+
+# ---------- columns <-> arrays ----------
+
+def _encode(values, kind):
+    """(array, null mask or None) for a list of column values."""
+    null = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+    if null.any():
+        values = [_FILL[kind] if v is None else v for v in values]
+    arr = np.array(values, dtype=str if kind == "U" else kind)
+    if kind == "U" and not len(arr):
+        arr = arr.astype("U1")
+    return arr, (null if null.any() else None)
+
+
+def _to_python(arr, null):
+    values = arr.tolist()
+    if null is not None:
+        values = [None if n else v for v, n in zip(values, null.tolist())]
+    return values
+
+
+# ---------- reads ----------
+
+class _UserMonthCache:
+    """LRU of decompressed (file, user) column dicts, per process."""
+
+    def __init__(self, size):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, user_id):
+        key = (path, user_id)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+
+        columns = {}
+        with np.load(path) as npz:
+            users = npz["users"]
+            i = np.searchsorted(users, user_id)
+            if i < len(users) and users[i] == user_id:
+                prefix = f"{user_id}."
+                for name in npz.files:
+                    if name.startswith(prefix):
+                        columns[name[len(prefix):]] = npz[name]
+
+        with self._lock:
+            self._data[key] = columns
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+        return columns
+
+
+_cache = _UserMonthCache(ARCHIVE_CACHE_ENTRIES)
+
+
+def archived_months(table: str, conn=None):
+    """[(month, file, rows)] for a table, oldest first."""
+    stmt = (sa.select(ArchiveMonth.month, ArchiveMonth.file, ArchiveMonth.rows)
+            .where(ArchiveMonth.table_name == table).order_by(ArchiveMonth.month))
+    return (conn or db.session).execute(stmt).all()
+
+
+def archive_stamp(conn=None):
+    """Changes whenever any month is (re)archived."""
+    return tuple((conn or db.session).execute(
+        sa.select(sa.func.count(), sa.func.max(ArchiveMonth.archived_at))
+    ).one())
+
+
+def scan(table: str, user_id: int = 0, start: datetime = None, end: datetime = None,
+         descending: bool = False):
+    """
+    Yield one {column: array} dict per archived month overlapping
+    [start, end), restricted to that range and sorted by (time, id).
+    Null masks come back as "<column>.null".
+    """
+    spec = TABLES[table]
+    months = archived_months(table)
+    if descending:
+        months = months[::-1]
+    for month, filename, _ in months:
+        lo = month_start(month)
+        if (end is not None and lo >= end) or (start is not None and _next_month(lo) <= start):
+            continue
+        cols = _read(table, filename, user_id)
+        if not cols:
+            continue
+        times = cols[spec.time_col]
+        i = 0 if start is None or start <= lo else int(np.searchsorted(times, np.datetime64(start, "us")))
+        j = len(times) if end is None else int(np.searchsorted(times, np.datetime64(end, "us")))
+        if i < j:
+            yield {name: arr[i:j] for name, arr in cols.items()}
+
+
+def _read(table, filename, user_id):
+    path = os.path.join(ARCHIVE_DIR, table, filename)
+    try:
+        return _cache.get(path, user_id)
+    except FileNotFoundError:
+        # Superseded by a roll that committed after we read archive_month
+        for _, name, _ in archived_months(table):
+            if name.split(".")[0] == filename.split(".")[0] and name != filename:
+                return _cache.get(os.path.join(ARCHIVE_DIR, table, name), user_id)
+        # archive_month still points here: the archive dir is wrong or lost
+        # files, and those rows are gone from the hot table too
+        raise FileNotFoundError(
+            f"archived {table} {filename} is missing from {ARCHIVE_DIR} (check TRADE_ARCHIVE_DIR)"
+        )
+
+
+def rows(table: str, cols: dict):
+    """Row tuples (same attribute names as the model) for a scan() chunk."""
+    spec = TABLES[table]
+    values = [_to_python(cols[name], cols.get(name + ".null")) for name in spec.columns]
+    return [spec.row(*v) for v in zip(*values)]
+
+
+def iter_tuples(table: str, columns, user_id: int = 0, start=None, end=None):
+    """Archived rows as tuples of `columns`, oldest first (for streaming exports)."""
+    for cols in scan(table, user_id, start, end):
+        yield from zip(*[_to_python(cols[name], cols.get(name + ".null")) for name in columns])
+
+
+def summary(table: str, value_col: str, user_id: int = 0, start=None, end=None):
+    """(count, sum, count > 0) of an archived column over [start, end)."""
+    count, total, positive = 0, 0.0, 0
+    for cols in scan(table, user_id, start, end):
+        values = cols[value_col]
+        count += len(values)
+        total += float(values.sum())
+        positive += int((values > 0).sum())
+    return count, total, positive
+
+
+def page(table: str, user_id: int = 0, start=None, end=None, after=None, before=None,
+         limit: int = 100):
+    """
+    Up to `limit` archived rows past a (time, id) keyset cursor: newest
+    first below `after` (or from the end), oldest first above `before`.
+    """
+    spec = TABLES[table]
+    newest_first = before is None
+    out = []
+    for cols in scan(table, user_id, start, end, descending=newest_first):
+        times, ids = cols[spec.time_col], cols["id"]
+        keep = np.ones(len(ids), dtype=bool)
+        if after or before:
+            ts, row_id = after or before
+            ts = np.datetime64(ts, "us")
+            if after:
+                keep = (times < ts) | ((times == ts) & (ids < row_id))
+            else:
+                keep = (times > ts) | ((times == ts) & (ids > row_id))
+        idx = np.flatnonzero(keep)
+        idx = idx[::-1][:limit - len(out)] if newest_first else idx[:limit - len(out)]
+        out.extend(rows(table, {name: arr[idx] for name, arr in cols.items()}))
+        if len(out) >= limit:
+            break
+    return out
+
+
+# ---------- roll ----------
+
+def _load_month(spec, path):
+    """Every user's columns from an existing month file: {user: {col: array}}."""
+    out = {}
+    with np.load(path) as npz:
+        for user_id in npz["users"].tolist():
+            prefix = f"{user_id}."
+            out[user_id] = {n[len(prefix):]: npz[n] for n in npz.files if n.startswith(prefix)}
+    return out
+
+
+def _user_columns(spec, records):
+    cols = {}
+    for i, name in enumerate(spec.columns):
+        arr, null = _encode([r[i] for r in records], spec.kinds[name])
+        cols[name] = arr
+        if null is not None:
+            cols[name + ".null"] = null
+    return cols
+
+
+def _merge(spec, old, new):
+    """Concatenate two column dicts of one user, newer rows winning on id, sorted by (time, id)."""
+    keep = ~np.isin(old["id"], new["id"])
+    n_old, n_new = int(keep.sum()), len(new["id"])
+    merged = {}
+    for name in spec.columns:
+        merged[name] = np.concatenate([old[name][keep], new[name]])
+        if name + ".null" in old or name + ".null" in new:
+            merged[name + ".null"] = np.concatenate([
+                old.get(name + ".null", np.zeros(len(keep), bool))[keep],
+                new.get(name + ".null", np.zeros(n_new, bool)),
+            ])
+    order = np.lexsort((merged["id"], merged[spec.time_col]))
+    if n_old and n_new:
+        merged = {name: arr[order] for name, arr in merged.items()}
+    return merged
+
+
+def _write_file(path, users: dict):
+    members = {"users": np.array(sorted(users), dtype="i8")}
+    for user_id, cols in users.items():
+        members.update({f"{user_id}.{name}": arr for name, arr in cols.items()})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **members)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def roll_month(engine, spec: TableSpec, month: datetime, log=print) -> int:
+    """Move one month's closed hot rows into its archive file; returns rows moved."""
+    table = spec.table
+    time_col = table.c[spec.time_col]
+    where = [time_col >= month, time_col < _next_month(month)]
+    if spec.closed is not None:
+        where.append(spec.closed)
+    order = [table.c[spec.user_col]] if spec.user_col else []
+
+    with engine.connect() as conn:
+        records = conn.execute(
+            sa.select(*[table.c[n] for n in spec.columns]).where(*where)
+            .order_by(*order, time_col, table.c.id)
+        ).all()
+        current = conn.execute(
+            sa.select(ArchiveMonth.file).where(ArchiveMonth.table_name == spec.name,
+                                               ArchiveMonth.month == f"{month:%Y-%m}")
+        ).scalar()
+    if not records:
+        return 0
+
+    key = f"{month:%Y-%m}"
+    folder = os.path.join(ARCHIVE_DIR, spec.name)
+    users = _load_month(spec, os.path.join(folder, current)) if current else {}
+
+    user_idx = spec.columns.index(spec.user_col) if spec.user_col else None
+    by_user = {}
+    for r in records:
+        by_user.setdefault(r[user_idx] if user_idx is not None else 0, []).append(r)
+    for user_id, user_records in by_user.items():
+        new = _user_columns(spec, user_records)
+        users[user_id] = _merge(spec, users[user_id], new) if user_id in users else new
+
+    version = int(current.split(".")[1]) + 1 if current else 1
+    filename = f"{key}.{version}.npz"
+    _write_file(os.path.join(folder, filename), users)
+
+    ids = [r[spec.columns.index("id")] for r in records]
+    total = sum(len(cols["id"]) for cols in users.values())
+    with engine.begin() as conn:
+        manifest = ArchiveMonth.__table__
+        values = dict(file=filename, rows=total, users=len(users), archived_at=datetime.utcnow())
+        match = (manifest.c.table_name == spec.name) & (manifest.c.month == key)
+        if not conn.execute(manifest.update().where(match).values(**values)).rowcount:
+            conn.execute(manifest.insert().values(table_name=spec.name, month=key, **values))
+        for i in range(0, len(ids), DELETE_CHUNK):
+            conn.execute(table.delete().where(table.c.id.in_(ids[i:i + DELETE_CHUNK])))
+
+    if current:
+        try:
+            os.remove(os.path.join(folder, current))
+        except FileNotFoundError:
+            pass
+    log(f"  {spec.name} {key}: {len(ids)} rows archived ({total} in {filename})")
+    return len(ids)
+
+
+@contextmanager
+def _roll_lock(path):
+    """One roller at a time: flock on POSIX, msvcrt.locking on Windows."""
+    with open(path, "a+") as f:
+        try:
+            import fcntl
+        except ImportError:
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after 10 tries; keep waiting
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+
+def roll(engine, tables=None, now: datetime = None, log=print) -> int:
+    """Archive every closed month before hot_boundary(now); returns rows moved."""
+    if "DYNO" in os.environ and "TRADE_ARCHIVE_DIR" not in os.environ:
+        # The default (instance/archive) is the dyno's ephemeral disk: the
+        # rows would be deleted from the database and the files lost at restart
+        raise RuntimeError("TRADE_ARCHIVE_DIR must point at persistent storage to roll on Heroku")
+    boundary = hot_boundary(now)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    moved = 0
+    with _roll_lock(os.path.join(ARCHIVE_DIR, ".lock")):
+        for name in tables or TABLES:
+            spec = TABLES[name]
+            time_col = spec.table.c[spec.time_col]
+            where = [time_col < boundary] + ([spec.closed] if spec.closed is not None else [])
+            with engine.connect() as conn:
+                oldest = conn.scalar(sa.select(sa.func.min(time_col)).where(*where))
+            month = datetime(oldest.year, oldest.month, 1) if oldest else boundary
+            while month < boundary:
+                moved += roll_month(engine, spec, month, log)
+                month = _next_month(month)
+    return moved
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import migrations
+
+    parser = argparse.ArgumentParser(description="move closed months of trades into the archive")
+    parser.add_argument("command", choices=["roll", "status"])
+    parser.add_argument("--table", action="append", choices=sorted(TABLES))
+    args = parser.parse_args()
+
+    engine = db_config.create_engine()
+    migrations.upgrade(engine)
+    if args.command == "roll":
+        print(f"Archiving months before {hot_boundary():%Y-%m} into {ARCHIVE_DIR}")
+        print(f"{roll(engine, args.table)} rows archived.")
+    else:
+        with engine.connect() as conn:
+            for name in args.table or TABLES:
+                hot = conn.scalar(sa.select(sa.func.count()).select_from(TABLES[name].table))
+                months = archived_months(name, conn)
+                print(f"{name}: {hot} hot rows, {sum(m.rows for m in months)} archived "
+                      f"in {len(months)} months")
+                for month, filename, count in months:
+                    size = os.path.getsize(os.path.join(ARCHIVE_DIR, name, filename))
+                    print(f"  {month}  {count:>9} rows  {size / 1024:>9.1f} KiB  {filename}")
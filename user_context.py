@@ -0,0 +1,128 @@
+# user_context.py
+"""
+Per-process cache of what a logged-in request needs to know about its user.
+
+Flask-Login's user_loader used to load the User row on every request, and
+the views then queried the broker connection and strategy configs on
+their own. UserContext bundles all three from one joined query and is
+kept per worker for USER_CACHE_SECONDS.
+
+Code that writes a user's broker connection or strategy configs calls
+user_cache.invalidate(user_id) after the commit. Other workers pick the
+change up when their entry expires, so keep the TTL short.
+"""
+import os
+import threading
+import time
+
+from flask_login import UserMixin
+from sqlalchemy import select
+
+from models import db, BrokerConnection, StrategyConfig, User
+
+USER_CACHE_SECONDS = float(os.environ.get("USER_CACHE_SECONDS", 10))
+
+_BROKER_COLS = (BrokerConnection.id, BrokerConnection.broker, BrokerConnection.api_key,
+                BrokerConnection.session_id, BrokerConnection.trade_mode,
+                BrokerConnection.paper_trade)
+_STRATEGY_COLS = (StrategyConfig.id, StrategyConfig.strategy_name, StrategyConfig.enabled,
+                  StrategyConfig.lots, StrategyConfig.target_points,
+                  StrategyConfig.stop_points, StrategyConfig.daily_max_loss)
+
+
+class BrokerInfo:
+    """Snapshot of the user's first BrokerConnection row."""
+
+    __slots__ = ("id", "broker", "api_key", "session_id", "trade_mode", "paper_trade")
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @property
+    def mode(self) -> str:
+        # trade_mode + paper_trade for compatibility with old rows
+        return self.trade_mode or ("PAPER" if self.paper_trade else "LIVE")
+
+    @property
+    def is_live(self) -> bool:
+        """LIVE mode with stored credentials."""
+        return self.mode == "LIVE" and bool(self.api_key and self.session_id)
+
+
+class StrategyInfo:
+    """Snapshot of one StrategyConfig row (same field names)."""
+
+    __slots__ = ("id", "strategy_name", "enabled", "lots", "target_points",
+                 "stop_points", "daily_max_loss")
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+
+class UserContext(UserMixin):
+    """current_user for logged-in requests: no ORM instance, safe to share."""
+
+    def __init__(self, user_id: int, email: str, broker: BrokerInfo = None,
+                 strategies: dict = None):
+        self.id = user_id
+        self.email = email
+        self.broker = broker
+        self.strategies = strategies or {}  # strategy_name -> StrategyInfo
+
+
+def load_user_context(user_id: int):
+    """User + first broker connection + strategy configs in one query; needs an app context."""
+    rows = db.session.execute(
+        select(User.email, *_BROKER_COLS, *_STRATEGY_COLS)
+        .outerjoin(BrokerConnection, BrokerConnection.user_id == User.id)
+        .outerjoin(StrategyConfig, StrategyConfig.user_id == User.id)
+        .where(User.id == user_id)
+        .order_by(BrokerConnection.id, StrategyConfig.id)
+    ).all()
+    if not rows:
+        return None
+
+    n = len(_BROKER_COLS)
+    first = rows[0]
+    broker = BrokerInfo(*first[1:1 + n]) if first[1] is not None else None
+    strategies = {}
+    for row in rows:
+        if row[1] != first[1]:
+            break  # same configs repeated for the user's other connection rows
+        if row[1 + n] is not None:
+            # later rows win, as in the old dict built from StrategyConfig.query
+            strategies[row[2 + n]] = StrategyInfo(*row[1 + n:])
+    return UserContext(user_id, first[0], broker, strategies)
+
+
+class UserContextCache:
+    def __init__(self, ttl: float = USER_CACHE_SECONDS):
+        self.ttl = ttl
+        self._data = {}         # user_id -> (expires, UserContext)
+        self._generation = {}   # user_id -> invalidation count
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._data.get(user_id)
+            generation = self._generation.get(user_id, 0)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        ctx = load_user_context(user_id)
+        with self._lock:
+            # Don't store a load that raced with an invalidate()
+            if ctx is not None and self._generation.get(user_id, 0) == generation:
+                self._data[user_id] = (now + self.ttl, ctx)
+        return ctx
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._data.pop(user_id, None)
+            self._generation[user_id] = self._generation.get(user_id, 0) + 1
+
+
+user_cache = UserContextCache()
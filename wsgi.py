@@ -1,4 +1,6 @@
-from app import app as application
+from app import create_app
+
+application = create_app()
 
 if __name__ == "__main__":
     application.run()